@@ -20,13 +20,46 @@ Configuration:
     - credentials.json must contain valid AliExpress login credentials
     - For development mode, configure the constants below
     - For normal mode, configuration is done through UI
+    - Unattended mode (UNATTENDED=1 or the setup question) never waits for input
+      during a batch; problem orders go to a retry queue processed with backoff
+      after the main pass (RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY), optionally
+      followed by interactive resolution (RESOLVE_AT_END=1)
+    - Navigations are rate limited (RATE_LIMIT nav/s, adapting up to MAX_RATE)
+      and up to MAX_CONCURRENCY refund tabs load ahead while pages stay clean
+    - Refund tabs opened while collecting stay open (up to HANDOFF_TABS, 0 to
+      disable) and are submitted without loading them a second time
+    - Issued/under-review statuses are answered by the refund pages' own JSON
+      status call once it has been learned from a rendered page (FAST_STATUS=0 to disable)
+    - The proof image is uploaded once per batch and the stored reference reused
+      for later forms, falling back to normal uploads if rejected (REUSE_UPLOAD=0 to disable)
+    - Between batches the browser context is recycled (keeping the login) when
+      browser memory crosses MEMORY_WATERMARK_MB, sampled every MEMORY_SAMPLE_SECONDS
+      and backing off if a recycle doesn't help; Python memory over
+      PY_MEMORY_WATERMARK_MB is only reported
+    - While collecting and submitting, a progress line (items/min, queue depth,
+      tabs in flight, state counts, ETA) is printed every PROGRESS_INTERVAL
+      seconds (PROGRESS=0 to disable); PROGRESS_PORT=8777 also serves it as JSON
+      on http://127.0.0.1:8777/ (8765 is taken by the daemon and the mock server)
+    - Set TIMING_EXPORT=timings.json (or timings.prom) to export phase timings
+    - Set PROFILE_TRACE=1 and/or PROFILE_HAR=1 to record Playwright traces/HARs
+      for failed, slow (PROFILE_SLOW_SECONDS) and sampled (PROFILE_SAMPLE_RATE)
+      refund pages into PROFILE_DIR
 """
 
 from playwright.sync_api import sync_playwright
 from login_handler import LoginHandler
 from button_handler import add_checkboxes_to_orders
 from refund_link_collector import handle_refund_process
-from refunder import process_refunds
+from refunder import process_refunds, resolve_exhausted_interactively
+from retry_queue import RetryQueue
+from throttle import AdaptiveController, throttle_defaults
+from status_api import StatusClient, fast_status_default
+from evidence_cache import EvidenceCache, reuse_upload_default
+from page_pool import PagePool, TabHandoff, handoff_tabs_default
+from memory_monitor import MemoryMonitor, memory_defaults, recycle_context
+from timing import timer
+from refund_profiler import RefundProfiler, profiling_defaults
+from progress import BatchProgress, progress_defaults
 import time
 import logging
 import os
@@ -77,6 +110,17 @@ REFUND_MESSAGE_2 = "I do NOT AGREE. THE PACKAGE WAS RETURNED! I expect a full re
 DEFAULT_REFUND_MESSAGE = "The package was not picked up in time and was RETURNED to the sender. The attached document shows this"
 DEFAULT_REFUND_MESSAGE_2 = "I do NOT AGREE. THE PACKAGE WAS RETURNED! I expect a full refund! Check the attached document!"
 
+ORDER_DETAIL_URL = "https://www.aliexpress.com/p/order/detail.html?orderId={order_id}"
+
+# Browser context settings, reused when a context is recycled
+CONTEXT_OPTIONS = {
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
+    'viewport': {'width': 1280, 'height': 1080},
+    'color_scheme': 'light',
+    'locale': 'en-US',
+    'timezone_id': 'Europe/Berlin'
+}
+
 def save_dict_to_log(order_dict: dict):
     """Save the order dictionary to a log file with timestamp"""
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -115,15 +159,46 @@ def setup_credentials() -> tuple[str, str]:
     
     return email, password
 
-def get_initial_config() -> dict:
-    """Get all configuration before browser launch"""
-    config = {
+def default_config() -> dict:
+    """Configuration without any questions asked: defaults plus environment overrides"""
+    return {
         'pause_for_review': False,
         'image_path': None,
         'refund_message': DEFAULT_REFUND_MESSAGE,
         'refund_message_2': DEFAULT_REFUND_MESSAGE_2,
-        'save_log': False
+        'save_log': False,
+        'timing_export': os.getenv('TIMING_EXPORT'),
+        **unattended_defaults(),
+        **throttle_defaults(),
+        **profiling_defaults(),
+        'fast_status': fast_status_default(),
+        'reuse_upload': reuse_upload_default(),
+        'handoff_tabs': handoff_tabs_default(),
+        **memory_defaults(),
+        **progress_defaults()
     }
+
+def load_config_file(path: str, extra_keys: tuple = ()) -> dict:
+    """
+    Configuration from a JSON file on top of default_config().
+    extra_keys are accepted in addition to the default_config() keys.
+    Raises:
+        ValueError: for unknown keys, or an image path that doesn't exist
+    """
+    config = default_config()
+    with open(path, 'r') as f:
+        overrides = json.load(f)
+    unknown = set(overrides) - set(config) - set(extra_keys)
+    if unknown:
+        raise ValueError(f"Unknown config keys in {path}: {', '.join(sorted(unknown))}")
+    config.update(overrides)
+    if config['image_path'] and not os.path.exists(config['image_path']):
+        raise ValueError(f"Image not found: {config['image_path']}")
+    return config
+
+def get_initial_config() -> dict:
+    """Get all configuration before browser launch"""
+    config = default_config()
     
     print("\n⚙️ Process Configuration:")
     choice = input("Pause for review after collecting refund links? (y/n): ").strip().lower()
@@ -132,6 +207,12 @@ def get_initial_config() -> dict:
     choice = input("Save results to log file? (y/n): ").strip().lower()
     config['save_log'] = choice == 'y'
     
+    choice = input("Run unattended (defer problem orders to a retry queue instead of asking)? (y/n): ").strip().lower()
+    config['unattended'] = choice == 'y'
+    if config['unattended']:
+        choice = input("Resolve remaining failures interactively at the end? (y/n): ").strip().lower()
+        config['resolve_at_end'] = choice == 'y'
+    
     # Get image path
     while True:
         image_path = input("\nEnter the path to your proof image: ").strip()
@@ -155,6 +236,32 @@ def get_initial_config() -> dict:
     
     return config
 
+def unattended_defaults() -> dict:
+    """Unattended-mode config keys, read from the environment"""
+    return {
+        'unattended': os.getenv('UNATTENDED') == '1',
+        'resolve_at_end': os.getenv('RESOLVE_AT_END') == '1',
+        'retry_max_attempts': int(os.getenv('RETRY_MAX_ATTEMPTS', '3')),
+        'retry_base_delay': float(os.getenv('RETRY_BASE_DELAY', '30'))
+    }
+
+def normalize_order(value: str):
+    """
+    Turn an order ID or order detail URL into (order_id, url).
+    Returns:
+        tuple: (order_id, detail URL), or None if value is neither
+    """
+    value = value.strip()
+    if 'orderId=' in value:
+        order_id = value.split('orderId=')[1].split('&')[0]
+    else:
+        order_id = value
+    if not order_id.isdigit():
+        return None
+    if not value.startswith('http'):
+        value = ORDER_DETAIL_URL.format(order_id=order_id)
+    return order_id, value
+
 def create_order_dict(urls: list[str]) -> dict:
     """
     Create initial dictionary with order IDs as keys.
@@ -174,8 +281,14 @@ def create_order_dict(urls: list[str]) -> dict:
             }
     return order_dict
 
-def process_batch(page, urls: list[str], config: dict) -> dict:
-    """Process a batch of order URLs"""
+def process_batch(page, urls: list[str], config: dict, report_timings: bool = True) -> dict:
+    """
+    Process a batch of order URLs.
+    With report_timings=False the phase timings are left to the caller to
+    print/export (e.g. once after many chunks) and keep accumulating.
+    """
+    if report_timings:
+        timer.reset()
     print("\n📋 Processing orders:")
     order_dict = create_order_dict(urls)
     
@@ -185,21 +298,71 @@ def process_batch(page, urls: list[str], config: dict) -> dict:
         print(f"  • Order {order_id}")
     
     # Collect refund links
-    order_dict = handle_refund_process(page, order_dict)
+    unattended = config.get('unattended', False)
+    controller = AdaptiveController.from_config(config)
+    pool = PagePool(page.context, max_size=controller.max_concurrency)
+    handoff = TabHandoff(pool, config['handoff_tabs']) if config.get('handoff_tabs') else None
+    progress = BatchProgress.from_config(config)
+    # Watch before collecting: handed-off tabs make their status calls while the collector runs
+    status_client = StatusClient.from_config(page.context, config)
+    if status_client is not None:
+        status_client.watch()
+    order_dict = handle_refund_process(page, order_dict, interactive=not unattended, controller=controller,
+                                       pool=pool, handoff=handoff, progress=progress)
     
     # Process refunds
+    order_dict = submit_refunds(page, order_dict, config, controller, pool, handoff, progress, status_client)
+    if progress is not None:
+        progress.close()
+    if handoff is not None:
+        handoff.close_all()
+        handoff.print_summary()
+    pool.close_all()
+    
+    # Print summary
+    print_final_summary(order_dict)
+    if report_timings:
+        timer.print_summary()
+        if config.get('timing_export'):
+            timer.export(config['timing_export'])
+    return order_dict  # Return the updated dictionary
+
+def submit_refunds(page, order_dict: dict, config: dict, controller: AdaptiveController = None,
+                   pool: PagePool = None, handoff: TabHandoff = None, progress: BatchProgress = None,
+                   status_client: StatusClient = None) -> dict:
+    """Submit refunds for orders whose refund URLs are already known"""
     print("\n🎯 Starting refund submissions...")
+    own_progress = progress is None
+    if own_progress:
+        progress = BatchProgress.from_config(config)
+    unattended = config.get('unattended', False)
+    controller = controller or AdaptiveController.from_config(config)
+    retry_queue = None
+    if unattended:
+        retry_queue = RetryQueue(max_attempts=config.get('retry_max_attempts', 3),
+                                 base_delay=config.get('retry_base_delay', 30))
     order_dict = process_refunds(
         page=page,
         order_dict=order_dict,
         image_path=config['image_path'],
         refund_message=config['refund_message'],
-        refund_message_2=config['refund_message_2']
+        refund_message_2=config['refund_message_2'],
+        profiler=RefundProfiler.from_config(config),
+        retry_queue=retry_queue,
+        controller=controller,
+        status_client=status_client or StatusClient.from_config(page.context, config),
+        pool=pool,
+        evidence=EvidenceCache.from_config(page.context, config),
+        handoff=handoff,
+        progress=progress
     )
+    if own_progress and progress is not None:
+        progress.close()
     
-    # Print summary
-    print_final_summary(order_dict)
-    return order_dict  # Return the updated dictionary
+    if retry_queue is not None and config.get('resolve_at_end'):
+        resolve_exhausted_interactively(page, order_dict, retry_queue, config['image_path'],
+                                        config['refund_message'], config['refund_message_2'])
+    return order_dict
 
 def print_final_summary(order_dict: dict):
     """Print a comprehensive summary based on order dictionary states"""
@@ -283,6 +446,16 @@ def print_final_summary(order_dict: dict):
     print(f"❌ Failed: {len(status_groups['failed'])}")
     print(f"📈 Success Rate: {success_rate:.1f}%")
 
+def listen_for_process_click(page):
+    """Set window.startProcessing when the injected 'Process All Refunds' button is clicked"""
+    page.evaluate('''() => {
+        window.startProcessing = false;
+        document.addEventListener('processOrdersClicked', () => {
+            console.log('DEBUG: Process button clicked');
+            window.startProcessing = true;
+        });
+    }''')
+
 def main(development_mode=False):
     """Main entry point for the script."""
     # Setup before browser launch
@@ -292,7 +465,7 @@ def main(development_mode=False):
     else:
         print("\n🔍 Starting in development mode...")
         config = {
-            'pause_for_review': False,
+            **default_config(),
             'image_path': IMAGE_PATH,
             'refund_message': REFUND_MESSAGE,
             'refund_message_2': REFUND_MESSAGE_2,
@@ -316,13 +489,8 @@ def main(development_mode=False):
             ]
         )
         
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36',
-            viewport={'width': 1280, 'height': 1080},
-            color_scheme='light',
-            locale='en-US',
-            timezone_id='Europe/Berlin'
-        )
+        context = browser.new_context(**CONTEXT_OPTIONS)
+        monitor = MemoryMonitor.from_config(config)
         
         page = context.new_page()
         
@@ -348,13 +516,7 @@ def main(development_mode=False):
                 order_dict = process_batch(page, DEV_TEST_URLS, config)
             else:
                 # Normal mode - wait for button click
-                page.evaluate('''() => {
-                    window.startProcessing = false;
-                    document.addEventListener('processOrdersClicked', () => {
-                        console.log('DEBUG: Process button clicked');
-                        window.startProcessing = true;
-                    });
-                }''')
+                listen_for_process_click(page)
                 
                 print("\n✅ Setup complete!")
                 print("Select orders and click 'Process All Refunds' to begin")
@@ -373,14 +535,23 @@ def main(development_mode=False):
                             window.selectedOrderUrls = [];
                         }''')
                         print("\n⏳ Waiting for new orders...")
+                    elif (monitor.over_watermark(context)
+                          and not page.evaluate('(window.selectedOrderUrls || []).length')):
+                        # Idle with nothing selected: swap in a fresh context with the same session
+                        context, page = recycle_context(browser, context, CONTEXT_OPTIONS, monitor)
+                        LoginHandler(page).navigate_to_orders()
+                        add_checkboxes_to_orders(page)
+                        listen_for_process_click(page)
                     time.sleep(1)
                 
         except KeyboardInterrupt:
             print("\n👋 Closing browser...")
         finally:
+            monitor.print_summary()
             if development_mode or config.get('save_log', False):
                 save_dict_to_log(order_dict)
-            input("\nPress Enter to close the browser...")
+            if not config.get('unattended'):
+                input("\nPress Enter to close the browser...")
             browser.close()
 
 if __name__ == "__main__":
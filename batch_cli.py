@@ -0,0 +1,207 @@
+"""
+Batch Refund CLI
+----------------
+
+Claims refunds for order IDs or order detail URLs streamed from files or
+stdin, without any interactive setup. Input is read lazily and processed in
+chunks, so large lists start right away; duplicate orders (by orderId) are
+skipped.
+
+Input formats (by extension, '-' reads stdin):
+    .csv     Column named orderId/order_id/order/url/order_url, else the first column
+    .jsonl   One object per line with one of those keys, or a bare ID/URL string
+    other    One order ID or URL per line (JSON objects are accepted too)
+
+Config file (JSON), any default_config() key plus chunk_size:
+    {
+        "image_path": "proof.jpg",
+        "refund_message": "...",
+        "refund_message_2": "...",
+        "max_concurrency": 4,
+        "chunk_size": 50,
+        "save_log": true
+    }
+
+Usage:
+    python batch_cli.py orders.csv --config batch.json
+    cat ids.txt | python batch_cli.py - --config batch.json --chunk-size 100
+    python batch_cli.py export.jsonl --image proof.jpg --headless
+"""
+
+import argparse
+import csv
+import json
+import logging
+import sys
+import time
+from itertools import chain, islice
+
+from playwright.sync_api import sync_playwright
+from ali_refund_claimer import (CONTEXT_OPTIONS, default_config, load_config_file, normalize_order, process_batch,
+                                save_dict_to_log)
+from login_handler import LoginHandler
+from memory_monitor import MemoryMonitor, recycle_context
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 50
+
+# Record fields that may hold the order, in order of preference
+ORDER_FIELDS = ('orderId', 'order_id', 'order', 'url', 'order_url')
+
+
+def _value_from_record(record) -> str:
+    if isinstance(record, dict):
+        for field in ORDER_FIELDS:
+            if record.get(field):
+                return str(record[field])
+        return None
+    return str(record)
+
+
+def _read_lines(f):
+    """Plain and JSONL input: one ID/URL or JSON value per line"""
+    for line in f:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line[0] in '{["':
+            try:
+                line = _value_from_record(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning(f"Skipping malformed JSON line: {line[:80]}")
+                continue
+        if line:
+            yield line
+
+
+def _read_csv(f):
+    """CSV input: use a known column if the first row is a header, else the first column"""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    column = next((header.index(field) for field in ORDER_FIELDS if field in header), None)
+    if column is None:
+        column = 0
+        reader = chain([header], reader)  # No header, the first row is data
+    for row in reader:
+        if len(row) > column and row[column].strip():
+            yield row[column]
+
+
+def iter_values(sources: list[str]):
+    """Raw order values from every source, in order, read lazily"""
+    for source in sources:
+        if source == '-':
+            yield from _read_lines(sys.stdin)
+            continue
+        with open(source, 'r', newline='') as f:
+            if source.endswith('.csv'):
+                yield from _read_csv(f)
+            else:
+                yield from _read_lines(f)
+
+
+def iter_orders(sources: list[str], stats: dict = None):
+    """
+    Unique (order_id, detail URL) pairs from the sources.
+    stats, if given, counts 'orders', 'duplicates' and 'invalid' values.
+    """
+    stats = stats if stats is not None else {}
+    for key in ('orders', 'duplicates', 'invalid'):
+        stats.setdefault(key, 0)
+    seen = set()
+    for value in iter_values(sources):
+        order = normalize_order(value)
+        if order is None:
+            stats['invalid'] += 1
+            logger.warning(f"Skipping unrecognised order value: {value[:80]}")
+            continue
+        if order[0] in seen:
+            stats['duplicates'] += 1
+            continue
+        seen.add(order[0])
+        stats['orders'] += 1
+        yield order
+
+
+def chunked(iterable, size: int):
+    """Lists of up to size items, pulled from iterable only as needed"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Claim refunds for order IDs/URLs from files or stdin")
+    parser.add_argument('sources', nargs='+', help="CSV, JSONL or text files; '-' for stdin")
+    parser.add_argument('--config', help="JSON config file (image_path, messages, max_concurrency, chunk_size, ...)")
+    parser.add_argument('--image', help="Proof image (overrides the config file)")
+    parser.add_argument('--chunk-size', type=int, help=f"Orders per batch (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--max-concurrency', type=int)
+    parser.add_argument('--interactive', action='store_true', help="Ask about problem orders instead of retrying")
+    parser.add_argument('--headless', action='store_true')
+    args = parser.parse_args()
+
+    try:
+        config = load_config_file(args.config, extra_keys=('chunk_size',)) if args.config else default_config()
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if args.image:
+        config['image_path'] = args.image
+    if args.max_concurrency:
+        config['max_concurrency'] = args.max_concurrency
+    if not config.get('image_path'):
+        parser.error("a proof image is required (--image or image_path in --config)")
+    config['unattended'] = not args.interactive
+    chunk_size = config.pop('chunk_size', DEFAULT_CHUNK_SIZE)
+    if args.chunk_size:
+        chunk_size = args.chunk_size
+
+    stats = {}
+    totals = {}
+    start = time.perf_counter()
+    monitor = MemoryMonitor.from_config(config)
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=args.headless, args=['--disable-blink-features=AutomationControlled'])
+        context = browser.new_context(**CONTEXT_OPTIONS)
+        page = context.new_page()
+        try:
+            LoginHandler(page).login()
+            for n, chunk in enumerate(chunked(iter_orders(args.sources, stats), chunk_size), 1):
+                print(f"\n📦 Chunk {n}: {len(chunk)} orders ({stats['orders']} read so far)")
+                order_dict = process_batch(page, [url for _, url in chunk], config, report_timings=False)
+                for data in order_dict.values():
+                    status = data.get('status', 'failed')
+                    totals[status] = totals.get(status, 0) + 1
+                if config.get('save_log'):
+                    save_dict_to_log(order_dict)
+                if monitor.over_watermark(context):
+                    context, page = recycle_context(browser, context, CONTEXT_OPTIONS, monitor)
+        except KeyboardInterrupt:
+            print("\n👋 Interrupted")
+        finally:
+            browser.close()
+
+    # Timings accumulate over all chunks (bounded samples) and are reported once
+    timer.print_summary()
+    if config.get('timing_export'):
+        timer.export(config['timing_export'])
+    monitor.print_summary()
+    print("\n" + "="*50)
+    print("📊 Batch Totals")
+    print("="*50)
+    print(f"\n📥 {stats.get('orders', 0)} orders read, {stats.get('duplicates', 0)} duplicates, "
+          f"{stats.get('invalid', 0)} invalid")
+    for status, count in sorted(totals.items(), key=lambda item: -item[1]):
+        print(f"  • {status.replace('_', ' ').title()}: {count}")
+    print(f"\n⏱️ Finished in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Offline Benchmark
+-----------------
+
+Runs the real collector and refunder against the local mock AliExpress server
+and reports throughput, so speedups and regressions show up as numbers.
+
+Usage:
+    python benchmark.py                        # Default fixtures, no latency
+    python benchmark.py --orders 30 --latency 0.3 --upload-delay 1.5
+    python benchmark.py --output bench.json    # Save results for comparison
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+
+from playwright.sync_api import sync_playwright
+from ali_refund_claimer import create_order_dict, DEFAULT_REFUND_MESSAGE, DEFAULT_REFUND_MESSAGE_2
+from mock_server import MockAliExpress, MockServer, DEFAULT_ORDERS, THUMBNAIL_PNG, generate_orders
+from refund_link_collector import handle_refund_process
+from refunder import process_refunds
+from throttle import AdaptiveController, DEFAULT_RATE, DEFAULT_MAX_RATE, DEFAULT_MAX_CONCURRENCY
+from status_api import StatusClient
+from evidence_cache import EvidenceCache
+from page_pool import PagePool, TabHandoff, DEFAULT_HANDOFF_TABS
+from timing import timer
+
+
+def per_minute(count: int, seconds: float) -> float:
+    return count / seconds * 60 if seconds > 0 else 0.0
+
+
+def run_benchmark(orders: dict, latency: float = 0.0, jitter: float = 0.0,
+                  upload_delay: float = 0.0, headless: bool = True, controller_config: dict = None,
+                  fast_status: bool = True, reuse_upload: bool = True,
+                  handoff_tabs: int = DEFAULT_HANDOFF_TABS) -> dict:
+    """Run one collect + refund pass against a fresh mock site and return the numbers"""
+    site = MockAliExpress(orders, latency, jitter, upload_delay)
+
+    with tempfile.TemporaryDirectory() as tmp_dir, MockServer(site) as server, sync_playwright() as p:
+        image_path = os.path.join(tmp_dir, 'proof.png')
+        with open(image_path, 'wb') as f:
+            f.write(THUMBNAIL_PNG)
+
+        browser = p.chromium.launch(headless=headless)
+        context = browser.new_context(viewport={'width': 1280, 'height': 1080}, locale='en-US')
+        page = context.new_page()
+        page.goto(server.order_list_url)
+        timer.reset()
+
+        order_dict = create_order_dict([server.order_url(order_id) for order_id in orders])
+        controller = AdaptiveController.from_config(controller_config or {})
+        pool = PagePool(context, max_size=controller.max_concurrency)
+        handoff = TabHandoff(pool, handoff_tabs) if handoff_tabs else None
+
+        start = time.perf_counter()
+        order_dict = handle_refund_process(page, order_dict, order_list_url=server.order_list_url,
+                                           controller=controller, pool=pool, handoff=handoff)
+        collect_seconds = time.perf_counter() - start
+
+        # Orders without links would stop on the interactive menu, so only benchmark the rest
+        with_links = {order_id: data for order_id, data in order_dict.items() if data['refund_urls']}
+        refund_count = sum(len(data['refund_urls']) for data in with_links.values())
+
+        start = time.perf_counter()
+        with_links = process_refunds(
+            page=page,
+            order_dict=with_links,
+            image_path=image_path,
+            refund_message=DEFAULT_REFUND_MESSAGE,
+            refund_message_2=DEFAULT_REFUND_MESSAGE_2,
+            controller=controller,
+            status_client=StatusClient(context) if fast_status else None,
+            evidence=EvidenceCache(context, image_path) if reuse_upload else None,
+            pool=pool,
+            handoff=handoff
+        )
+        refund_seconds = time.perf_counter() - start
+
+        browser.close()
+
+    return {
+        'orders': len(order_dict),
+        'refunds': refund_count,
+        'latency': latency,
+        'jitter': jitter,
+        'upload_delay': upload_delay,
+        'handoff_tabs': handoff_tabs,
+        'collect_seconds': round(collect_seconds, 2),
+        'refund_seconds': round(refund_seconds, 2),
+        'orders_per_min': round(per_minute(len(order_dict), collect_seconds), 2),
+        'refunds_per_min': round(per_minute(refund_count, refund_seconds), 2),
+        'statuses': dict(Counter(data.get('status', 'unknown') for data in with_links.values())),
+        'timings': timer.summary(),
+    }
+
+
+def print_results(results: dict):
+    print("\n" + "="*50)
+    print("🏁 Benchmark Results")
+    print("="*50)
+    print(f"\n📦 Orders: {results['orders']}  |  Refund items: {results['refunds']}")
+    print(f"🌐 Latency: {results['latency']}s (+{results['jitter']}s jitter)  |  Upload delay: {results['upload_delay']}s")
+    print(f"\n📋 handle_refund_process: {results['collect_seconds']:.1f}s → {results['orders_per_min']:.1f} orders/min")
+    print(f"🎯 process_refunds:       {results['refund_seconds']:.1f}s → {results['refunds_per_min']:.1f} refunds/min")
+    print("\nFinal statuses:")
+    for status, count in sorted(results['statuses'].items()):
+        print(f"  • {status}: {count}")
+    timer.print_summary()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the refund pipeline against a local mock server")
+    parser.add_argument('--orders', type=int, default=0, help="Generate this many orders instead of the default fixtures")
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--upload-delay', type=float, default=0.0)
+    parser.add_argument('--rate', type=float, default=DEFAULT_RATE, help="Initial navigations per second")
+    parser.add_argument('--max-rate', type=float, default=DEFAULT_MAX_RATE)
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY)
+    parser.add_argument('--no-fast-status', action='store_true', help="Always render reverse-pages for status")
+    parser.add_argument('--no-reuse-upload', action='store_true', help="Upload the proof image for every form")
+    parser.add_argument('--handoff-tabs', type=int, default=DEFAULT_HANDOFF_TABS,
+                        help="Collected refund tabs kept open for the refunder (0 reloads every page)")
+    parser.add_argument('--headed', action='store_true', help="Show the browser window")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    orders = generate_orders(args.orders) if args.orders else DEFAULT_ORDERS
+    controller_config = {'rate_limit': args.rate, 'max_rate': args.max_rate, 'max_concurrency': args.max_concurrency}
+    results = run_benchmark(orders, args.latency, args.jitter, args.upload_delay, headless=not args.headed,
+                            controller_config=controller_config, fast_status=not args.no_fast_status,
+                            reuse_upload=not args.no_reuse_upload, handoff_tabs=args.handoff_tabs)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n📝 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,18 @@
 from playwright.sync_api import Page
 import logging
 import traceback
+import weakref
 
 logger = logging.getLogger(__name__)
 
+# Pages that already forward browser DEBUG: console messages
+_console_pages = weakref.WeakSet()
+
+def handle_console(msg):
+    """Filter console messages to only show our debug messages"""
+    if msg.text.startswith('DEBUG:'):
+        print(f"BROWSER: {msg.text}")
+
 def add_checkboxes_to_orders(page: Page):
     """Add selection buttons to orders and process button"""
     try:
@@ -12,12 +21,10 @@ def add_checkboxes_to_orders(page: Page):
         # Wait for orders to be visible first
         page.wait_for_selector('.order-item', timeout=10000)
         
-        # Filter console messages to only show our debug messages
-        def handle_console(msg):
-            if msg.text.startswith('DEBUG:'):
-                print(f"BROWSER: {msg.text}")
-                
-        page.on("console", handle_console)
+        # Register the console filter once per page, not on every call
+        if page not in _console_pages:
+            page.on("console", handle_console)
+            _console_pages.add(page)
         
         # Check if buttons are already added
         existing_buttons = page.locator('.selection-button').count()
@@ -85,10 +92,12 @@ def add_checkboxes_to_orders(page: Page):
             // Add buttons to all orders
             document.querySelectorAll('.order-item').forEach(addButtonToOrder);
             
-            // Keep checking for new orders
-            setInterval(() => {
+            // Keep checking for new orders with a single timer that stops when the page goes away
+            if (window.selectionInterval) clearInterval(window.selectionInterval);
+            window.selectionInterval = setInterval(() => {
                 document.querySelectorAll('.order-item').forEach(addButtonToOrder);
             }, 1000);
+            window.addEventListener('pagehide', () => clearInterval(window.selectionInterval), {once: true});
         }''')
         
         # Verify buttons were added
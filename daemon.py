@@ -0,0 +1,454 @@
+"""
+Refund Daemon
+-------------
+
+Long-running mode with a persistent work queue of orders and refund URLs.
+Queued orders are claimed in scheduled passes (nightly and/or as they arrive)
+and previous runs are swept for status changes periodically. The browser is
+only started when there is work, unless --warm keeps one logged in.
+
+New work can be added while the daemon runs, without a restart:
+    - append order IDs, detail URLs or reverse-pages URLs to the inbox file
+    - send "add <id or url>" to the local command port
+
+Usage:
+    python daemon.py --image proof.jpg                              # Claim at 02:00, sweep every 6h
+    python daemon.py --image proof.jpg --claim-on-arrival --warm    # Claim as soon as work arrives
+    python daemon.py --add 3044357010127135                         # Queue an order on a running daemon
+    python daemon.py --command status                               # Queue counts of a running daemon
+    echo 3044357010127135 >> daemon_inbox.txt                       # Queue via the inbox file
+
+Commands on the port (one per line, JSON reply): add <id|url>, status, claim, sweep, stop
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from datetime import datetime, timedelta
+
+from playwright.sync_api import sync_playwright
+from ali_refund_claimer import (CONTEXT_OPTIONS, DEFAULT_REFUND_MESSAGE, DEFAULT_REFUND_MESSAGE_2, default_config,
+                                normalize_order, print_final_summary, process_batch, save_dict_to_log,
+                                submit_refunds)
+from login_handler import LoginHandler
+from memory_monitor import MemoryMonitor, recycle_context
+from status_sweep import run_sweep
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+QUEUE_PATH = 'daemon_queue.json'
+INBOX_PATH = 'daemon_inbox.txt'
+COMMAND_PORT = 8765
+POLL_SECONDS = 5
+CLAIM_AT = '02:00'        # Local time of the nightly claim pass
+SWEEP_EVERY_HOURS = 6     # 0 disables periodic sweeps
+MAX_CLAIM_ATTEMPTS = 3    # Claim passes an item may fail before it is left as failed
+FAILED_PASS_BACKOFF = 300       # Seconds before claiming on arrival again after a pass crashed, doubling
+MAX_FAILED_PASS_BACKOFF = 4 * 3600
+
+# Order statuses after a pass that need no further claiming
+DONE_STATUSES = ('refund_submitted', 'evidence_submitted', 'refund_ongoing', 'already_issued')
+
+
+def parse_work_item(value: str):
+    """
+    Classify one line of input.
+    Returns:
+        tuple: (key, kind, url) with kind 'order' or 'refund', or None if unrecognised
+    """
+    value = value.strip()
+    if not value or value.startswith('#'):
+        return None
+    if 'reverse-pages' in value:
+        key = value.split('reverseOrderLineId=')[1].split('&')[0] if 'reverseOrderLineId=' in value else value
+        return f"refund:{key}", 'refund', value
+    order = normalize_order(value)
+    if order is None:
+        return None
+    order_id, url = order
+    return order_id, 'order', url
+
+
+class WorkQueue:
+    """
+    Orders and refund URLs waiting to be claimed, persisted as JSON after every
+    change so a restarted daemon picks up where it stopped. Safe to add to from
+    the command server thread.
+    """
+
+    def __init__(self, path: str = QUEUE_PATH, max_attempts: int = MAX_CLAIM_ATTEMPTS):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.lock = threading.Lock()
+        self.items = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self.items = json.load(f)
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self.items, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def add(self, value: str) -> bool:
+        """Queue an order ID/URL or refund URL; already queued or finished items are skipped"""
+        parsed = parse_work_item(value)
+        if parsed is None:
+            return False
+        key, kind, url = parsed
+        with self.lock:
+            if key in self.items and self.items[key]['state'] != 'failed':
+                return False
+            self.items[key] = {
+                'kind': kind,
+                'url': url,
+                'state': 'pending',
+                'attempts': 0,
+                'added': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'status': None,
+            }
+            self._save()
+        logger.info(f"Queued {kind} {key}")
+        return True
+
+    def pending(self, kind: str = None) -> dict:
+        with self.lock:
+            return {key: dict(item) for key, item in self.items.items()
+                    if item['state'] == 'pending' and (kind is None or item['kind'] == kind)}
+
+    def record(self, key: str, status: str, detail: str = ''):
+        """Store the outcome of a claim pass for one item"""
+        with self.lock:
+            item = self.items[key]
+            item['attempts'] += 1
+            item['status'] = status
+            item['detail'] = detail
+            item['last_attempt'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if status in DONE_STATUSES:
+                item['state'] = 'done'
+            elif item['attempts'] >= self.max_attempts:
+                item['state'] = 'failed'
+            self._save()
+
+    def counts(self) -> dict:
+        counts = {'pending': 0, 'done': 0, 'failed': 0}
+        with self.lock:
+            for item in self.items.values():
+                counts[item['state']] += 1
+        return counts
+
+
+def read_inbox(path: str, queue: WorkQueue) -> int:
+    """Move every line of the inbox file into the queue; returns how many were new"""
+    if not os.path.exists(path):
+        return 0
+    claimed = f"{path}.processing"
+    os.replace(path, claimed)  # Writers appending after this start a fresh inbox
+    with open(claimed, 'r') as f:
+        added = sum(queue.add(line) for line in f)
+    os.remove(claimed)
+    if added:
+        print(f"📥 {added} new items from {path}")
+    return added
+
+
+class CommandServer(socketserver.ThreadingTCPServer):
+    """Line-based control port on localhost; only touches the queue and the daemon's flags"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, daemon, port: int):
+        self.daemon = daemon
+        super().__init__(('127.0.0.1', port), CommandHandler)
+
+
+class CommandHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            command, _, arg = raw.decode('utf-8').strip().partition(' ')
+            reply = self.server.daemon.command(command.lower(), arg)
+            self.wfile.write((json.dumps(reply) + '\n').encode('utf-8'))
+
+
+def send_command(command: str, port: int = COMMAND_PORT) -> dict:
+    """Send one command to a running daemon and return its reply"""
+    with socket.create_connection(('127.0.0.1', port), timeout=10) as sock:
+        sock.sendall((command + '\n').encode('utf-8'))
+        return json.loads(sock.makefile('r').readline())
+
+
+class BrowserSession:
+    """Logged-in browser that is started on first use and can be closed between passes"""
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.page = None
+
+    @property
+    def running(self) -> bool:
+        return self.browser is not None
+
+    def start(self):
+        if self.running:
+            return self.page
+        print("\n🌐 Launching browser...")
+        self.playwright = sync_playwright().start()
+        self.browser = self.playwright.chromium.launch(
+            headless=self.headless,
+            args=['--disable-blink-features=AutomationControlled']
+        )
+        self.context = self.browser.new_context(**CONTEXT_OPTIONS)
+        self.page = self.context.new_page()
+        try:
+            LoginHandler(self.page).login()
+        except Exception:
+            self.stop()
+            raise
+        return self.page
+
+    def recycle_if_needed(self, monitor: MemoryMonitor):
+        """Swap in a fresh, still logged-in context once memory crosses the watermark"""
+        if self.running and monitor.over_watermark(self.context):
+            self.context, self.page = recycle_context(self.browser, self.context, CONTEXT_OPTIONS, monitor)
+
+    def stop(self):
+        if self.browser is not None:
+            print("🌙 Closing browser")
+            try:
+                self.browser.close()
+            except Exception as e:
+                logger.debug(f"Browser close failed: {e}")
+        if self.playwright is not None:
+            self.playwright.stop()
+        self.playwright = self.browser = self.context = self.page = None
+
+
+def next_daily(at: str, now: datetime) -> datetime:
+    """Next occurrence of HH:MM after now"""
+    hour, minute = (int(part) for part in at.split(':'))
+    run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    return run if run > now else run + timedelta(days=1)
+
+
+class RefundDaemon:
+    """Runs claim passes and sweeps on a schedule until stopped"""
+
+    def __init__(self, config: dict, queue: WorkQueue, claim_at: str = CLAIM_AT,
+                 sweep_every: float = SWEEP_EVERY_HOURS, claim_on_arrival: bool = False,
+                 warm: bool = False, headless: bool = True, inbox: str = INBOX_PATH):
+        self.config = config
+        self.queue = queue
+        self.claim_at = claim_at
+        self.sweep_every = sweep_every
+        self.claim_on_arrival = claim_on_arrival
+        self.warm = warm
+        self.failed_claims = 0
+        self.claim_backoff_until = None
+        self.inbox = inbox
+        self.session = BrowserSession(headless=headless)
+        self.monitor = MemoryMonitor.from_config(config)
+        self.stopping = threading.Event()
+        self.wake = threading.Event()
+        self.requested = set()
+
+        now = datetime.now()
+        self.next_claim = next_daily(claim_at, now) if claim_at else None
+        self.next_sweep = now + timedelta(hours=sweep_every) if sweep_every else None
+
+    def command(self, command: str, arg: str) -> dict:
+        """Handle a control command; called from the command server thread"""
+        if command == 'add':
+            added = [value for value in arg.split() if self.queue.add(value)]
+            if added and self.claim_on_arrival:
+                self.wake.set()
+            return {'added': len(added), **self.queue.counts()}
+        if command == 'status':
+            return {
+                **self.queue.counts(),
+                'browser': self.session.running,
+                'next_claim': self.next_claim.isoformat(timespec='minutes') if self.next_claim else None,
+                'next_sweep': self.next_sweep.isoformat(timespec='minutes') if self.next_sweep else None,
+                'claims_paused_until': (self.claim_backoff_until.isoformat(timespec='minutes')
+                                        if self.claim_backoff_until else None),
+            }
+        if command in ('claim', 'sweep'):
+            self.requested.add(command)
+            self.wake.set()
+            return {'scheduled': command}
+        if command == 'stop':
+            if not self.stopping.is_set():
+                self.stop()
+            return {'stopping': True}
+        return {'error': f"unknown command: {command}"}
+
+    def stop(self, *_):
+        if self.stopping.is_set():
+            raise KeyboardInterrupt  # Second signal: don't wait for the running pass
+        print("\n👋 Stopping after the current pass...")
+        self.stopping.set()
+        self.wake.set()
+
+    def claim_pass(self):
+        """Claim every pending order and refund URL in one batch"""
+        orders = self.queue.pending('order')
+        refunds = self.queue.pending('refund')
+        if not orders and not refunds:
+            return
+        print(f"\n🎯 Claim pass: {len(orders)} orders, {len(refunds)} refund URLs")
+        page = self.session.start()
+
+        order_dict = {}
+        if orders:
+            order_dict.update(process_batch(page, [item['url'] for item in orders.values()], self.config))
+        if refunds:
+            refund_dict = {key: {'order_url': None, 'refund_urls': [item['url']], 'refund_state': None}
+                           for key, item in refunds.items()}
+            refund_dict = submit_refunds(page, refund_dict, self.config)
+            print_final_summary(refund_dict)
+            order_dict.update(refund_dict)
+
+        for key in list(orders) + list(refunds):
+            data = order_dict.get(key, {})
+            self.queue.record(key, data.get('status', 'failed'), data.get('status_detail', ''))
+        save_dict_to_log({key: data for key, data in order_dict.items() if data.get('refund_urls')})
+
+    def sweep_pass(self):
+        paths = glob.glob('log_*.json')
+        if not paths:
+            return
+        print(f"\n🔍 Sweep over {len(paths)} run logs")
+        self.session.start()
+        run_sweep(self.session.context, paths, self.config['image_path'], self.config['refund_message_2'])
+
+    def back_off_claims(self):
+        """
+        A claim pass crashed (e.g. login failed) before recording its items, so
+        they would look new again; hold off claiming on arrival, doubling each time.
+        """
+        self.failed_claims += 1
+        delay = min(FAILED_PASS_BACKOFF * 2 ** (self.failed_claims - 1), MAX_FAILED_PASS_BACKOFF)
+        self.claim_backoff_until = datetime.now() + timedelta(seconds=delay)
+        print(f"⏸️ Claim pass failed {self.failed_claims}x in a row, "
+              f"not claiming on arrival before {self.claim_backoff_until:%H:%M}")
+
+    def due(self) -> list[str]:
+        """Passes to run now, updating the schedule"""
+        now = datetime.now()
+        tasks = set(self.requested)
+        self.requested.clear()
+        if self.next_claim and now >= self.next_claim:
+            tasks.add('claim')
+            self.next_claim = next_daily(self.claim_at, now)
+        backing_off = self.claim_backoff_until is not None and now < self.claim_backoff_until
+        if (self.claim_on_arrival and not backing_off
+                and any(item['attempts'] == 0 for item in self.queue.pending().values())):
+            tasks.add('claim')  # Items that already failed wait for the scheduled pass
+        if self.next_sweep and now >= self.next_sweep:
+            tasks.add('sweep')
+            self.next_sweep = now + timedelta(hours=self.sweep_every)
+        return [task for task in ('claim', 'sweep') if task in tasks]
+
+    def run(self, port: int = COMMAND_PORT):
+        server = CommandServer(self, port)
+        threading.Thread(target=server.serve_forever, name='daemon-commands', daemon=True).start()
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        counts = self.queue.counts()
+        print(f"\n🤖 Daemon running: {counts['pending']} pending, {counts['done']} done, {counts['failed']} failed")
+        print(f"  • Inbox: {self.inbox}  •  Command port: 127.0.0.1:{port}")
+        if self.next_claim:
+            print(f"  • Next claim pass: {self.next_claim:%Y-%m-%d %H:%M}")
+        if self.next_sweep:
+            print(f"  • Next sweep: {self.next_sweep:%Y-%m-%d %H:%M}")
+
+        try:
+            if self.warm:
+                self.session.start()
+            while not self.stopping.is_set():
+                if read_inbox(self.inbox, self.queue) and self.claim_on_arrival:
+                    self.wake.set()
+                for task in self.due():
+                    if self.stopping.is_set():
+                        break
+                    try:
+                        if task == 'claim':
+                            self.claim_pass()
+                            self.failed_claims = 0
+                            self.claim_backoff_until = None
+                        else:
+                            self.sweep_pass()
+                            timer.print_summary()
+                    except Exception as e:
+                        logger.error(f"{task.title()} pass failed: {e}")
+                        self.session.stop()  # Start from a fresh browser next time
+                        if task == 'claim':
+                            self.back_off_claims()
+                    timer.reset()
+                if not self.warm and self.session.running:
+                    self.session.stop()
+                self.session.recycle_if_needed(self.monitor)
+                self.wake.wait(POLL_SECONDS)
+                self.wake.clear()
+        except KeyboardInterrupt:
+            print("\n🛑 Interrupted")
+        finally:
+            server.shutdown()
+            server.server_close()
+            self.session.stop()
+            self.monitor.print_summary()
+            print("👋 Daemon stopped")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Long-running refund daemon with a persistent work queue")
+    parser.add_argument('--image', help="Proof image used for claims and responses")
+    parser.add_argument('--message', default=DEFAULT_REFUND_MESSAGE, help="Initial refund message")
+    parser.add_argument('--message-2', default=DEFAULT_REFUND_MESSAGE_2, help="Disagreement message")
+    parser.add_argument('--queue', default=QUEUE_PATH)
+    parser.add_argument('--inbox', default=INBOX_PATH)
+    parser.add_argument('--port', type=int, default=COMMAND_PORT)
+    parser.add_argument('--claim-at', default=CLAIM_AT, help="Daily claim pass time HH:MM ('' to disable)")
+    parser.add_argument('--sweep-every', type=float, default=SWEEP_EVERY_HOURS, help="Hours between sweeps (0 disables)")
+    parser.add_argument('--claim-on-arrival', action='store_true', help="Claim new work as soon as it is queued")
+    parser.add_argument('--warm', action='store_true', help="Keep a logged-in browser open between passes")
+    parser.add_argument('--headed', action='store_true')
+    parser.add_argument('--add', nargs='+', metavar='ORDER', help="Queue orders on a running daemon and exit")
+    parser.add_argument('--command', help="Send a command to a running daemon and exit")
+    args = parser.parse_args()
+
+    if args.add or args.command:
+        command = f"add {' '.join(args.add)}" if args.add else args.command
+        print(json.dumps(send_command(command, args.port), indent=2))
+        return
+
+    if not args.image or not os.path.exists(args.image):
+        parser.error("--image must point to an existing proof image")
+
+    config = {
+        **default_config(),
+        'image_path': args.image,
+        'refund_message': args.message,
+        'refund_message_2': args.message_2,
+        'unattended': True,
+        'resolve_at_end': False,
+    }
+    daemon = RefundDaemon(config, WorkQueue(args.queue), claim_at=args.claim_at, sweep_every=args.sweep_every,
+                          claim_on_arrival=args.claim_on_arrival, warm=args.warm, headless=not args.headed,
+                          inbox=args.inbox)
+    daemon.run(args.port)
+
+
+if __name__ == "__main__":
+    main()
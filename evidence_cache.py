@@ -0,0 +1,153 @@
+import json
+import logging
+import os
+from urllib.parse import urlparse
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+# Bytes of the proof image used to recognise its upload in a request body
+SIGNATURE_BYTES = 256
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+
+
+def find_asset_reference(payload) -> str:
+    """First URL or image path anywhere in an upload response, or None"""
+    stack = [payload]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, str):
+            if value.startswith(('http://', 'https://', '//')) or value.lower().split('?')[0].endswith(IMAGE_EXTENSIONS):
+                return value
+    return None
+
+
+class EvidenceCache:
+    """
+    Uploads the proof image once per batch. The first upload the refund pages
+    make is watched; if its response carries a stored asset reference, later
+    uploads of the same image are answered with that response. The route is
+    only armed on the uploading page around set_input_files (routing turns off
+    the HTTP cache, so it must not stay on for page loads). A reuse counts once
+    the form using it was accepted; reject() switches back to real uploads.
+    """
+
+    def __init__(self, context, image_path: str):
+        self.context = context
+        self.image_path = image_path
+        with open(image_path, 'rb') as f:
+            self.signature = f.read(SIGNATURE_BYTES)
+        self.stored = None
+        self.rejected = False
+        self.reused = 0
+        self.confirmed = 0
+        self._watching = False
+
+    @classmethod
+    def from_config(cls, context, config: dict):
+        if not config.get('reuse_upload', True) or not config.get('image_path'):
+            return None
+        return cls(context, config['image_path'])
+
+    @property
+    def serving(self) -> bool:
+        """Whether uploads are currently answered from the stored response"""
+        return self.stored is not None and not self.rejected
+
+    def _is_upload(self, request) -> bool:
+        if request.method != 'POST':
+            return False
+        try:
+            body = request.post_data_buffer
+        except Exception:
+            return False
+        return bool(body) and self.signature in body
+
+    def watch(self):
+        """Start looking for the first upload of the proof image"""
+        if not self._watching and self.stored is None and not self.rejected:
+            self.context.on('response', self._on_response)
+            self._watching = True
+
+    def stop_watching(self):
+        if self._watching:
+            self.context.remove_listener('response', self._on_response)
+            self._watching = False
+
+    def _on_response(self, response):
+        request = response.request
+        if self.stored is not None or not self._is_upload(request):
+            return
+        try:
+            body = response.body()
+            reference = find_asset_reference(json.loads(body))
+        except Exception:
+            reference = None
+        if not response.ok or not reference:
+            logger.debug(f"Upload response from {urlparse(request.url).path} has no asset reference, not reusing")
+            return
+
+        url = urlparse(request.url)
+        self.stored = {
+            'path': url.path,
+            'glob': f"{url.scheme}://{url.netloc}{url.path}*",
+            'status': response.status,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() != 'content-length'},
+            'body': body,
+            'reference': reference,
+        }
+        self.stop_watching()
+        logger.info(f"Reusing uploaded evidence {reference} for the rest of the batch")
+        print(f"  • ⚡ Proof image stored as {reference}, reusing it for later uploads")
+
+    def arm(self, page) -> bool:
+        """Answer the next upload on page from the stored response; False if not serving"""
+        if not self.serving:
+            return False
+        page.route(self.stored['glob'], self._handle_route)
+        return True
+
+    def disarm(self, page):
+        try:
+            page.unroute(self.stored['glob'], self._handle_route)
+        except Exception as e:
+            logger.debug(f"Unroute failed: {e}")
+
+    def confirm(self):
+        """The form that used the stored reference was accepted"""
+        self.confirmed += 1
+
+    def _handle_route(self, route):
+        request = route.request
+        if not self.serving or not self._is_upload(request):
+            return route.fallback()
+        self.reused += 1
+        with timer.span('upload_reused', 'reverse_pages'):
+            route.fulfill(status=self.stored['status'], headers=self.stored['headers'], body=self.stored['body'])
+
+    def reject(self, reason: str = ''):
+        """Stop serving the stored reference; later items upload normally"""
+        if not self.serving:
+            return
+        self.rejected = True
+        logger.warning(f"Stored evidence reference rejected ({reason or 'unknown'}), uploading normally again")
+        print("  • ⚠️ Stored proof image was not accepted, falling back to normal uploads")
+
+    def close(self):
+        self.stop_watching()
+
+    def print_summary(self):
+        if self.stored is not None:
+            state = ', then rejected' if self.rejected else ''
+            print(f"\n🖼️ Evidence: uploaded once, {self.reused} uploads answered from {self.stored['reference']} "
+                  f"({self.confirmed} accepted){state}")
+
+
+def reuse_upload_default() -> bool:
+    """Upload-once evidence reuse is on unless REUSE_UPLOAD=0"""
+    return os.getenv('REUSE_UPLOAD', '1') != '0'
@@ -1,7 +1,8 @@
 from playwright.sync_api import Page
 import json
-import time
 import logging
+from timing import timer
+from selector_registry import registry
 
 logger = logging.getLogger(__name__)
 
@@ -27,7 +28,8 @@ class LoginHandler:
             raise Exception("Failed to load credentials!")
 
         logger.debug("Navigating to login page")
-        self.page.goto('https://login.aliexpress.com/')
+        with timer.span('goto', 'login'):
+            self.page.goto('https://login.aliexpress.com/')
         
         logger.debug("Entering credentials")
         self.page.locator('input[type="text"]').fill(email)
@@ -36,7 +38,8 @@ class LoginHandler:
         self.page.keyboard.press('Enter')
         
         print("  • Waiting for login completion...")
-        self.page.wait_for_url('**/de.aliexpress.com/**', timeout=120000)
+        with timer.span('wait_login', 'login'):
+            self.page.wait_for_url('**/de.aliexpress.com/**', timeout=120000)
         print("  • ✅ Login successful")
 
     def navigate_to_orders(self):
@@ -44,22 +47,25 @@ class LoginHandler:
         print("\n📑 Preparing orders page...")
         
         logger.debug("Navigating to orders page")
-        self.page.goto('https://www.aliexpress.com/p/order/index.html')
-        self.page.wait_for_load_state('networkidle')
+        with timer.span('goto', 'order_list'):
+            self.page.goto('https://www.aliexpress.com/p/order/index.html')
+        with timer.span('networkidle', 'order_list'):
+            self.page.wait_for_load_state('networkidle')
         
         # Change language to English
         try:
             logger.debug("Attempting to change language to English")
-            self.page.locator('.ship-to--simpleMenuItem--2ARVOMW').click()
-            self.page.locator('.select--text--1b85oDo').nth(1).click()
-            self.page.locator('.select--item--32FADYB:has-text("English")').click()
-            self.page.locator('.es--saveBtn--w8EuBuy').click()
+            registry.wait(self.page, 'language_menu', timeout=10000).click()
+            self.page.locator(registry.selector('language_select')).nth(1).click()
+            registry.wait(self.page, 'language_item', "English", timeout=10000).click()
+            registry.wait(self.page, 'language_save', timeout=10000).click()
             print("  • Language set to English")
             
             logger.debug("Waiting for page to stabilize after language change")
-            time.sleep(3)
+            timer.sleep(3, 'order_list')
             
-            self.page.wait_for_load_state('networkidle')
+            with timer.span('networkidle', 'order_list'):
+                self.page.wait_for_load_state('networkidle')
             
         except Exception as e:
             logger.warning(f"Could not change language: {e}")
@@ -68,7 +74,8 @@ class LoginHandler:
         try:
             logger.debug("Checking for cookie prompt")
             accept_button = self.page.locator('.btn-accept')
-            accept_button.wait_for(state='visible', timeout=5000)
+            with timer.span('cookie_prompt', 'order_list'):
+                accept_button.wait_for(state='visible', timeout=5000)
             accept_button.click()
             logger.debug("Accepted cookies")
         except Exception:
@@ -76,6 +83,7 @@ class LoginHandler:
 
         # Wait for order page elements
         logger.debug("Waiting for order page elements")
-        self.page.wait_for_selector('.order-item', timeout=10000)
-        self.page.wait_for_selector('.order-item-btns', timeout=10000)
+        with timer.span('wait_selector', 'order_list'):
+            self.page.wait_for_selector('.order-item', timeout=10000)
+            self.page.wait_for_selector('.order-item-btns', timeout=10000)
         print("  • ✅ Orders page ready") 
\ No newline at end of file
@@ -0,0 +1,192 @@
+import logging
+import os
+import resource
+import sys
+import time
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+# Defaults (MB / seconds); overridable via MEMORY_WATERMARK_MB, PY_MEMORY_WATERMARK_MB, MEMORY_SAMPLE_SECONDS
+DEFAULT_BROWSER_WATERMARK_MB = 1500
+DEFAULT_PYTHON_WATERMARK_MB = 500
+DEFAULT_SAMPLE_SECONDS = 30
+MAX_BACKOFF_SECONDS = 1800  # Longest pause between recycles that leave the browser over its watermark
+
+MB = 1024 * 1024
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def memory_defaults() -> dict:
+    """Memory watermark config keys, read from the environment"""
+    return {
+        'memory_watermark_mb': float(os.getenv('MEMORY_WATERMARK_MB', DEFAULT_BROWSER_WATERMARK_MB)),
+        'py_memory_watermark_mb': float(os.getenv('PY_MEMORY_WATERMARK_MB', DEFAULT_PYTHON_WATERMARK_MB)),
+        'memory_sample_seconds': float(os.getenv('MEMORY_SAMPLE_SECONDS', DEFAULT_SAMPLE_SECONDS)),
+    }
+
+
+def _rss_from_proc(pid) -> int:
+    with open(f'/proc/{pid}/statm', 'r') as f:
+        return int(f.read().split()[1]) * PAGE_SIZE
+
+
+def python_rss_bytes() -> int:
+    """Current resident memory of this process (peak RSS where /proc is unavailable)"""
+    try:
+        return _rss_from_proc('self')
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def child_process_rss_bytes() -> int:
+    """
+    Summed resident memory of all descendant processes (Playwright driver and
+    every Chromium process it started), or None without /proc.
+    """
+    if not os.path.isdir('/proc'):
+        return None
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # Field 4 is the parent pid; the name in parentheses may contain spaces
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    total = 0
+    stack = list(children.get(os.getpid(), []))
+    while stack:
+        pid = stack.pop()
+        stack.extend(children.get(pid, []))
+        try:
+            total += _rss_from_proc(pid)
+        except OSError:
+            continue
+    return total
+
+
+def js_heap_bytes(context) -> int:
+    """Summed JS heap of the context's open pages (fallback browser measure)"""
+    total = 0
+    for page in context.pages:
+        try:
+            total += page.evaluate('() => (performance.memory && performance.memory.usedJSHeapSize) || 0')
+        except Exception:
+            continue
+    return total
+
+
+class MemoryMonitor:
+    """
+    Samples browser and Python memory at most every sample_seconds. Crossing
+    the browser watermark asks for a context recycle; if a recycle doesn't
+    bring the browser back under it, further recycles back off exponentially.
+    The Python watermark only warns, since a new context can't shrink Python.
+    """
+
+    def __init__(self, browser_watermark_mb: float = DEFAULT_BROWSER_WATERMARK_MB,
+                 python_watermark_mb: float = DEFAULT_PYTHON_WATERMARK_MB,
+                 sample_seconds: float = DEFAULT_SAMPLE_SECONDS):
+        self.browser_watermark = browser_watermark_mb * MB
+        self.python_watermark = python_watermark_mb * MB
+        self.sample_seconds = sample_seconds
+        self.last_sample = 0.0
+        self.last = {}
+        self.peak = {'browser': 0, 'python': 0}
+        self.recycles = 0
+        self.failed_recycles = 0
+        self.backoff_until = 0.0
+        self.python_warned = False
+
+    @classmethod
+    def from_config(cls, config: dict):
+        return cls(
+            browser_watermark_mb=config.get('memory_watermark_mb', DEFAULT_BROWSER_WATERMARK_MB),
+            python_watermark_mb=config.get('py_memory_watermark_mb', DEFAULT_PYTHON_WATERMARK_MB),
+            sample_seconds=config.get('memory_sample_seconds', DEFAULT_SAMPLE_SECONDS),
+        )
+
+    def sample(self, context) -> dict:
+        with timer.span('memory_sample', 'other'):
+            browser = child_process_rss_bytes()
+            if browser is None:
+                browser = js_heap_bytes(context)
+            self.last = {'browser': browser, 'python': python_rss_bytes(), 'pages': len(context.pages)}
+        self.last_sample = time.monotonic()
+        for key in self.peak:
+            self.peak[key] = max(self.peak[key], self.last[key])
+        logger.debug(f"Memory: browser {self.last['browser'] / MB:.0f} MB, python {self.last['python'] / MB:.0f} MB, "
+                     f"{self.last['pages']} pages")
+        return self.last
+
+    def _check_python(self, sample: dict):
+        over = sample['python'] > self.python_watermark
+        if over and not self.python_warned:
+            logger.warning(f"Python memory at {sample['python'] / MB:.0f} MB "
+                           f"(limit {self.python_watermark / MB:.0f}); recycling the browser won't lower it")
+            print(f"  • ⚠️ Python memory at {sample['python'] / MB:.0f} MB, over PY_MEMORY_WATERMARK_MB")
+        self.python_warned = over
+
+    def over_watermark(self, context, force: bool = False) -> bool:
+        """Sample if due (or forced); True if the browser is over its watermark and a recycle is due"""
+        if not force and time.monotonic() - self.last_sample < self.sample_seconds:
+            return False
+        sample = self.sample(context)
+        self._check_python(sample)
+        if sample['browser'] <= self.browser_watermark:
+            self.failed_recycles = 0
+            return False
+        if time.monotonic() < self.backoff_until:
+            logger.debug(f"Browser over watermark, but backing off recycles for "
+                         f"{self.backoff_until - time.monotonic():.0f}s more")
+            return False
+        logger.info(f"Browser memory watermark crossed: {sample['browser'] / MB:.0f} MB "
+                    f"(limit {self.browser_watermark / MB:.0f})")
+        return True
+
+    def recycled(self, context):
+        """Count a recycle; back off if it didn't bring the browser under the watermark"""
+        self.recycles += 1
+        sample = self.sample(context)
+        if sample['browser'] <= self.browser_watermark:
+            self.failed_recycles = 0
+            return
+        self.failed_recycles += 1
+        delay = min((self.sample_seconds or DEFAULT_SAMPLE_SECONDS) * 2 ** self.failed_recycles, MAX_BACKOFF_SECONDS)
+        self.backoff_until = time.monotonic() + delay
+        logger.warning(f"Browser still at {sample['browser'] / MB:.0f} MB after a recycle, "
+                       f"not recycling again for {delay:.0f}s")
+
+    def print_summary(self):
+        if not self.last:
+            return
+        print(f"\n🧠 Memory: peak browser {self.peak['browser'] / MB:.0f} MB, peak python {self.peak['python'] / MB:.0f} MB, "
+              f"{self.recycles} context recycles")
+
+
+def recycle_context(browser, context, options: dict, monitor: MemoryMonitor = None):
+    """
+    Replace context with a fresh one carrying over its cookies and local storage,
+    so the session stays logged in. The first page is reopened at its URL.
+    Returns:
+        tuple: (new context, new page)
+    """
+    print("\n♻️ Recycling browser context to release memory...")
+    with timer.span('context_recycle', 'other'):
+        state = context.storage_state()
+        url = next((p.url for p in context.pages if p.url.startswith('http')), None)
+        context.close()
+        context = browser.new_context(**options, storage_state=state)
+        page = context.new_page()
+        if url:
+            page.goto(url)
+    if monitor is not None:
+        monitor.recycled(context)
+        print(f"  • ✅ Browser now at {monitor.last['browser'] / MB:.0f} MB")
+    return context, page
@@ -0,0 +1,453 @@
+"""
+Local AliExpress Stand-in
+-------------------------
+
+Serves fixture pages that mimic the parts of AliExpress the tool touches:
+login, order list, order detail with 0/1/2 "Returns/refunds" buttons and the
+reverse-pages refund SPA in each state the refunder knows about. Used by
+benchmark.py so performance can be measured without the live site.
+
+The order list is paged newest first behind a "View orders" button, with a
+status and order date per order. Order detail pages show a buyer-protection countdown for deadline scheduling.
+Also serves /api/reverse/status, the JSON dispute-status call the refund
+pages make, so the direct status path in status_api.py can be exercised.
+Submissions show an error message when refused; --single-use-uploads
+refuses reused image references to exercise the evidence-cache fallback.
+
+Usage:
+    python mock_server.py --port 8765 --latency 0.2 --upload-delay 1.5
+"""
+
+import argparse
+import base64
+import json
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Reverse-pages states the refunder distinguishes
+REFUND_STATES = ['can_submit', 'needs_response', 'ongoing', 'issued', 'unclear']
+
+# Fixture orders: order ID -> initial state of each refund item (one button per item)
+DEFAULT_ORDERS = {
+    '1000000000000001': ['can_submit', 'can_submit'],  # 2 refund buttons
+    '1000000000000002': ['needs_response'],            # 1 refund button
+    '1000000000000003': ['ongoing'],
+    '1000000000000004': ['issued', 'ongoing'],
+    '1000000000000005': [],                            # No refund button
+    '1000000000000006': ['unclear'],
+}
+
+# Order dates are derived from the order ID, counted from this day
+ORDER_DATE_BASE = datetime(2024, 1, 1)
+
+# 1x1 PNG used as uploaded evidence thumbnail
+THUMBNAIL_PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+def generate_orders(count: int, seed: int = 0) -> dict:
+    """Build a larger fixture set cycling through 0, 1 and 2 buttons and all states"""
+    rng = random.Random(seed)
+    orders = {}
+    for n in range(count):
+        order_id = str(2000000000000000 + n)
+        buttons = n % 3
+        orders[order_id] = [rng.choice(REFUND_STATES[:4]) for _ in range(buttons)]
+    return orders
+
+
+PAGE_TEMPLATE = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+  .comet-modal, .comet-v2-modal {{ position: fixed; top: 30%; left: 30%; background: #fff; border: 1px solid #999; padding: 20px; }}
+  .hidden {{ display: none; }}
+  .upload--imageThumb--1diFoUj {{ width: 40px; height: 40px; background-size: cover; }}
+</style>
+</head><body>
+{body}
+<script>{script}</script>
+</body></html>'''
+
+LOGIN_BODY = '''
+<form id="login" onsubmit="return false">
+  <input type="text" name="email"><input type="password" name="password">
+</form>'''
+
+LOGIN_SCRIPT = '''
+document.querySelector('input[type="password"]').addEventListener('keydown', e => {
+  if (e.key === 'Enter') window.location.href = '/p/order/index.html';
+});'''
+
+ORDER_ITEM = '''
+<div class="order-item{hidden}">
+  <div class="order-item-header">
+    <span class="order-item-header-status-text">{status}</span>
+    <span class="order-item-header-right-info">Order date: {date}</span>
+  </div>
+  <a href="/p/order/detail.html?orderId={order_id}">Order {order_id}</a>
+  <div class="order-item-btns"><button class="comet-btn">Track order</button></div>
+</div>'''
+
+# "View orders" reveals the next page of the (newest first) list, like the real paging
+ORDER_LIST_SCRIPT = '''
+const more = document.querySelector('.order-more button');
+if (more) more.addEventListener('click', () => {
+  setTimeout(() => {
+    const hidden = [...document.querySelectorAll('.order-item.hidden')];
+    hidden.slice(0, PAGE_SIZE).forEach(item => item.classList.remove('hidden'));
+    if (hidden.length <= PAGE_SIZE) more.parentElement.remove();
+  }, 200);
+});'''
+
+DETAIL_SCRIPT = '''
+document.querySelectorAll('button.refund-btn').forEach(btn => {
+  btn.addEventListener('click', () => {
+    window.open(btn.dataset.url, '_blank');
+    if (btn.dataset.ask === '1') document.getElementById('ask-modal').classList.remove('hidden');
+  });
+});
+document.getElementById('ask-no').addEventListener('click', () => {
+  document.getElementById('ask-modal').classList.add('hidden');
+});'''
+
+REFUND_SCRIPT = '''
+const refundId = document.body.dataset.refundId;
+fetch('/api/reverse/status?reverseOrderLineId=' + refundId).then(r => r.json()).then(data => { window.disputeStatus = data; });
+function show(id) { document.getElementById(id).classList.remove('hidden'); }
+function hide(id) { document.getElementById(id).classList.add('hidden'); }
+function bindUpload(input, container) {
+  input.addEventListener('change', async () => {
+    const resp = await fetch('/api/upload', {method: 'POST', body: input.files[0]});
+    const data = await resp.json();
+    window.uploadedUrl = data.url;
+    container.innerHTML = '<div class="upload--imageThumb--1diFoUj" style="background-image: url(' + data.url + ')"></div>';
+  });
+}
+async function submit(kind) {
+  const resp = await fetch('/api/submit', {method: 'POST', body: JSON.stringify({id: refundId, kind: kind, image: window.uploadedUrl})});
+  const data = await resp.json();
+  if (!data.success) {
+    document.body.insertAdjacentHTML('beforeend', '<div class="comet-v2-message-error">' + data.message + '</div>');
+    return false;
+  }
+  document.body.insertAdjacentHTML('beforeend', '<div class="reminder--statusStr--3FMxRSU">Waiting for AliExpress\'s feedback</div>');
+  return true;
+}
+const el = id => document.getElementById(id);
+if (el('reason-select')) {
+  el('reason-select').addEventListener('click', () => show('reason-menu'));
+  el('reason-item').addEventListener('click', () => hide('reason-menu'));
+  bindUpload(el('form-file'), el('form-upload'));
+  el('next-step').addEventListener('click', () => { hide('form-step'); show('submit-step'); });
+  el('submit-btn').addEventListener('click', () => show('confirm-modal'));
+  el('confirm-btn').addEventListener('click', async () => {
+    hide('confirm-modal');
+    if (await submit('refund')) hide('submit-step');
+  });
+}
+if (el('solutions-btn')) {
+  el('solutions-btn').addEventListener('click', () => show('solutions'));
+  el('disagree').addEventListener('click', () => show('upload-more-btn'));
+  el('upload-more-btn').addEventListener('click', () => show('evidence-modal'));
+  bindUpload(el('evidence-file'), el('evidence-upload'));
+  el('evidence-submit').addEventListener('click', async () => { if (await submit('evidence')) hide('evidence-modal'); });
+}'''
+
+STATE_BODIES = {
+    'issued': '<div class="reminder--statusStr--3FMxRSU">Refund complete</div>',
+    'ongoing': '''
+<div class="verticalSteps--title--1m4xoBw">We're reviewing your request</div>
+<div class="reminder--statusStr--3FMxRSU">Waiting for AliExpress's feedback</div>''',
+    'needs_response': '''
+<div class="reminder--statusStr--3FMxRSU">Waiting for your response</div>
+<button id="solutions-btn" class="comet-v2-btn">View possible solutions</button>
+<div id="solutions" class="hidden">
+  <div id="disagree" class="cco--checkTitle--Gzot0Aj">I don't agree with above solution(s)</div>
+  <button id="upload-more-btn" class="comet-v2-btn hidden">Upload more photos/videos</button>
+</div>
+<div id="evidence-modal" class="comet-v2-modal hidden">
+  <textarea class="evidence--textarea--2LZFL8b"></textarea>
+  <input id="evidence-file" type="file" accept="image/*,video/*">
+  <div id="evidence-upload" class="upload--imageContainer--3tTIByI"></div>
+  <div class="comet-v2-modal-footer"><button id="evidence-submit" class="comet-v2-btn comet-v2-btn-primary">Submit</button></div>
+</div>''',
+    'can_submit': '''
+<div id="form-step">
+  <div id="reason-select" class="comet-v2-select comet-v2-select-show-arrow">Select a reason</div>
+  <div id="reason-menu" class="hidden">
+    <div class="comet-v2-menu-item">Item not as described</div>
+    <div id="reason-item" class="comet-v2-menu-item">Tracked as returned/canceled/lost</div>
+  </div>
+  <textarea class="commet--textarea--Sg0xapL"></textarea>
+  <input id="form-file" type="file" accept="image/*">
+  <div id="form-upload" class="upload--imageContainer--3tTIByI"></div>
+  <button id="next-step" class="comet-v2-btn">Next step</button>
+</div>
+<div id="submit-step" class="hidden">
+  <button class="comet-v2-btn">Back</button>
+  <button id="submit-btn" data-pl="buyersubmit_btn_submit" class="comet-v2-btn">Submit</button>
+</div>
+<div id="confirm-modal" class="comet-v2-modal hidden">
+  <div class="comet-v2-modal-footer"><button id="confirm-btn" class="comet-v2-btn">Confirm</button></div>
+</div>''',
+    'unclear': '<div class="loading">Something went wrong</div>',
+}
+
+
+# Status text shown (and returned by the status API) per state
+STATUS_TEXTS = {
+    'issued': 'Refund complete',
+    'ongoing': "Waiting for AliExpress's feedback",
+    'needs_response': 'Waiting for your response',
+}
+
+
+class MockAliExpress:
+    """Mutable fixture state shared by all request handler threads"""
+
+    def __init__(self, orders: dict = None, latency: float = 0.0, jitter: float = 0.0,
+                 upload_delay: float = 0.0, ask_no_every: int = 2, list_page_size: int = 10,
+                 single_use_uploads: bool = False):
+        self.orders = orders if orders is not None else DEFAULT_ORDERS
+        self.latency = latency
+        self.jitter = jitter
+        self.upload_delay = upload_delay
+        self.ask_no_every = ask_no_every
+        self.list_page_size = list_page_size
+        self.single_use_uploads = single_use_uploads
+        self.used_uploads = set()
+        self.lock = threading.Lock()
+        self.refund_states = {}
+        self.reset()
+
+    def reset(self):
+        """Restore every refund item to its fixture state"""
+        with self.lock:
+            self.refund_states = {
+                self.refund_id(order_id, i): state
+                for order_id, states in self.orders.items()
+                for i, state in enumerate(states)
+            }
+            self.used_uploads = set()
+
+    @staticmethod
+    def refund_id(order_id: str, index: int) -> str:
+        return f"{order_id}{index:02d}"
+
+    def delay(self):
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+    def refund_state(self, refund_id: str) -> str:
+        with self.lock:
+            return self.refund_states.get(refund_id, 'unclear')
+
+    def submit(self, refund_id: str, image: str = None) -> dict:
+        """Accept a submission, or refuse a reused image reference with single_use_uploads"""
+        with self.lock:
+            if self.single_use_uploads and image in self.used_uploads:
+                return {'success': False, 'message': 'The image has expired, please upload it again'}
+            self.used_uploads.add(image)
+            if refund_id in self.refund_states:
+                self.refund_states[refund_id] = 'ongoing'
+            return {'success': True}
+
+    def status_payload(self, refund_id: str) -> dict:
+        """JSON the reverse-pages SPA fetches for its dispute status"""
+        state = self.refund_state(refund_id)
+        return {
+            'success': True,
+            'data': {
+                'reverseOrderLineId': refund_id,
+                'statusCode': state.upper(),
+                'statusText': STATUS_TEXTS.get(state, ''),
+            },
+        }
+
+    @staticmethod
+    def order_date(order_id: str) -> datetime:
+        return ORDER_DATE_BASE + timedelta(days=int(order_id) % 1000 if order_id.isdigit() else 0)
+
+    def order_status(self, order_id: str) -> str:
+        with self.lock:
+            states = [self.refund_states.get(self.refund_id(order_id, i)) for i in range(len(self.orders[order_id]))]
+        return 'Awaiting delivery' if 'can_submit' in states else 'Completed'
+
+    def order_list_page(self) -> str:
+        """Newest orders first, list_page_size per page behind a "View orders" button"""
+        newest_first = sorted(self.orders, key=lambda order_id: (self.order_date(order_id), order_id), reverse=True)
+        items = "".join(
+            ORDER_ITEM.format(
+                order_id=order_id,
+                status=self.order_status(order_id),
+                date=self.order_date(order_id).strftime('%b %d, %Y'),
+                hidden=' hidden' if n >= self.list_page_size else '',
+            )
+            for n, order_id in enumerate(newest_first)
+        )
+        if len(newest_first) > self.list_page_size:
+            items += '<div class="order-more"><button class="comet-btn">View orders</button></div>'
+        script = f"const PAGE_SIZE = {self.list_page_size};" + ORDER_LIST_SCRIPT
+        return PAGE_TEMPLATE.format(title='Orders', body=items, script=script)
+
+    @staticmethod
+    def protection_days(order_id: str) -> int:
+        """Deterministic, shuffled buyer-protection countdown so deadline ordering differs from list order"""
+        return int(order_id) * 7 % 29 + 1 if order_id.isdigit() else 30
+
+    def order_detail_page(self, order_id: str) -> str:
+        buttons = []
+        for i, _ in enumerate(self.orders.get(order_id, [])):
+            url = f"/p/reverse-pages/detail.html?reverseOrderLineId={self.refund_id(order_id, i)}"
+            ask = '1' if self.ask_no_every and i % self.ask_no_every == 1 else '0'
+            buttons.append(f'<button class="comet-btn refund-btn" data-url="{url}" data-ask="{ask}">Returns/refunds</button>')
+        body = f'''
+<h1>Order {order_id}</h1>
+<div class="order-protection">Buyer protection ends in {self.protection_days(order_id)} days</div>
+<div class="order-detail-btns">{"".join(buttons)}</div>
+<div id="ask-modal" class="comet-modal hidden">
+  <button class="comet-btn comet-btn-primary">Yes</button><button id="ask-no" class="comet-btn">No</button>
+</div>'''
+        return PAGE_TEMPLATE.format(title=f'Order {order_id}', body=body, script=DETAIL_SCRIPT)
+
+    def refund_page(self, refund_id: str) -> str:
+        body = STATE_BODIES[self.refund_state(refund_id)]
+        body = f'<script>document.body.dataset.refundId = "{refund_id}";</script>{body}'
+        return PAGE_TEMPLATE.format(title='Refund', body=body, script=REFUND_SCRIPT)
+
+
+def make_handler(site: MockAliExpress):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def send_body(self, body, content_type='text/html; charset=utf-8', status=200):
+            if isinstance(body, str):
+                body = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_json(self, data, status=200):
+            self.send_body(json.dumps(data), 'application/json', status)
+
+        def read_body(self) -> bytes:
+            length = int(self.headers.get('Content-Length') or 0)
+            return self.rfile.read(length) if length else b''
+
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            query = parse_qs(parsed.query)
+            path = parsed.path
+
+            if path.startswith('/assets/'):
+                return self.send_body(THUMBNAIL_PNG, 'image/png')
+
+            site.delay()
+            if path in ('/', '/login'):
+                return self.send_body(PAGE_TEMPLATE.format(title='Login', body=LOGIN_BODY, script=LOGIN_SCRIPT))
+            if path == '/p/order/index.html':
+                return self.send_body(site.order_list_page())
+            if path == '/p/order/detail.html':
+                return self.send_body(site.order_detail_page(query.get('orderId', [''])[0]))
+            if path == '/p/reverse-pages/detail.html':
+                return self.send_body(site.refund_page(query.get('reverseOrderLineId', [''])[0]))
+            if path == '/api/reverse/status':
+                return self.send_json(site.status_payload(query.get('reverseOrderLineId', [''])[0]))
+            self.send_body('Not found', 'text/plain', 404)
+
+        def do_POST(self):
+            path = urlparse(self.path).path
+            body = self.read_body()
+
+            if path == '/api/upload':
+                time.sleep(site.upload_delay)
+                return self.send_json({'url': f'/assets/{random.randint(0, 1 << 30)}.png'})
+
+            site.delay()
+            if path == '/api/submit':
+                payload = json.loads(body or b'{}')
+                return self.send_json(site.submit(payload.get('id', ''), payload.get('image')))
+            if path == '/__reset':
+                site.reset()
+                return self.send_json({'success': True})
+            self.send_json({'error': 'not found'}, 404)
+
+    return Handler
+
+
+class MockServer:
+    """Runs a MockAliExpress site on a background thread"""
+
+    def __init__(self, site: MockAliExpress = None, host: str = '127.0.0.1', port: int = 0):
+        self.site = site or MockAliExpress()
+        self.httpd = ThreadingHTTPServer((host, port), make_handler(self.site))
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def order_url(self, order_id: str) -> str:
+        return f"{self.base_url}/p/order/detail.html?orderId={order_id}"
+
+    @property
+    def order_list_url(self) -> str:
+        return f"{self.base_url}/p/order/index.html"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.debug(f"Mock server listening on {self.base_url}")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve AliExpress fixture pages locally")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every page/API response")
+    parser.add_argument('--jitter', type=float, default=0.0, help="Random extra latency, up to this many seconds")
+    parser.add_argument('--upload-delay', type=float, default=0.0, help="Seconds the upload endpoint takes")
+    parser.add_argument('--orders', type=int, default=0, help="Generate this many orders instead of the default fixtures")
+    parser.add_argument('--single-use-uploads', action='store_true',
+                        help="Refuse submissions that reuse an already submitted image reference")
+    args = parser.parse_args()
+
+    orders = generate_orders(args.orders) if args.orders else DEFAULT_ORDERS
+    site = MockAliExpress(orders, args.latency, args.jitter, args.upload_delay,
+                          single_use_uploads=args.single_use_uploads)
+    server = MockServer(site, port=args.port)
+    print(f"\n🧪 Mock AliExpress running on {server.base_url}")
+    print(f"  • Order list: {server.order_list_url}")
+    print("Press Ctrl+C to quit")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stopping mock server...")
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Incremental Order Sync
+----------------------
+
+Keeps a local copy of the order list (order_store.json) and only pages
+through the orders page until it reaches the newest order seen by the last
+sync (the high-water mark). New orders are added, and status changes of
+orders that were loaded anyway are merged in, so a daily run costs time in
+proportion to new activity, not to the account's history.
+
+Usage:
+    python order_sync.py                      # Sync and print new/changed orders
+    python order_sync.py --full               # Ignore the high-water mark and page to the end
+    python order_sync.py --emit new > new.txt # Order IDs for batch_cli.py or the daemon inbox
+"""
+
+import argparse
+import json
+import logging
+import os
+from datetime import datetime
+
+from playwright.sync_api import Page, sync_playwright
+from ali_refund_claimer import CONTEXT_OPTIONS, ORDER_DETAIL_URL
+from login_handler import LoginHandler
+from refund_link_collector import ORDER_LIST_URL
+from scheduling import DATE_PATTERN, parse_date
+from selector_registry import registry
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+STORE_PATH = 'order_store.json'
+MAX_PAGES = 500          # Safety stop for "View orders" paging
+PAGE_LOAD_TIMEOUT = 10   # Seconds to wait for a page of orders to appear
+
+# Candidate lists are tried in priority order, like SelectorRegistry does
+SCRAPE_JS = '''([itemSels, statusSels, dateSels]) => {
+    const itemSel = itemSels.find(sel => document.querySelector(sel)) || itemSels[0];
+    const within = (item, sels) => sels.map(sel => item.querySelector(sel)).find(Boolean);
+    const items = [...document.querySelectorAll(itemSel)].filter(item => item.offsetParent !== null);
+    const rows = items.map(item => {
+        const link = item.querySelector('a[href*="orderId="]');
+        const status = within(item, statusSels);
+        const date = within(item, dateSels);
+        return {
+            href: link ? link.href : null,
+            status: status ? status.innerText.trim() : null,
+            date: (date || item).innerText,
+        };
+    });
+    return {itemSel, shown: items.length, rows};
+}'''
+
+# Waits for more items than shown, counted with the selector the scrape used
+MORE_SHOWN_JS = '([sel, shown]) => [...document.querySelectorAll(sel)].filter(i => i.offsetParent !== null).length > shown'
+
+
+def scrape_visible_orders(page: Page) -> tuple[list[dict], dict]:
+    """
+    Orders currently shown on the orders page, newest first.
+    Returns:
+        tuple: (rows, listing) where listing has the order item 'selector' used and
+               how many items were 'shown', including any without an order link
+    """
+    selectors = [registry.candidates('order_item'), registry.candidates('order_status'), registry.candidates('order_date')]
+    scraped = page.evaluate(SCRAPE_JS, selectors)
+    rows = []
+    for raw in scraped['rows']:
+        if not raw['href'] or 'orderId=' not in raw['href']:
+            continue
+        date_match = DATE_PATTERN.search(raw['date'] or '')
+        order_date = parse_date(date_match.group(1)) if date_match else None
+        order_id = raw['href'].split('orderId=')[1].split('&')[0]
+        rows.append({
+            'order_id': order_id,
+            'status': raw['status'],
+            'order_date': order_date.strftime('%Y-%m-%d') if order_date else None,
+        })
+    return rows, {'selector': scraped['itemSel'], 'shown': scraped['shown']}
+
+
+class OrderStore:
+    """Known orders plus the high-water mark of the last completed sync, persisted as JSON"""
+
+    def __init__(self, path: str = STORE_PATH):
+        self.path = path
+        self.orders = {}
+        self.high_water = None
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            self.orders = data.get('orders', {})
+            self.high_water = data.get('high_water')
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump({'high_water': self.high_water, 'orders': self.orders}, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def is_behind_high_water(self, row: dict) -> bool:
+        """Whether row is the high-water order or an already known, not newer one"""
+        if self.high_water is None:
+            return False
+        if row['order_id'] == self.high_water['order_id']:
+            return True
+        if row['order_id'] not in self.orders:
+            return False
+        return not row['order_date'] or not self.high_water['order_date'] or row['order_date'] <= self.high_water['order_date']
+
+    def merge(self, row: dict) -> str:
+        """
+        Add or update one scraped order.
+        Returns:
+            str: 'new', 'changed' or None if nothing changed
+        """
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        known = self.orders.get(row['order_id'])
+        if known is None:
+            self.orders[row['order_id']] = {
+                'order_url': ORDER_DETAIL_URL.format(order_id=row['order_id']),
+                'status': row['status'],
+                'order_date': row['order_date'],
+                'first_seen': now,
+                'last_seen': now,
+            }
+            return 'new'
+
+        known['last_seen'] = now
+        if row['status'] and row['status'] != known.get('status'):
+            known['previous_status'] = known.get('status')
+            known['status'] = row['status']
+            known['status_changed_at'] = now
+            return 'changed'
+        return None
+
+
+def load_more(page: Page, listing: dict) -> str:
+    """
+    Click "View orders" and wait for more than listing['shown'] order items to
+    show, counted with the same selector as the scrape.
+    Returns:
+        str: 'more', 'end' (no button left) or 'timeout' (clicked, nothing appeared)
+    """
+    if not registry.visible(page, 'order_more'):
+        return 'end'
+    with timer.span('load_more', 'order_list'):
+        registry.locator(page, 'order_more').click()
+        try:
+            page.wait_for_function(MORE_SHOWN_JS, arg=[listing['selector'], listing['shown']],
+                                   timeout=PAGE_LOAD_TIMEOUT * 1000)
+        except Exception as e:
+            logger.warning(f"No more orders appeared after 'View orders': {e}")
+            return 'timeout'
+    return 'more'
+
+
+def sync_orders(page: Page, store: OrderStore, order_list_url: str = ORDER_LIST_URL, full: bool = False,
+                max_pages: int = MAX_PAGES) -> dict:
+    """
+    Page through the orders page until the high-water mark (or the end with full=True)
+    and merge what was seen into the store.
+    Returns:
+        dict: 'new' and 'changed' order IDs, 'pages' loaded, whether the mark was 'reached'
+              and why paging 'stopped' ('mark', 'end', 'timeout' or 'page_limit')
+    """
+    print("\n🔄 Syncing order list...")
+    with timer.span('goto', 'order_list'):
+        page.goto(order_list_url)
+    with timer.span('networkidle', 'order_list'):
+        page.wait_for_load_state('networkidle')
+
+    result = {'new': [], 'changed': [], 'pages': 1, 'reached': False, 'stopped': None}
+    seen = set()
+    newest = None
+    while True:
+        rows, listing = scrape_visible_orders(page)
+        for row in rows:
+            if row['order_id'] in seen:
+                continue
+            seen.add(row['order_id'])
+            newest = newest or row
+            if not full and store.is_behind_high_water(row):
+                result['reached'] = True
+            outcome = store.merge(row)
+            if outcome:
+                result[outcome].append(row['order_id'])
+        if result['pages'] > 1:
+            print(f"  • Page {result['pages']}: {len(seen)} orders seen, {len(result['new'])} new")
+
+        if result['reached']:
+            result['stopped'] = 'mark'
+            break
+        if result['pages'] >= max_pages:
+            result['stopped'] = 'page_limit'
+            break
+        loaded = load_more(page, listing)
+        if loaded != 'more':
+            result['stopped'] = loaded
+            break
+        result['pages'] += 1
+
+    # Only move the mark after a scan that got back to it or to the real end of the list;
+    # otherwise older orders past the stopping point would never be loaded again
+    if newest is not None and result['stopped'] in ('mark', 'end'):
+        store.high_water = {'order_id': newest['order_id'], 'order_date': newest['order_date']}
+    store.save()
+
+    stop = {'mark': "high-water mark", 'end': "end of list", 'timeout': "a timeout",
+            'page_limit': f"the {max_pages} page limit"}[result['stopped']]
+    print(f"  • ✅ {len(result['new'])} new, {len(result['changed'])} changed, "
+          f"{result['pages']} pages loaded (stopped at {stop})")
+    if result['stopped'] not in ('mark', 'end'):
+        print("  • ⚠️ Scan incomplete, high-water mark not moved; the next sync pages this far again")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally sync the AliExpress order list")
+    parser.add_argument('--store', default=STORE_PATH)
+    parser.add_argument('--full', action='store_true', help="Page through the whole history")
+    parser.add_argument('--emit', choices=['new', 'changed', 'all'], help="Print these order IDs, one per line")
+    parser.add_argument('--headless', action='store_true')
+    args = parser.parse_args()
+
+    store = OrderStore(args.store)
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=args.headless, args=['--disable-blink-features=AutomationControlled'])
+        context = browser.new_context(**CONTEXT_OPTIONS)
+        page = context.new_page()
+        try:
+            LoginHandler(page).login()
+            result = sync_orders(page, store, full=args.full)
+        finally:
+            browser.close()
+
+    for order_id in result['changed']:
+        data = store.orders[order_id]
+        print(f"  • {order_id}: {data.get('previous_status')} → {data['status']}")
+
+    if args.emit:
+        ids = store.orders if args.emit == 'all' else result[args.emit]
+        for order_id in ids:
+            print(order_id)
+    timer.print_summary()
+
+
+if __name__ == "__main__":
+    main()
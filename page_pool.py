@@ -0,0 +1,185 @@
+from playwright.sync_api import Page
+import logging
+import os
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+# Pool defaults
+DEFAULT_POOL_SIZE = 4          # Idle pages kept for reuse
+MAX_USES = 25                  # Recycle a page after this many checkouts (bounds renderer growth)
+DEFAULT_HANDOFF_TABS = 20      # Collected refund tabs kept open for the refunder
+
+
+def _handle_dialog(dialog):
+    """Never let a leftover alert/confirm block a pooled page"""
+    try:
+        if dialog.type == 'beforeunload':
+            dialog.accept()
+        else:
+            dialog.dismiss()
+    except Exception:
+        pass
+
+
+class PagePool:
+    """
+    Bounded pool of tabs that are reset to about:blank and handed out again
+    instead of opening and closing a renderer target per refund URL.
+    """
+
+    def __init__(self, context, max_size: int = DEFAULT_POOL_SIZE, max_uses: int = MAX_USES):
+        self.context = context
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.idle = []
+        self.uses = {}
+        self.stats = {'hits': 0, 'misses': 0, 'recycled': 0, 'adopted': 0}
+
+    def _prepare(self, page: Page):
+        page.on('dialog', _handle_dialog)
+        self.uses.setdefault(page, 0)
+
+    def checkout(self) -> Page:
+        """Get an idle page, or open a new one if none is available"""
+        while self.idle:
+            page = self.idle.pop()
+            if not page.is_closed():
+                self.stats['hits'] += 1
+                self.uses[page] += 1
+                return page
+            self.uses.pop(page, None)
+
+        self.stats['misses'] += 1
+        with timer.span('new_page', 'reverse_pages'):
+            page = self.context.new_page()
+        self._prepare(page)
+        self.uses[page] = 1
+        return page
+
+    def _recycle(self, page: Page):
+        self.uses.pop(page, None)
+        self.stats['recycled'] += 1
+        try:
+            page.close()
+        except Exception:
+            pass
+
+    def release(self, page: Page):
+        """Reset a page and return it to the pool, or close it if worn out or surplus"""
+        if page is None or page.is_closed():
+            self.uses.pop(page, None)
+            return
+        if page not in self.uses:
+            # Opened elsewhere (a refund tab the site opened, a hand-off tab)
+            self._prepare(page)
+            self.stats['adopted'] += 1
+        if self.uses.get(page, 0) >= self.max_uses or len(self.idle) >= self.max_size:
+            return self._recycle(page)
+
+        try:
+            with timer.span('page_reset', 'other'):
+                page.goto('about:blank')
+        except Exception as e:
+            logger.debug(f"Page reset failed: {e}")
+            return self._recycle(page)
+        self.idle.append(page)
+
+    def adopt(self, page: Page):
+        """Take over a page opened elsewhere (e.g. a refund tab the site opened)"""
+        self.release(page)
+
+    @property
+    def hit_rate(self) -> float:
+        checkouts = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / checkouts if checkouts else 0.0
+
+    def print_summary(self):
+        checkouts = self.stats['hits'] + self.stats['misses']
+        if not checkouts:
+            return
+        print(f"\n🗂️ Page pool: {checkouts} checkouts, {self.hit_rate:.0%} hit rate, "
+              f"{self.stats['adopted']} adopted, {self.stats['recycled']} recycled")
+
+    def close_all(self):
+        for page in self.idle:
+            try:
+                page.close()
+            except Exception:
+                pass
+        self.idle.clear()
+        self.uses.clear()
+
+
+class TabHandoff:
+    """
+    Refund tabs the collector leaves open, already loaded, so the refunder can
+    take them over instead of loading the same URL again. At most max_open
+    tabs are kept; the rest are released as before.
+    """
+
+    def __init__(self, pool: PagePool = None, max_open: int = DEFAULT_HANDOFF_TABS):
+        self.pool = pool
+        self.max_open = max_open
+        self.pages = {}
+        self.stats = {'kept': 0, 'taken': 0, 'unused': 0}
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.pages
+
+    def holds(self, page: Page) -> bool:
+        return any(kept is page for kept in self.pages.values())
+
+    def keep(self, page: Page) -> bool:
+        """Keep a loaded refund tab for later; False if the cap is reached"""
+        self.pages = {url: kept for url, kept in self.pages.items() if not kept.is_closed()}
+        if len(self.pages) >= self.max_open or page.url in self.pages:
+            return False
+        self.pages[page.url] = page
+        self.stats['kept'] += 1
+        return True
+
+    def take(self, url: str):
+        """Hand over the open tab for url, or None"""
+        page = self.pages.pop(url, None)
+        if page is None or page.is_closed():
+            return None
+        self.stats['taken'] += 1
+        return page
+
+    def print_summary(self):
+        if self.stats['kept']:
+            print(f"\n🤝 Tab hand-off: {self.stats['taken']} of {self.stats['kept']} collected tabs reused, "
+                  f"{self.stats['unused']} released unused")
+
+    def close_all(self):
+        for page in self.pages.values():
+            self.stats['unused'] += 1
+            try:
+                release_page(page, self.pool)
+            except Exception:
+                pass
+        self.pages.clear()
+
+
+def handoff_tabs_default() -> int:
+    """Collected refund tabs kept open for the refunder (HANDOFF_TABS, 0 disables)"""
+    return int(os.getenv('HANDOFF_TABS', DEFAULT_HANDOFF_TABS))
+
+
+def open_page(context, pool: PagePool = None) -> Page:
+    """Check a page out of the pool, or open a plain new tab without one"""
+    if pool is not None:
+        return pool.checkout()
+    with timer.span('new_page', 'reverse_pages'):
+        return context.new_page()
+
+
+def release_page(page: Page, pool: PagePool = None):
+    """Return a page to the pool, or close it without one"""
+    if page is None:
+        return
+    if pool is not None:
+        pool.release(page)
+    elif not page.is_closed():
+        page.close()
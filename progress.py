@@ -0,0 +1,177 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Defaults; overridable via PROGRESS=0, PROGRESS_INTERVAL and PROGRESS_PORT
+DEFAULT_INTERVAL = 10    # Seconds between progress lines / snapshot refreshes
+EXAMPLE_PORT = 8777      # Suggested PROGRESS_PORT; 8765 is the daemon's command port
+RATE_WINDOW = 20         # Recent completions the items/min figure is based on
+
+
+def progress_defaults() -> dict:
+    """Live progress config keys, read from the environment"""
+    return {
+        'progress': os.getenv('PROGRESS', '1') != '0',
+        'progress_interval': float(os.getenv('PROGRESS_INTERVAL', DEFAULT_INTERVAL)),
+        'progress_port': int(os.getenv('PROGRESS_PORT', 0)),
+    }
+
+
+def _format_duration(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    return f"{seconds // 60}m{seconds % 60:02d}s"
+
+
+class BatchProgress:
+    """
+    Live throughput of the running phase (collecting links, submitting refunds):
+    items/min over the last RATE_WINDOW items, queue depth, in-flight tabs, state
+    counts and ETA. The hot loop only bumps counters; a snapshot is built, printed
+    and published to the optional localhost JSON endpoint at most every interval.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL, port: int = 0, terminal: bool = True):
+        self.interval = interval
+        self.terminal = terminal
+        self.port = port
+        self.server = None
+        self.phase = None
+        self.total = 0
+        self.done = 0
+        self.states = {}
+        self.queue_depth = 0
+        self.in_flight = 0
+        self.extra = {}
+        self.started = time.monotonic()
+        self.recent = deque(maxlen=RATE_WINDOW)
+        self.last_publish = 0.0
+        self.published = {}
+        if port:
+            self.serve(port)
+
+    @classmethod
+    def from_config(cls, config: dict):
+        if not config.get('progress', True) and not config.get('progress_port'):
+            return None
+        return cls(
+            interval=config.get('progress_interval', DEFAULT_INTERVAL),
+            port=config.get('progress_port', 0),
+            terminal=config.get('progress', True),
+        )
+
+    def start(self, phase: str, total: int):
+        """Begin counting a new phase of total items"""
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self.states = {}
+        self.queue_depth = total
+        self.in_flight = 0
+        self.extra = {}
+        self.started = time.monotonic()
+        self.recent.clear()
+        self.recent.append(self.started)
+        self.publish()
+
+    def update(self, queue_depth: int = None, in_flight: int = None, **extra):
+        """Record the current queue depth / in-flight tabs (plus any extra figures) for the next publish"""
+        if queue_depth is not None:
+            self.queue_depth = queue_depth
+        if in_flight is not None:
+            self.in_flight = in_flight
+        self.extra.update(extra)
+
+    def item_done(self, state: str = None):
+        """Count one finished item in the given state"""
+        self.done += 1
+        state = state or 'unknown'
+        self.states[state] = self.states.get(state, 0) + 1
+        self.recent.append(time.monotonic())
+        self.tick()
+
+    def items_per_minute(self) -> float:
+        if len(self.recent) < 2:
+            return 0.0
+        span = self.recent[-1] - self.recent[0]
+        return (len(self.recent) - 1) * 60 / span if span > 0 else 0.0
+
+    def snapshot(self) -> dict:
+        rate = self.items_per_minute()
+        remaining = max(self.total - self.done, 0)
+        return {
+            'phase': self.phase,
+            'done': self.done,
+            'total': self.total,
+            'items_per_min': round(rate, 2),
+            'queue_depth': self.queue_depth,
+            'in_flight': self.in_flight,
+            'states': dict(self.states),
+            'elapsed_seconds': round(time.monotonic() - self.started, 1),
+            'eta_seconds': round(remaining * 60 / rate) if rate and remaining else None,
+            **self.extra,
+        }
+
+    def tick(self):
+        """Publish if the interval has passed; cheap enough to call per item"""
+        if time.monotonic() - self.last_publish >= self.interval:
+            self.publish(render=self.terminal)
+
+    def publish(self, render: bool = False):
+        self.last_publish = time.monotonic()
+        self.published = self.snapshot()  # Swapped whole; the server thread only reads it
+        if render and self.phase:
+            self.render(self.published)
+
+    def render(self, snap: dict):
+        percent = f" ({snap['done'] * 100 // snap['total']}%)" if snap['total'] else ''
+        eta = _format_duration(snap['eta_seconds']) if snap['eta_seconds'] is not None else '?'
+        states = ', '.join(f"{state.replace('_', ' ')} {count}"
+                           for state, count in sorted(snap['states'].items(), key=lambda item: -item[1]))
+        print(f"\n📈 {snap['phase'].title()}: {snap['done']}/{snap['total']}{percent} · "
+              f"{snap['items_per_min']:.1f} items/min · queue {snap['queue_depth']} · "
+              f"in flight {snap['in_flight']} · ETA {eta}" + (f" · {states}" if states else ''))
+
+    def serve(self, port: int):
+        """Serve the latest snapshot as JSON on http://127.0.0.1:port/"""
+        progress = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = json.dumps(progress.published).encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        try:
+            self.server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        except OSError as e:
+            logger.warning(f"Progress endpoint not started on port {port}: {e}")
+            print(f"  • ⚠️ Port {port} is in use, live progress endpoint not started "
+                  f"(try PROGRESS_PORT={EXAMPLE_PORT})")
+            return
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        print(f"  • 📈 Live progress at http://127.0.0.1:{port}/")
+
+    def finish(self):
+        """Publish and print the final figures of the current phase (unless just printed)"""
+        if self.phase and self.published.get('done') != self.done:
+            self.publish(render=self.terminal)
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
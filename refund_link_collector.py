@@ -2,12 +2,20 @@ from playwright.sync_api import Page
 import time
 from typing import List
 import logging
+from timing import timer, page_type_for
+from throttle import AdaptiveController
+from retry_queue import classify_failure
+from page_pool import PagePool, TabHandoff
+from progress import BatchProgress
+from scheduling import extract_deadline
 
 # Configurable wait times (in seconds)
 WAIT_AFTER_BUTTON_CLICK = 0.2  # Wait after clicking refund button
 WAIT_AFTER_NO_BUTTON = 0.2     # Wait after clicking "No" button
 WAIT_AFTER_NAVIGATION = 3     # Wait after navigating to next order
 
+ORDER_LIST_URL = "https://www.aliexpress.com/p/order/index.html"
+
 logger = logging.getLogger(__name__)
 
 def print_pages(context, prefix="Current pages"):
@@ -16,12 +24,25 @@ def print_pages(context, prefix="Current pages"):
     for p in context.pages:
         logger.debug(f"- {p.url}")
 
-def get_refund_pages(context) -> List[str]:
-    """Get all reverse-pages URLs currently open"""
-    return [p.url for p in context.pages if 'reverse-pages' in p.url]
+def is_new_refund_page(p: Page, handoff: TabHandoff = None) -> bool:
+    """A reverse-pages tab that isn't already held for the refunder"""
+    return 'reverse-pages' in p.url and (handoff is None or not handoff.holds(p))
+
+def get_refund_pages(context, handoff: TabHandoff = None) -> List[str]:
+    """Get all reverse-pages URLs currently open (excluding tabs already handed off)"""
+    return [p.url for p in context.pages if is_new_refund_page(p, handoff)]
 
-def handle_refund_process(page: Page, order_dict: dict) -> dict:
-    """Process orders and add refund URLs to dictionary"""
+def handle_refund_process(page: Page, order_dict: dict, order_list_url: str = ORDER_LIST_URL,
+                          interactive: bool = True, controller: AdaptiveController = None,
+                          pool: PagePool = None, handoff: TabHandoff = None,
+                          progress: BatchProgress = None) -> dict:
+    """
+    Process orders and add refund URLs to dictionary.
+    interactive=False never pauses for input; a controller paces the order page navigations.
+    With a pool, the refund tabs the site opens are reset and kept for the refunder to reuse.
+    With a handoff, loaded refund tabs stay open (up to its cap) for the refunder to take over.
+    With a progress tracker, each order is counted by its outcome.
+    """
     try:
         print("\n📋 Orders to process:")
         for order_id in order_dict.keys():
@@ -29,23 +50,45 @@ def handle_refund_process(page: Page, order_dict: dict) -> dict:
         
         # Close any existing refund pages before starting
         for p in page.context.pages:
-            if 'reverse-pages' in p.url:
+            if is_new_refund_page(p, handoff):
                 p.close()
         
         order_items = list(order_dict.items())
+        if progress is not None:
+            progress.start('collecting', len(order_items))
         for i, (order_id, data) in enumerate(order_items):
             logger.debug(f"\nProcessing order URL: {data['order_url']}")
+            order_start = time.perf_counter()
+            outcome = 'error'
             
             try:
                 # Navigate to order
-                page.goto(data['order_url'])
+                if controller:
+                    controller.acquire('order_detail')
+                with timer.span('goto', 'order_detail'):
+                    page.goto(data['order_url'])
                 page.bring_to_front()
-                page.wait_for_load_state('networkidle')
+                with timer.span('networkidle', 'order_detail'):
+                    page.wait_for_load_state('networkidle')
+                
+                if controller:
+                    if controller.is_blocked(page):
+                        print(f"  • Order {order_id}: 🛑 Captcha/anti-bot page")
+                        controller.record('captcha')
+                        outcome = 'captcha'
+                        continue
+                    controller.record(None)
+                
+                with timer.span('deadline', 'order_detail'):
+                    order_dict[order_id]['deadline'] = extract_deadline(page)
+                if order_dict[order_id]['deadline']:
+                    logger.debug(f"Order {order_id} deadline: {order_dict[order_id]['deadline']}")
                 
                 # Find all refund buttons for this order
                 refund_buttons = page.locator('button.comet-btn:has-text("Returns/refunds")').all()
                 if not refund_buttons:
                     print(f"  • Order {order_id}: ❌ No refund buttons available")
+                    outcome = 'no_refund_buttons'
                     continue
                 
                 print(f"\nProcessing refund buttons for Order {order_id}...")
@@ -54,17 +97,18 @@ def handle_refund_process(page: Page, order_dict: dict) -> dict:
                 # Click all refund buttons for this order
                 for button_index, refund_button in enumerate(refund_buttons):
                     print(f"  • Clicking button {button_index + 1} of {len(refund_buttons)}")
-                    refund_button.click()
+                    with timer.span('refund_button_click', 'order_detail'):
+                        refund_button.click()
                     
                     # Wait for potential "No" button
-                    time.sleep(WAIT_AFTER_BUTTON_CLICK)
+                    timer.sleep(WAIT_AFTER_BUTTON_CLICK, 'order_detail')
                     
                     # Handle "No" button if it appears
                     no_button = page.locator('.comet-modal button.comet-btn:not(.comet-btn-primary):has-text("No")').first
                     if no_button.is_visible():
                         logger.debug("Found No button, clicking it...")
                         no_button.click()
-                        time.sleep(WAIT_AFTER_NO_BUTTON)
+                        timer.sleep(WAIT_AFTER_NO_BUTTON, 'order_detail')
                 
                 # Immediately navigate to next order or back to list
                 print("  • Waiting for refund pages to load...")
@@ -72,33 +116,54 @@ def handle_refund_process(page: Page, order_dict: dict) -> dict:
                     next_url = order_items[i + 1][1]['order_url']
                     print("  • Navigating to next order...")
                 else:
-                    next_url = "https://www.aliexpress.com/p/order/index.html"
+                    next_url = order_list_url
                     print("  • Navigating back to order list...")
                 
-                page.goto(next_url)
+                with timer.span('goto', page_type_for(next_url)):
+                    page.goto(next_url)
                 
                 # Now wait for tabs to open
-                time.sleep(3)  # Increased wait time to ensure all tabs open
+                timer.sleep(3, 'reverse_pages')  # Increased wait time to ensure all tabs open
                 
                 # Collect all refund pages that were opened for this order
-                refund_pages = get_refund_pages(page.context)
+                refund_pages = get_refund_pages(page.context, handoff)
                 order_dict[order_id]['refund_urls'] = refund_pages
                 
                 if refund_pages:
                     print(f"  • Order {order_id}: ✅ Found {len(refund_pages)} refund links")
+                    outcome = 'links_found'
                 else:
+                    outcome = 'no_refund_links'
                     print(f"  • Order {order_id}: ❌ No refund links found")
-                    input("\n⚠️ No refund links found for this order! Press Enter to continue or Ctrl+C to quit...")
+                    if interactive:
+                        input("\n⚠️ No refund links found for this order! Press Enter to continue or Ctrl+C to quit...")
                 
-                # Close all refund pages before moving to next order
+                # Keep refund pages for the refunder, or close them (or hand them to the pool)
                 for p in page.context.pages:
-                    if 'reverse-pages' in p.url:
-                        p.close()
+                    if is_new_refund_page(p, handoff):
+                        if handoff is not None and handoff.keep(p):
+                            continue
+                        if pool is not None:
+                            pool.adopt(p)
+                        else:
+                            p.close()
+                
+                timer.record('collect_order', time.perf_counter() - order_start, 'order_detail')
                 
             except Exception as e:
                 logger.error(f"Error processing order {order_id}: {e}")
+                if controller:
+                    controller.record(classify_failure(e))
                 continue
+            finally:
+                if progress is not None:
+                    # One order page at a time; held_tabs are loaded refund tabs waiting for the refunder
+                    progress.update(queue_depth=len(order_items) - i - 1, in_flight=1,
+                                    held_tabs=len(handoff.pages) if handoff is not None else 0)
+                    progress.item_done(outcome)
         
+        if progress is not None:
+            progress.finish()
         print("\n📊 Summary of refund links:")
         for order_id, data in order_dict.items():
             refund_count = len(data.get('refund_urls', []))
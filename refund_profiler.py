@@ -0,0 +1,197 @@
+from playwright.sync_api import Page
+import json
+import logging
+import os
+import random
+import re
+import time
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+
+# Defaults, overridable through the environment or the config dict
+DEFAULT_PROFILE_DIR = 'profiles'
+DEFAULT_SLOW_SECONDS = 20.0
+
+
+def profiling_defaults() -> dict:
+    """Profiling config keys, read from the environment (all off by default)"""
+    return {
+        'profile_trace': os.getenv('PROFILE_TRACE') == '1',
+        'profile_har': os.getenv('PROFILE_HAR') == '1',
+        'profile_sample_rate': float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+        'profile_slow_seconds': float(os.getenv('PROFILE_SLOW_SECONDS', DEFAULT_SLOW_SECONDS)),
+        'profile_dir': os.getenv('PROFILE_DIR', DEFAULT_PROFILE_DIR),
+    }
+
+
+def slug_for_url(url: str) -> str:
+    """Short filesystem-safe name for a refund URL"""
+    match = re.search(r'(?:reverseOrderLineId|orderId)=(\w+)', url)
+    if match:
+        return match.group(1)
+    return re.sub(r'[^A-Za-z0-9]+', '_', url)[-80:].strip('_') or 'page'
+
+
+def _ms(start: float, end: float) -> float:
+    """Duration between two Playwright timing marks, -1 when unavailable"""
+    if start is None or end is None or start < 0 or end < 0:
+        return -1
+    return round(max(0.0, end - start), 3)
+
+
+def build_har(requests: list) -> dict:
+    """Build a HAR 1.2 log from finished/failed Playwright requests"""
+    entries = []
+    for request in requests:
+        timing = request.timing
+        response = None
+        try:
+            response = request.response()
+        except Exception:
+            pass
+
+        started = timing.get('startTime', 0) / 1000
+        timings = {
+            'blocked': -1,
+            'dns': _ms(timing.get('domainLookupStart'), timing.get('domainLookupEnd')),
+            'connect': _ms(timing.get('connectStart'), timing.get('connectEnd')),
+            'ssl': _ms(timing.get('secureConnectionStart'), timing.get('connectEnd')),
+            'send': 0,
+            'wait': _ms(timing.get('requestStart'), timing.get('responseStart')),
+            'receive': _ms(timing.get('responseStart'), timing.get('responseEnd')),
+        }
+        total = timing.get('responseEnd', -1)
+
+        entries.append({
+            'startedDateTime': datetime.fromtimestamp(started, timezone.utc).isoformat(),
+            'time': round(total, 3) if total and total > 0 else 0,
+            'request': {
+                'method': request.method,
+                'url': request.url,
+                'httpVersion': 'HTTP/1.1',
+                'headers': [{'name': k, 'value': v} for k, v in request.headers.items()],
+                'queryString': [],
+                'cookies': [],
+                'headersSize': -1,
+                'bodySize': len(request.post_data_buffer or b''),
+            },
+            'response': {
+                'status': response.status if response else 0,
+                'statusText': response.status_text if response else (request.failure or ''),
+                'httpVersion': 'HTTP/1.1',
+                'headers': [{'name': k, 'value': v} for k, v in response.headers.items()] if response else [],
+                'cookies': [],
+                'content': {'size': -1, 'mimeType': response.headers.get('content-type', '') if response else ''},
+                'redirectURL': '',
+                'headersSize': -1,
+                'bodySize': -1,
+            },
+            'cache': {},
+            'timings': timings,
+            '_resourceType': request.resource_type,
+        })
+
+    return {'log': {'version': '1.2', 'creator': {'name': 'ali-refund-claimer', 'version': '1'}, 'entries': entries}}
+
+
+class ItemProfile:
+    """
+    Recording for a single refund page, kept or dropped on finish().
+    A preloaded page was loaded before recording began, so its page-load
+    requests are missing; such profiles are marked in their file names.
+    """
+
+    def __init__(self, profiler: 'RefundProfiler', page: Page, url: str, preloaded: bool = False):
+        self.profiler = profiler
+        self.page = page
+        self.url = url
+        self.preloaded = preloaded
+        self.sampled = random.random() < profiler.sample_rate
+        self.requests = []
+        self.start = time.perf_counter()
+
+        if profiler.har:
+            page.on('requestfinished', self._on_request)
+            page.on('requestfailed', self._on_request)
+        if profiler.trace:
+            profiler.ensure_tracing(page.context)
+            page.context.tracing.start_chunk(title=url)
+
+    def _on_request(self, request):
+        self.requests.append(request)
+
+    def finish(self, failed: bool = False) -> list[str]:
+        """Stop recording and save files if failed, slow or sampled"""
+        duration = time.perf_counter() - self.start
+        slow = duration >= self.profiler.slow_seconds
+        keep = failed or slow or self.sampled
+        reason = 'failed' if failed else 'slow' if slow else 'sampled'
+        if self.preloaded:
+            reason += '_preloaded'
+
+        if self.profiler.har:
+            self.page.remove_listener('requestfinished', self._on_request)
+            self.page.remove_listener('requestfailed', self._on_request)
+
+        saved = []
+        base = None
+        if keep:
+            os.makedirs(self.profiler.output_dir, exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            base = os.path.join(self.profiler.output_dir, f"{slug_for_url(self.url)}_{reason}_{timestamp}")
+
+        if self.profiler.trace:
+            try:
+                if keep:
+                    self.page.context.tracing.stop_chunk(path=f"{base}.trace.zip")
+                    saved.append(f"{base}.trace.zip")
+                else:
+                    self.page.context.tracing.stop_chunk()
+            except Exception as e:
+                logger.warning(f"Could not stop trace for {self.url}: {e}")
+
+        if self.profiler.har and keep:
+            with open(f"{base}.har", 'w') as f:
+                json.dump(build_har(self.requests), f, indent=2)
+            saved.append(f"{base}.har")
+
+        if saved:
+            print(f"    📼 Saved {reason.replace('_', ' ')} profile ({duration:.1f}s): {', '.join(saved)}")
+        return saved
+
+
+class RefundProfiler:
+    """Opt-in Playwright trace / HAR capture for refund pages"""
+
+    def __init__(self, trace: bool = False, har: bool = False, sample_rate: float = 0.0,
+                 slow_seconds: float = DEFAULT_SLOW_SECONDS, output_dir: str = DEFAULT_PROFILE_DIR):
+        self.trace = trace
+        self.har = har
+        self.sample_rate = sample_rate
+        self.slow_seconds = slow_seconds
+        self.output_dir = output_dir
+        self._traced_contexts = set()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """Build a profiler from config keys, or None if profiling is off"""
+        if not config.get('profile_trace') and not config.get('profile_har'):
+            return None
+        return cls(
+            trace=config.get('profile_trace', False),
+            har=config.get('profile_har', False),
+            sample_rate=config.get('profile_sample_rate', 0.0),
+            slow_seconds=config.get('profile_slow_seconds', DEFAULT_SLOW_SECONDS),
+            output_dir=config.get('profile_dir', DEFAULT_PROFILE_DIR),
+        )
+
+    def ensure_tracing(self, context):
+        """Start context-level tracing once; items record it in chunks"""
+        if id(context) in self._traced_contexts:
+            return
+        context.tracing.start(screenshots=True, snapshots=True, sources=False)
+        self._traced_contexts.add(id(context))
+
+    def begin(self, page: Page, url: str, preloaded: bool = False) -> ItemProfile:
+        return ItemProfile(self, page, url, preloaded)
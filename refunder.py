@@ -2,37 +2,125 @@ import logging
 from playwright.sync_api import Page
 import time
 from datetime import datetime
+from timing import timer
+from refund_profiler import RefundProfiler
+from refund_link_collector import handle_refund_process
+from retry_queue import RetryQueue, FAILURE_REASONS, classify_failure
+from throttle import AdaptiveController, BlockedPageError, RefundPrefetcher
+from selector_registry import registry
+from status_api import StatusClient, TERMINAL_STATES
+from page_pool import PagePool, TabHandoff, open_page, release_page
+from evidence_cache import EvidenceCache
+from scheduling import DeadlineScheduler, print_deadline_report
+from progress import BatchProgress
 
 logger = logging.getLogger(__name__)
 
 
 class Refunder:
-    def __init__(self, page: Page, image_path: str, refund_message: str, refund_message_2: str):
+    def __init__(self, page: Page, image_path: str, refund_message: str, refund_message_2: str,
+                 interactive: bool = True, evidence: EvidenceCache = None):
         self.page = page
         self.image_path = image_path
         self.refund_message = refund_message
         self.refund_message_2 = refund_message_2
+        self.interactive = interactive
+        self.evidence = evidence
+        self.used_stored_upload = False
+        self.last_failure = None
+
+    def fail(self, reason: str, message: str) -> bool:
+        """Record a failure reason and pause for the user only in interactive mode"""
+        self.last_failure = reason
+        if self.interactive:
+            input(f"{message}. Press Enter to continue...")
+        else:
+            print(message)
+        return False
+    
+    def upload_image(self, file_input):
+        """
+        Set the proof image and wait for its thumbnail.
+        An upload answered from the stored evidence reference that shows no
+        thumbnail rejects the reference and is repeated as a normal upload.
+        Raises:
+            PlaywrightTimeoutError: if no thumbnail appears
+        """
+        while True:
+            # The stored response is only routed on this page until the thumbnail shows
+            self.used_stored_upload = self.evidence is not None and self.evidence.arm(self.page)
+            try:
+                with timer.span('set_input_files', 'reverse_pages'):
+                    file_input.set_input_files(self.image_path)
+                # Wait for the specific success structure: container with thumbnail that has background-image
+                with timer.span('upload_wait', 'reverse_pages'):
+                    registry.wait(self.page, 'upload_thumb', timeout=10000 if self.used_stored_upload else 30000,
+                                  count_miss=False)
+                return
+            except Exception:
+                if not self.used_stored_upload:
+                    raise
+                self.evidence.reject('no thumbnail')
+                file_input.set_input_files([])
+            finally:
+                if self.used_stored_upload:
+                    self.evidence.disarm(self.page)
+    
+    def reject_stored_upload(self, reason: str):
+        """A submit failed after using the stored evidence reference; stop reusing it"""
+        if self.used_stored_upload:
+            self.evidence.reject(reason)
+
+    def submission_refused(self, form_open) -> str:
+        """
+        Check the page after a final submit click.
+        Args:
+            form_open: Returns whether the submitted form itself is still shown
+        Returns:
+            str: Why the server refused it (error message, or the form is still open), None if accepted
+        """
+        if registry.visible(self.page, 'error_toast'):
+            return f"error: {registry.locator(self.page, 'error_toast').inner_text().strip()[:80]}"
+        if form_open():
+            return 'form still open'
+        return None
+
+    def confirm_submission(self, form_open) -> bool:
+        """Fail the item if the submit was refused; otherwise count a stored-upload reuse as good"""
+        refused = self.submission_refused(form_open)
+        if refused:
+            self.reject_stored_upload(f'submit refused ({refused})')
+            return self.fail('submit_rejected', f"❌ Submission was not accepted: {refused}")
+        if self.used_stored_upload:
+            self.evidence.confirm()
+        return True
         
     def check_refund_status(self) -> str:
         """Check if refund is already issued or in another state"""
+        status = self._detect_refund_status()
+        if status != "unclear":
+            # Any recognised page shows the status text selectors aren't what's failing
+            registry.hit('status_text')
+        return status
+
+    def _detect_refund_status(self) -> str:
         try:
             # Check for completed refund
-            refund_complete = self.page.locator('.reminder--statusStr--3FMxRSU:has-text("Refund complete")').first
-            if refund_complete.is_visible():
+            if registry.visible(self.page, 'status_text', "Refund complete"):
                 logger.debug("Found 'Refund complete' status")
                 return "refund_already_issued"
             
             # Check for waiting response state
-            waiting_response = self.page.locator('.reminder--statusStr--3FMxRSU:has-text("Waiting for your response")').first
-            if waiting_response.is_visible():
+            if registry.visible(self.page, 'status_text', "Waiting for your response"):
                 logger.debug("Found 'Waiting for response' status")
                 return "needs_response"
             
             # Check for ongoing review state - updated locators
-            ongoing_review_title = self.page.locator('.verticalSteps--title--1m4xoBw:has-text("We\'re reviewing your request")').first
-            ongoing_review_status = self.page.locator('.reminder--statusStr--3FMxRSU:has-text("Waiting for AliExpress\'s feedback")').first
+            ongoing_review_title = registry.locator(self.page, 'review_title', "We're reviewing your request")
+            ongoing_review_status = registry.locator(self.page, 'status_text', "Waiting for AliExpress's feedback")
             
-            if ongoing_review_title.is_visible() or ongoing_review_status.is_visible():
+            if (registry.visible(self.page, 'review_title', "We're reviewing your request")
+                    or registry.visible(self.page, 'status_text', "Waiting for AliExpress's feedback")):
                 logger.debug("Found 'Waiting for feedback' status")
                 # Debug info
                 print("    Debug: Found review status")
@@ -41,8 +129,7 @@ class Refunder:
                 return "refund_ongoing"
             
             # Check for normal refund form
-            dropdown = self.page.locator('.comet-v2-select-show-arrow').first
-            if dropdown.is_visible():
+            if registry.visible(self.page, 'reason_dropdown'):
                 logger.debug("Found refund form dropdown")
                 return "can_submit"
             
@@ -53,6 +140,7 @@ class Refunder:
             print(f"    Review status exists: {ongoing_review_status.count() > 0}")
             
             logger.debug("Could not determine refund status")
+            registry.miss('status_text')
             return "unclear"
             
         except Exception as e:
@@ -65,40 +153,37 @@ class Refunder:
             print("  • Filling refund form...")
             
             logger.debug("Selecting refund reason")
-            dropdown = self.page.locator('.comet-v2-select-show-arrow').first
+            dropdown = registry.locator(self.page, 'reason_dropdown')
             dropdown.click()
-            time.sleep(.1)
+            timer.sleep(.1, 'reverse_pages')
             
             logger.debug("Selecting reason: Tracked as returned/canceled/lost")
-            reason = self.page.locator('.comet-v2-menu-item:has-text("Tracked as returned/canceled/lost")').first
+            reason = registry.wait(self.page, 'reason_item', "Tracked as returned/canceled/lost", timeout=5000)
             reason.click()
-            time.sleep(.1)
+            timer.sleep(.1, 'reverse_pages')
             
             logger.debug("Entering message")
-            textarea = self.page.locator('.commet--textarea--Sg0xapL').first
+            textarea = registry.wait(self.page, 'refund_textarea', timeout=5000)
             textarea.fill(self.refund_message)
-            time.sleep(.1)
+            timer.sleep(.1, 'reverse_pages')
             
             logger.debug("Uploading image")
             file_input = self.page.locator('input[type="file"]').first
-            file_input.set_input_files(self.image_path)
             
             # Wait for image upload to complete
             try:
                 print("  • Waiting for image upload...")
-                # Wait for the specific success structure: container with thumbnail that has background-image
-                self.page.wait_for_selector('.upload--imageContainer--3tTIByI .upload--imageThumb--1diFoUj[style*="background-image"]', timeout=30000)
+                self.upload_image(file_input)
                 print("  • ✅ Image uploaded successfully")
                 
             except Exception as e:
-                input(f"❌ Error during image upload: {e}. Press Enter to continue...")
-                return False
+                return self.fail('upload_timeout' if 'Timeout' in str(e) else 'upload_failed',
+                                 f"❌ Error during image upload: {e}")
             
             # Click Next Step button
             next_button = self.page.locator('button:has-text("Next step")')
             if not next_button.is_visible():
-                input("❌ Next step button not found. Press Enter to continue...")
-                return False
+                return self.fail('next_step_missing', "❌ Next step button not found")
             
             next_button.click()
             
@@ -107,25 +192,30 @@ class Refunder:
                 print("  • Waiting for submit page to load...")
                 # Wait for and click the specific Submit button (not Back button)
                 submit_button = self.page.locator('button[data-pl="buyersubmit_btn_submit"]:has-text("Submit")').first
-                submit_button.wait_for(state='visible', timeout=10000)
+                with timer.span('submit_modal', 'reverse_pages'):
+                    submit_button.wait_for(state='visible', timeout=10000)
                 submit_button.click()
                 
                 # Wait for and handle confirmation popup
                 print("  • Waiting for confirmation popup...")
                 confirm_button = self.page.locator('.comet-v2-modal-footer button:has-text("Confirm")').first
-                confirm_button.wait_for(state='visible', timeout=10000)
+                with timer.span('confirm_modal', 'reverse_pages'):
+                    confirm_button.wait_for(state='visible', timeout=10000)
                 confirm_button.click()
-                time.sleep(3)
+                timer.sleep(3, 'reverse_pages')
+                if not self.confirm_submission(submit_button.is_visible):
+                    return False
                 
                 print("  • ✅ Refund form submitted successfully")
                 return True
                 
             except Exception as e:
-                input(f"❌ Submit button error: {e}. Press Enter to continue...")
-                return False
+                self.reject_stored_upload('submit failed')
+                return self.fail('submit_failed', f"❌ Submit button error: {e}")
             
         except Exception as e:
             print(f"❌ Error filling refund form: {e}")
+            self.last_failure = 'form_error'
             return False
 
     def handle_waiting_response(self) -> bool:
@@ -136,12 +226,12 @@ class Refunder:
             # Click View possible solutions
             solutions_button = self.page.locator('button:has-text("View possible solutions")').first
             solutions_button.click()
-            time.sleep(.1)
+            timer.sleep(.1, 'reverse_pages')
             
             # Click disagree checkbox
-            disagree_checkbox = self.page.locator('.cco--checkTitle--Gzot0Aj:has-text("I don\'t agree with above solution(s)")').first
+            disagree_checkbox = registry.wait(self.page, 'disagree_checkbox', "I don't agree with above solution(s)", timeout=5000)
             disagree_checkbox.click()
-            time.sleep(.1)
+            timer.sleep(.1, 'reverse_pages')
             
             # Click Upload more photos/videos and wait for modal
             upload_button = self.page.locator('button:has-text("Upload more photos/videos")').first
@@ -149,54 +239,66 @@ class Refunder:
             
             # Wait for modal to appear and textarea to be visible
             print("  • Waiting for upload modal...")
-            textarea = self.page.locator('.evidence--textarea--2LZFL8b').first
-            textarea.wait_for(state='visible', timeout=10000)
+            with timer.span('evidence_modal', 'reverse_pages'):
+                textarea = registry.wait(self.page, 'evidence_textarea', timeout=10000, count_miss=False)
             
             # Fill in the evidence text first
             print("  • Entering disagreement message...")
             textarea.fill(self.refund_message_2)
-            time.sleep(.1)
+            timer.sleep(.1, 'reverse_pages')
             
             # Now upload the image
             print("  • Uploading image...")
             file_input = self.page.locator('input[type="file"][accept*="image"]').first
-            file_input.set_input_files(self.image_path)
             
             # Wait for image upload to complete
             print("  • Waiting for image upload...")
             try:
-                # Wait for the specific success structure: container with thumbnail that has background-image
-                self.page.wait_for_selector('.upload--imageContainer--3tTIByI .upload--imageThumb--1diFoUj[style*="background-image"]', 
-                                          timeout=30000)
+                self.upload_image(file_input)
                 print("  • ✅ Image uploaded successfully")
-                
+            except Exception as e:
+                print(f"❌ Error during image upload: {e}")
+                self.last_failure = 'upload_timeout' if 'Timeout' in str(e) else 'upload_failed'
+                return False
+            
+            try:
                 # Wait for submit button to become enabled and visible
                 submit_button = self.page.locator('.comet-v2-modal-footer button.comet-v2-btn-primary').first
-                submit_button.wait_for(state='visible', timeout=10000)
-                time.sleep(1)  # Small delay to ensure button is clickable
+                with timer.span('submit_modal', 'reverse_pages'):
+                    submit_button.wait_for(state='visible', timeout=10000)
+                timer.sleep(1, 'reverse_pages')  # Small delay to ensure button is clickable
                 submit_button.click()
-                time.sleep(3)
+                timer.sleep(3, 'reverse_pages')
+                # Not the modal's primary button: a notice shown after success has one too
+                if not self.confirm_submission(lambda: registry.visible(self.page, 'evidence_textarea')):
+                    return False
                 
                 print("  • ✅ Additional evidence submitted")
                 return True
                 
             except Exception as e:
-                print(f"❌ Error during image upload or submission: {e}")
+                self.reject_stored_upload('evidence submit failed')
+                print(f"❌ Error during evidence submission: {e}")
+                self.last_failure = 'evidence_failed'
                 return False
             
         except Exception as e:
             print(f"❌ Error handling waiting response: {e}")
+            self.last_failure = 'evidence_failed'
             return False
 
     def process_refund_page(self, refund_url: str) -> bool:
         """Process a single refund page"""
         try:
             print(f"\nProcessing refund page: {refund_url}")
-            self.page.goto(refund_url)
-            self.page.wait_for_load_state('networkidle')
+            with timer.span('goto', 'reverse_pages'):
+                self.page.goto(refund_url)
+            with timer.span('networkidle', 'reverse_pages'):
+                self.page.wait_for_load_state('networkidle')
             
             # First check the status
-            status = self.check_refund_status()
+            with timer.span('check_status', 'reverse_pages'):
+                status = self.check_refund_status()
             print(f"Detected refund status: {status}")
             
             match status:
@@ -224,124 +326,373 @@ class Refunder:
             print(f"❌ Error processing refund: {e}")
             return False
 
-def process_refunds(page: Page, order_dict: dict, image_path: str, refund_message: str, refund_message_2: str) -> dict:
-    """Process refunds and update dictionary with results"""
+
+def resolve_missing_links(page: Page, order_id: str, data: dict) -> bool:
+    """Ask the user how to handle an order without refund links. Returns True if URLs were added."""
+    refund_urls = data.get('refund_urls', [])
+    
+    print(f"\n⚠️ No refund links found for Order {order_id}")
+    print("Options:")
+    print("1. Try to detect refund link again")
+    print("2. Enter refund URL manually")
+    print("3. Skip this order")
+    
+    choice = input("\nEnter choice (1-3): ").strip()
+    
+    if choice == "1":
+        print("\nOpening order page...")
+        page.goto(data['order_url'])
+        page.wait_for_load_state('networkidle')
+        input("\nPress Enter after clicking the refund button...")
+        
+        # Try to detect new refund tabs
+        new_refund_urls = []
+        for p in page.context.pages:
+            if 'reverse-pages' in p.url and p.url not in refund_urls:
+                new_refund_urls.append(p.url)
+                print(f"Found new refund URL: {p.url}")
+        
+        if new_refund_urls:
+            refund_urls.extend(new_refund_urls)
+            data['refund_urls'] = refund_urls
+            print(f"✅ Added {len(new_refund_urls)} new refund URLs")
+            return True
+        
+        print("❌ No new refund URLs detected")
+        data['status'] = 'failed'
+        data['status_detail'] = 'no_refund_links_found'
+        return False
+    
+    elif choice == "2":
+        manual_url = input("\nEnter the refund URL: ").strip()
+        if manual_url:
+            refund_urls.append(manual_url)
+            data['refund_urls'] = refund_urls
+            return True
+        
+        data['status'] = 'failed'
+        data['status_detail'] = 'manual_url_empty'
+        return False
+    
+    # choice == "3" or invalid
+    print("Skipping order...")
+    data['status'] = 'failed'
+    data['status_detail'] = 'skipped_by_user'
+    return False
+
+def process_refund_item(page: Page, order_id: str, data: dict, refund_url: str, image_path: str,
+                        refund_message: str, refund_message_2: str, profiler: RefundProfiler = None,
+                        interactive: bool = True, controller: AdaptiveController = None,
+                        refund_page: Page = None, status_client: StatusClient = None,
+                        pool: PagePool = None, evidence: EvidenceCache = None, preloaded: bool = False) -> str:
+    """
+    Process a single refund URL and update the order data.
+    Args:
+        refund_page: Tab already navigating to refund_url (e.g. prefetched); one is checked out if None
+        preloaded: refund_page finished loading before this call (handed off by the collector)
+        status_client: Answers terminal statuses directly so the page needn't be rendered
+        pool: Page pool tabs are taken from and returned to (plain new tabs if None)
+        evidence: Serves later proof image uploads from the first one
+    Returns:
+        str: None on success, otherwise the failure reason (see retry_queue.FAILURE_REASONS)
+    """
+    item_start = time.perf_counter()
+    profile = None
+    reason = None
+    data.pop('status_detail', None)
+    
+    fast_status = status_client.query(refund_url) if status_client is not None else None
+    if fast_status in TERMINAL_STATES:
+        release_page(refund_page, pool)
+        data['last_checked_url'] = refund_url
+        data['last_check_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if fast_status == 'refund_already_issued':
+            print("    ✅ Refund already issued (direct status check)")
+            data['status'] = 'already_issued'
+        else:
+            print("    ⏳ Refund is under review by AliExpress (direct status check)")
+            data['status'] = 'refund_ongoing'
+        timer.record('refund_item', time.perf_counter() - item_start, 'reverse_pages')
+        return None
+    
+    try:
+        if refund_page is None:
+            if controller:
+                controller.acquire('reverse_pages')
+            refund_page = open_page(page.context, pool)
+            if profiler:
+                profile = profiler.begin(refund_page, refund_url)
+            with timer.span('goto', 'reverse_pages'):
+                refund_page.goto(refund_url)
+        elif profiler:
+            profile = profiler.begin(refund_page, refund_url, preloaded=preloaded)
+        refund_page.bring_to_front()
+        with timer.span('networkidle', 'reverse_pages'):
+            refund_page.wait_for_load_state('networkidle')
+        
+        if controller and controller.is_blocked(refund_page):
+            raise BlockedPageError(f"Anti-bot page at {refund_page.url}")
+        
+        refunder = Refunder(refund_page, image_path, refund_message, refund_message_2, interactive=interactive,
+                            evidence=evidence)
+        with timer.span('check_status', 'reverse_pages'):
+            status = refunder.check_refund_status()
+        if status_client is not None:
+            status_client.learn(refund_url, status)
+        
+        # Update the order data with status
+        data['status'] = status
+        data['last_checked_url'] = refund_url
+        data['last_check_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        
+        match status:
+            case "refund_already_issued":
+                print("    ✅ Refund already issued")
+                data['status'] = 'already_issued'
+            case "needs_response":
+                if refunder.handle_waiting_response():
+                    print("    ✅ Additional evidence submitted")
+                    data['status'] = 'evidence_submitted'
+                else:
+                    print("    ❌ Failed to submit additional evidence")
+                    data['status'] = 'failed'
+                    data['status_detail'] = 'evidence_submission_failed'
+                    reason = refunder.last_failure or 'evidence_failed'
+            case "can_submit":
+                if refunder.fill_refund_form():
+                    print("    ✅ Refund submitted")
+                    data['status'] = 'refund_submitted'
+                else:
+                    print("    ❌ Failed to submit refund")
+                    data['status'] = 'failed'
+                    data['status_detail'] = 'refund_submission_failed'
+                    reason = refunder.last_failure or 'form_error'
+            case "refund_ongoing":
+                print("    ⏳ Refund is under review by AliExpress")
+                data['status'] = 'refund_ongoing'
+            case _:
+                print("    ❌ Status unclear")
+                data['status'] = 'failed'
+                data['status_detail'] = 'status_unclear'
+                reason = 'status_unclear'
+        
+    except BlockedPageError as e:
+        print("    🛑 Captcha/anti-bot page instead of refund page")
+        data['status'] = 'failed'
+        data['status_detail'] = str(e)
+        reason = 'captcha'
+    except Exception as e:
+        logger.error(f"Error processing order {order_id}: {e}")
+        print(f"    ❌ Processing failed: {e}")
+        data['status'] = 'failed'
+        data['status_detail'] = str(e)
+        reason = classify_failure(e)
+    
+    # Hand the tab back after processing
+    release_page(refund_page, pool)
+    if controller:
+        controller.record(reason)
+    
+    if profile:
+        profile.finish(failed=data.get('status') == 'failed')
+    
+    timer.record('refund_item', time.perf_counter() - item_start, 'reverse_pages')
+    return reason
+
+def process_refunds(page: Page, order_dict: dict, image_path: str, refund_message: str, refund_message_2: str,
+                    profiler: RefundProfiler = None, retry_queue: RetryQueue = None,
+                    controller: AdaptiveController = None, status_client: StatusClient = None,
+                    pool: PagePool = None, evidence: EvidenceCache = None, handoff: TabHandoff = None,
+                    progress: BatchProgress = None) -> dict:
+    """
+    Process refunds and update dictionary with results.
+    If a retry_queue is given the run is unattended: orders without links and failed
+    items are deferred to the queue instead of prompting, and retried after the main pass.
+    Navigations are paced by the controller, which also decides how many upcoming
+    refund pages are prefetched in background tabs. With a status_client, issued and
+    under-review items are answered by direct JSON queries once the endpoint is learned.
+    Refund tabs come from the page pool and are reset and reused between items.
+    With an evidence cache the proof image is uploaded once and reused afterwards.
+    Tabs the collector left open in the handoff are taken over without loading them again.
+    Orders are worked earliest deadline first, then needs-response before can-submit.
+    A progress tracker gets every finished item with the queue depth and tabs in flight.
+    """
     print("\n📋 Processing refunds:")
+    interactive = retry_queue is None
+    registry.reset()  # Misses from an earlier batch in this process must not stop this one
+    controller = controller or AdaptiveController()
+    own_pool = pool is None
+    if own_pool:
+        pool = PagePool(page.context, max_size=controller.max_concurrency)
     
-    # Clean up any existing refund tabs first
+    # Clean up any existing refund tabs first (except ones handed over by the collector)
     print("  • Cleaning up old refund tabs...")
     for p in page.context.pages:
-        if 'reverse-pages' in p.url:
+        if 'reverse-pages' in p.url and not (handoff is not None and handoff.holds(p)):
             p.close()
     
-    for order_id, data in order_dict.items():
+    # Deadline/state priority order; all known refund URLs in that order are used to prefetch
+    scheduler = DeadlineScheduler(order_dict)
+    upcoming = scheduler.upcoming_urls()
+    batch_start = datetime.now()
+    prefetcher = RefundPrefetcher(page.context, controller, pool)
+    broken = []
+    batched = False
+    if status_client is not None:
+        status_client.watch()
+    if evidence is not None:
+        evidence.watch()
+    if progress is not None:
+        progress.start('refunds', len(upcoming))
+    
+    for order_id in scheduler:
+        data = order_dict[order_id]
+        data.pop('finished_at', None)
+        if broken:
+            # Page layout changed; don't burn timeouts on the remaining orders
+            data['status'] = 'failed'
+            data['status_detail'] = f"selector_broken: {', '.join(broken)}"
+            continue
+        
         refund_urls = data.get('refund_urls', [])
         
         # Handle case where no refund links were found
         if not refund_urls:
-            print(f"\n⚠️ No refund links found for Order {order_id}")
-            print("Options:")
-            print("1. Try to detect refund link again")
-            print("2. Enter refund URL manually")
-            print("3. Skip this order")
-            
-            choice = input("\nEnter choice (1-3): ").strip()
-            
-            if choice == "1":
-                print("\nOpening order page...")
-                page.goto(data['order_url'])
-                page.wait_for_load_state('networkidle')
-                input("\nPress Enter after clicking the refund button...")
-                
-                # Try to detect new refund tabs
-                new_refund_urls = []
-                for p in page.context.pages:
-                    if 'reverse-pages' in p.url and p.url not in refund_urls:
-                        new_refund_urls.append(p.url)
-                        print(f"Found new refund URL: {p.url}")
-                
-                if new_refund_urls:
-                    refund_urls.extend(new_refund_urls)
-                    data['refund_urls'] = refund_urls
-                    print(f"✅ Added {len(new_refund_urls)} new refund URLs")
-                else:
-                    print("❌ No new refund URLs detected")
-                    data['status'] = 'failed'
-                    data['status_detail'] = 'no_refund_links_found'
-                    continue
-            
-            elif choice == "2":
-                manual_url = input("\nEnter the refund URL: ").strip()
-                if manual_url:
-                    refund_urls.append(manual_url)
-                    data['refund_urls'] = refund_urls
-                else:
-                    data['status'] = 'failed'
-                    data['status_detail'] = 'manual_url_empty'
-                    continue
-            
-            else:  # choice == "3" or invalid
-                print("Skipping order...")
+            if not interactive:
+                print(f"\n⚠️ No refund links found for Order {order_id}")
                 data['status'] = 'failed'
-                data['status_detail'] = 'skipped_by_user'
+                data['status_detail'] = 'no_refund_links_found'
+                retry_queue.add(order_id, 'no_refund_links')
+                continue
+            if not resolve_missing_links(page, order_id, data):
                 continue
+            refund_urls = data['refund_urls']
         
         print(f"\n🔄 Order {order_id}:")
         
         for i, refund_url in enumerate(refund_urls, 1):
             print(f"  • Processing item {i} of {len(refund_urls)}")
             
-            try:
-                refund_page = page.context.new_page()
-                refund_page.goto(refund_url)
-                refund_page.bring_to_front()
-                refund_page.wait_for_load_state('networkidle')
-                
-                refunder = Refunder(refund_page, image_path, refund_message, refund_message_2)
-                status = refunder.check_refund_status()
-                
-                # Update the order data with status
-                data['status'] = status
-                data['last_checked_url'] = refund_url
-                data['last_check_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                
-                match status:
-                    case "refund_already_issued":
-                        print("    ✅ Refund already issued")
-                        data['status'] = 'already_issued'
-                    case "needs_response":
-                        if refunder.handle_waiting_response():
-                            print("    ✅ Additional evidence submitted")
-                            data['status'] = 'evidence_submitted'
-                        else:
-                            print("    ❌ Failed to submit additional evidence")
-                            data['status'] = 'failed'
-                            data['status_detail'] = 'evidence_submission_failed'
-                    case "can_submit":
-                        if refunder.fill_refund_form():
-                            print("    ✅ Refund submitted")
-                            data['status'] = 'refund_submitted'
-                        else:
-                            print("    ❌ Failed to submit refund")
-                            data['status'] = 'failed'
-                            data['status_detail'] = 'refund_submission_failed'
-                    case "refund_ongoing":
-                        print("    ⏳ Refund is under review by AliExpress")
-                        data['status'] = 'refund_ongoing'
-                    case _:
-                        print("    ❌ Status unclear")
-                        data['status'] = 'failed'
-                        data['status_detail'] = 'status_unclear'
-                
-                # Close the tab after processing
-                refund_page.close()
-                
-            except Exception as e:
-                logger.error(f"Error processing order {order_id}: {e}")
-                print(f"    ❌ Processing failed: {e}")
-                data['status'] = 'failed'
-                data['status_detail'] = str(e)
-            
-            time.sleep(2)
+            if refund_url in upcoming:
+                upcoming.remove(refund_url)
+            
+            # Once the status endpoint is known, settle the remaining terminal items in one batch
+            if status_client is not None and status_client.ready and not batched:
+                batched = True
+                statuses = status_client.query_many(upcoming)
+                scheduler.update_states(statuses)
+                current = [url for url in upcoming if url in refund_urls]
+                upcoming = [url for url in current + scheduler.upcoming_urls()
+                            if statuses.get(url) not in TERMINAL_STATES]
+            
+            refund_page = handoff.take(refund_url) if handoff is not None else None
+            preloaded = refund_page is not None
+            refund_page = refund_page or prefetcher.take(refund_url)
+            prefetcher.fill([url for url in upcoming if handoff is None or url not in handoff])
+            
+            reason = process_refund_item(page, order_id, data, refund_url, image_path, refund_message,
+                                         refund_message_2, profiler=profiler, interactive=interactive,
+                                         controller=controller, refund_page=refund_page,
+                                         status_client=status_client, pool=pool, evidence=evidence,
+                                         preloaded=preloaded)
+            data.setdefault('finished_at', {})[refund_url] = datetime.now().isoformat(timespec='seconds')
+            if reason and not interactive:
+                retry_queue.add(order_id, reason, refund_url, data.get('status_detail', ''))
+            if progress is not None:
+                progress.update(queue_depth=len(upcoming), in_flight=1 + len(prefetcher.pages),
+                                concurrency=controller.concurrency, nav_rate=round(controller.rate, 2))
+                progress.item_done(data.get('status'))
+            
+            broken = registry.broken()
+            if broken:
+                print(f"\n🛑 Selectors stopped matching ({', '.join(broken)}) - AliExpress layout likely changed.")
+                print("   Stopping the batch; update selector_registry.SELECTORS and re-run.")
+                break
+    
+    prefetcher.close_all()
+    if progress is not None:
+        progress.finish()
+    print_deadline_report(order_dict, batch_start)
     
-    return order_dict
\ No newline at end of file
+    if retry_queue is not None and len(retry_queue) and not broken:
+        process_retry_queue(page, order_dict, retry_queue, image_path, refund_message, refund_message_2,
+                            profiler, controller, pool, evidence)
+    
+    controller.print_summary()
+    pool.print_summary()
+    if own_pool:
+        pool.close_all()
+    if status_client is not None:
+        status_client.stop_watching()
+        status_client.print_summary()
+    if evidence is not None:
+        evidence.close()
+        evidence.print_summary()
+    return order_dict
+
+def process_retry_queue(page: Page, order_dict: dict, retry_queue: RetryQueue, image_path: str,
+                        refund_message: str, refund_message_2: str, profiler: RefundProfiler = None,
+                        controller: AdaptiveController = None, pool: PagePool = None,
+                        evidence: EvidenceCache = None):
+    """Work through deferred items with backoff after the main pass"""
+    print(f"\n🔁 Processing retry queue ({len(retry_queue)} items)...")
+    
+    def retry(item: dict) -> str:
+        order_id = item['order_id']
+        data = order_dict[order_id]
+        
+        if item['refund_url'] is None:
+            # Collect the order's links again, then queue each found URL on its own
+            handle_refund_process(page, {order_id: data}, interactive=False, controller=controller, pool=pool)
+            if not data.get('refund_urls'):
+                return 'no_refund_links'
+            for refund_url in data['refund_urls']:
+                reason = process_refund_item(page, order_id, data, refund_url, image_path, refund_message,
+                                             refund_message_2, profiler=profiler, interactive=False,
+                                             controller=controller, pool=pool, evidence=evidence)
+                if reason:
+                    retry_queue.add(order_id, reason, refund_url, data.get('status_detail', ''))
+            return None
+        
+        return process_refund_item(page, order_id, data, item['refund_url'], image_path, refund_message,
+                                   refund_message_2, profiler=profiler, interactive=False,
+                                   controller=controller, pool=pool, evidence=evidence)
+    
+    retry_queue.drain(retry)
+    
+    for item in retry_queue.exhausted:
+        data = order_dict[item['order_id']]
+        data['status'] = 'failed'
+        data['status_detail'] = item['reason']
+        data['retry_attempts'] = item['attempts']
+    
+    retry_queue.print_summary()
+
+def resolve_exhausted_interactively(page: Page, order_dict: dict, retry_queue: RetryQueue, image_path: str,
+                                    refund_message: str, refund_message_2: str):
+    """Offer interactive resolution for items the retry queue gave up on"""
+    if not retry_queue.exhausted:
+        return
+    
+    choice = input(f"\n⚠️ {len(retry_queue.exhausted)} items still failing. Resolve them interactively now? (y/n): ").strip().lower()
+    if choice != 'y':
+        return
+    
+    for item in list(retry_queue.exhausted):
+        order_id = item['order_id']
+        data = order_dict[order_id]
+        
+        if item['refund_url'] is None:
+            if not resolve_missing_links(page, order_id, data):
+                continue
+            refund_urls = data['refund_urls']
+        else:
+            print(f"\n🔄 Order {order_id}: {item['refund_url']}")
+            print(f"  • Last failure: {FAILURE_REASONS.get(item['reason'], item['reason'])}")
+            if input("Retry this item? (y/n): ").strip().lower() != 'y':
+                continue
+            refund_urls = [item['refund_url']]
+        
+        for refund_url in refund_urls:
+            process_refund_item(page, order_id, data, refund_url, image_path, refund_message, refund_message_2)
+        retry_queue.exhausted.remove(item)
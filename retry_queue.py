@@ -0,0 +1,117 @@
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Backoff defaults (in seconds)
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 30
+DEFAULT_MAX_DELAY = 600
+
+# Failure reasons used when deferring work
+FAILURE_REASONS = {
+    'no_refund_links': 'No refund links found for order',
+    'upload_timeout': 'Image upload did not finish in time',
+    'upload_failed': 'Image upload failed',
+    'next_step_missing': "'Next step' button not found",
+    'submit_failed': 'Submit/confirm step failed',
+    'submit_rejected': 'Submission was not accepted by the site',
+    'evidence_failed': 'Additional evidence submission failed',
+    'form_error': 'Refund form could not be filled',
+    'status_unclear': 'Refund status could not be determined',
+    'captcha': 'Captcha/anti-bot page shown',
+    'timeout': 'Page timed out',
+    'network_error': 'Network error',
+    'error': 'Unexpected error',
+}
+
+
+def classify_failure(error) -> str:
+    """Map an exception or error message to one of FAILURE_REASONS"""
+    message = str(error)
+    if 'Timeout' in message or 'timeout' in message:
+        return 'timeout'
+    if 'net::' in message or 'ERR_' in message:
+        return 'network_error'
+    return 'error'
+
+
+class RetryQueue:
+    """Deferred work items retried with exponential backoff after the main pass"""
+
+    def __init__(self, max_attempts: int = DEFAULT_MAX_ATTEMPTS, base_delay: float = DEFAULT_BASE_DELAY,
+                 max_delay: float = DEFAULT_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pending = []
+        self.resolved = []
+        self.exhausted = []
+
+    def backoff(self, attempts: int) -> float:
+        """Delay before the next attempt, doubling per attempt with a little jitter"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        return delay * random.uniform(0.9, 1.1)
+
+    def add(self, order_id: str, reason: str, refund_url: str = None, detail: str = ''):
+        """Defer an order (refund_url=None means its links still need collecting) or a refund URL"""
+        item = {
+            'order_id': order_id,
+            'refund_url': refund_url,
+            'reason': reason,
+            'detail': detail,
+            'attempts': 1,
+            'next_attempt': time.time() + self.backoff(1),
+        }
+        self.pending.append(item)
+        print(f"    ↪️ Deferred for retry: {FAILURE_REASONS.get(reason, reason)}")
+        return item
+
+    def __len__(self):
+        return len(self.pending)
+
+    def drain(self, handler):
+        """
+        Retry pending items until they succeed or run out of attempts.
+        Args:
+            handler: Called with each due item; returns None on success or a failure reason
+        """
+        while self.pending:
+            item = min(self.pending, key=lambda pending: pending['next_attempt'])
+            wait = item['next_attempt'] - time.time()
+            if wait > 0:
+                print(f"\n⏳ Next retry in {wait:.0f}s ({len(self.pending)} items queued)...")
+                time.sleep(wait)
+
+            self.pending.remove(item)
+            item['attempts'] += 1
+            print(f"\n🔁 Retry {item['attempts'] - 1}/{self.max_attempts - 1} for Order {item['order_id']} ({item['reason']})")
+
+            try:
+                reason = handler(item)
+            except Exception as e:
+                logger.error(f"Retry handler failed for order {item['order_id']}: {e}")
+                reason = classify_failure(e)
+                item['detail'] = str(e)
+
+            if reason is None:
+                self.resolved.append(item)
+                continue
+
+            item['reason'] = reason
+            if item['attempts'] >= self.max_attempts:
+                self.exhausted.append(item)
+            else:
+                item['next_attempt'] = time.time() + self.backoff(item['attempts'])
+                self.pending.append(item)
+
+    def print_summary(self):
+        if not self.resolved and not self.exhausted:
+            return
+        print("\n🔁 Retry queue results:")
+        print(f"  • Resolved on retry: {len(self.resolved)}")
+        print(f"  • Still failing: {len(self.exhausted)}")
+        for item in self.exhausted:
+            target = item['refund_url'] or 'refund links'
+            print(f"    - {item['order_id']}: {FAILURE_REASONS.get(item['reason'], item['reason'])} ({target})")
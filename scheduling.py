@@ -0,0 +1,172 @@
+import heapq
+import logging
+import re
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Lines on the order detail page that can carry the buyer-protection / dispute deadline,
+# strongest first (product blurbs like "free returns within 90 days" only count as a last resort)
+DEADLINE_KEYWORDS = (('protection', 'dispute'), ('refund', 'return'))
+
+DATE_FORMATS = ('%b %d, %Y', '%B %d, %Y', '%b %d %Y', '%B %d %Y', '%d %b %Y', '%d %B %Y', '%Y-%m-%d', '%d.%m.%Y')
+DATE_PATTERN = re.compile(
+    r'\b(\d{4}-\d{2}-\d{2}|\d{1,2}\.\d{1,2}\.\d{4}|[A-Z][a-z]{2,8}\.? \d{1,2},? \d{4}|\d{1,2} [A-Z][a-z]{2,8}\.? \d{4})\b'
+)
+DURATION_PATTERN = re.compile(r'(\d+)\s*(days?|d|hours?|hrs?|h|minutes?|mins?|m)\b', re.IGNORECASE)
+
+# Hours left below which an item counts as at risk in the report
+AT_RISK_HOURS = 48
+
+# Order state -> scheduling rank; items needing our action go first
+STATE_RANK = {
+    'needs_response': 0,
+    'can_submit': 1,
+    None: 2,
+    'unclear': 2,
+    'failed': 2,
+    'refund_ongoing': 3,
+    'already_issued': 4,
+    'refund_already_issued': 4,
+}
+
+
+def parse_date(text: str):
+    """Parse a date as shown on AliExpress pages ("Jan 5, 2025", "2025-01-05", ...), or None"""
+    text = re.sub(r'([A-Za-z])\.', r'\1', text)  # "Jan. 5" -> "Jan 5"
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+def _deadline_in_line(line: str, now: datetime):
+    date_match = DATE_PATTERN.search(line)
+    if date_match:
+        deadline = parse_date(date_match.group(1))
+        if deadline is not None:
+            return deadline.replace(hour=23, minute=59)
+
+    delta = timedelta()
+    for amount, unit in DURATION_PATTERN.findall(line):
+        unit = unit.lower()
+        if unit.startswith('d'):
+            delta += timedelta(days=int(amount))
+        elif unit.startswith('h'):
+            delta += timedelta(hours=int(amount))
+        else:
+            delta += timedelta(minutes=int(amount))
+    return now + delta if delta else None
+
+
+def parse_deadline(text: str, now: datetime = None):
+    """
+    Find the protection/dispute deadline in order page text.
+    Understands "ends in 3 days 4 hours" style countdowns and absolute dates.
+    Returns:
+        datetime: The deadline, or None if no keyword line carries one
+    """
+    now = now or datetime.now()
+    lines = text.splitlines()
+    for keywords in DEADLINE_KEYWORDS:
+        for line in lines:
+            if any(keyword in line.lower() for keyword in keywords):
+                deadline = _deadline_in_line(line, now)
+                if deadline is not None:
+                    return deadline
+    return None
+
+
+def extract_deadline(page) -> str:
+    """Deadline shown on the current order detail page as ISO string, or None"""
+    try:
+        deadline = parse_deadline(page.locator('body').inner_text(timeout=5000))
+    except Exception as e:
+        logger.debug(f"Could not read deadline: {e}")
+        return None
+    return deadline.isoformat(timespec='minutes') if deadline else None
+
+
+class DeadlineScheduler:
+    """
+    Priority queue of orders: earliest deadline first, then the most actionable
+    state. Orders without a deadline go last. Priorities can be raised or
+    lowered while the queue drains (e.g. once direct status checks are in);
+    superseded heap entries are skipped lazily.
+    """
+
+    def __init__(self, order_dict: dict):
+        self.order_dict = order_dict
+        self.heap = []
+        self.keys = {}
+        self.seq = 0
+        for order_id, data in order_dict.items():
+            self.push(order_id, data.get('status'))
+
+    def _key(self, order_id: str, state: str) -> tuple:
+        deadline = self.order_dict[order_id].get('deadline')
+        deadline_ts = datetime.fromisoformat(deadline).timestamp() if deadline else float('inf')
+        return (deadline_ts, STATE_RANK.get(state, STATE_RANK[None]))
+
+    def push(self, order_id: str, state: str = None):
+        """Queue order_id, or re-rank it if it is already queued"""
+        key = self._key(order_id, state)
+        self.keys[order_id] = key
+        self.seq += 1
+        heapq.heappush(self.heap, (*key, self.seq, order_id))
+
+    def update_states(self, statuses: dict):
+        """Re-rank queued orders from refund URL -> status results"""
+        for order_id in list(self.keys):
+            item_states = [statuses[url] for url in self.order_dict[order_id].get('refund_urls', [])
+                           if statuses.get(url)]
+            if item_states:
+                self.push(order_id, min(item_states, key=lambda state: STATE_RANK.get(state, STATE_RANK[None])))
+
+    def pop(self) -> str:
+        while self.heap:
+            *key, _, order_id = heapq.heappop(self.heap)
+            if self.keys.get(order_id) == tuple(key):
+                del self.keys[order_id]
+                return order_id
+        raise IndexError('pop from empty scheduler')
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __iter__(self):
+        while self.keys:
+            yield self.pop()
+
+    def upcoming_urls(self) -> list[str]:
+        """Refund URLs of the queued orders in current priority order"""
+        ordered = sorted(self.keys, key=lambda order_id: self.keys[order_id])
+        return [url for order_id in ordered for url in self.order_dict[order_id].get('refund_urls', [])]
+
+
+def print_deadline_report(order_dict: dict, batch_start: datetime):
+    """Per-item completion latency against each order's deadline"""
+    rows = []
+    for order_id, data in order_dict.items():
+        if not data.get('deadline'):
+            continue
+        deadline = datetime.fromisoformat(data['deadline'])
+        for finished in data.get('finished_at', {}).values():
+            finished = datetime.fromisoformat(finished)
+            rows.append((deadline, order_id, (finished - batch_start).total_seconds(),
+                         (deadline - finished).total_seconds() / 3600, data.get('status', 'unknown')))
+    if not rows:
+        return
+
+    print("\n" + "="*50)
+    print("⏰ Deadlines")
+    print("="*50)
+    missed = [row for row in rows if row[3] < 0]
+    at_risk = [row for row in rows if 0 <= row[3] < AT_RISK_HOURS]
+    for deadline, order_id, latency, margin, status in sorted(rows):
+        icon = '🔴' if margin < 0 else '🟠' if margin < AT_RISK_HOURS else '🟢'
+        print(f"{icon} Order {order_id}: due {deadline:%Y-%m-%d %H:%M}, done after {latency:.0f}s "
+              f"({margin:.1f}h to spare) - {status.replace('_', ' ')}")
+    print(f"\n📦 {len(rows)} items with deadlines: {len(missed)} missed, {len(at_risk)} under {AT_RISK_HOURS}h")
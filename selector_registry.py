@@ -0,0 +1,174 @@
+from playwright.sync_api import Page, TimeoutError as PlaywrightTimeoutError
+import logging
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Consecutive misses of one element before the batch is stopped
+MAX_MISSES = 3
+# Timeout (ms) used for an element once it has started missing
+SUSPECT_TIMEOUT = 5000
+
+# Logical element -> [primary selector, fallbacks...], tried one at a time in this order
+# Fallbacks match the CSS-module name without its build hash, then structure/text;
+# elements used to classify a page have no bare-tag fallbacks
+SELECTORS = {
+    # Refund page status
+    'status_text': ['.reminder--statusStr--3FMxRSU', '[class*="reminder--statusStr--"]'],
+    'review_title': ['.verticalSteps--title--1m4xoBw', '[class*="verticalSteps--title--"]'],
+
+    # Refund form
+    'reason_dropdown': ['.comet-v2-select-show-arrow', '[class*="select-show-arrow"]'],
+    'reason_item': ['.comet-v2-menu-item', '[class*="menu-item"]', '[role="option"]'],
+    'refund_textarea': ['.commet--textarea--Sg0xapL', '[class*="commet--textarea--"]', 'textarea'],
+    'upload_thumb': [
+        '.upload--imageContainer--3tTIByI .upload--imageThumb--1diFoUj[style*="background-image"]',
+        '[class*="upload--imageContainer--"] [class*="upload--imageThumb--"][style*="background-image"]',
+        '[class*="imageThumb"][style*="background-image"]',
+    ],
+
+    # Waiting-for-response flow
+    'disagree_checkbox': ['.cco--checkTitle--Gzot0Aj', '[class*="cco--checkTitle--"]', 'label'],
+    'evidence_textarea': ['.evidence--textarea--2LZFL8b', '[class*="evidence--textarea--"]', '.comet-v2-modal textarea'],
+
+    # Error message shown when a submit is refused
+    'error_toast': ['.comet-v2-message-error', '[class*="message-error"]', '[class*="toast"][class*="error"]'],
+
+    # Order list
+    'order_item': ['.order-item', '[class*="order-item--"]'],
+    'order_status': ['.order-item-header-status-text', '[class*="order-item-header-status"]'],
+    'order_date': ['.order-item-header-right-info', '[class*="order-item-header-right"]'],
+    'order_more': ['.order-more button', '[class*="order-more"] button', 'button:has-text("View orders")'],
+
+    # Orders page language switcher
+    'language_menu': ['.ship-to--simpleMenuItem--2ARVOMW', '[class*="ship-to--simpleMenuItem--"]'],
+    'language_select': ['.select--text--1b85oDo', '[class*="select--text--"]'],
+    'language_item': ['.select--item--32FADYB', '[class*="select--item--"]'],
+    'language_save': ['.es--saveBtn--w8EuBuy', '[class*="es--saveBtn--"]'],
+}
+
+
+def with_text(selector: str, text: str = None) -> str:
+    """Append a :has-text() filter to every selector in a comma list"""
+    if not text:
+        return selector
+    escaped = text.replace('"', '\\"')
+    return ', '.join(f'{part.strip()}:has-text("{escaped}")' for part in selector.split(','))
+
+
+class SelectorRegistry:
+    """
+    Resolves logical element names to selectors, caching whichever candidate
+    matched for the rest of the session and counting consecutive misses so a
+    redeploy that breaks a selector stops the batch instead of timing out on
+    every item.
+    """
+
+    def __init__(self, selectors: dict, max_misses: int = MAX_MISSES, suspect_timeout: int = SUSPECT_TIMEOUT):
+        self.selectors = selectors
+        self.max_misses = max_misses
+        self.suspect_timeout = suspect_timeout
+        self.resolved = {}
+        self.misses = defaultdict(int)
+
+    def union(self, name: str, text: str = None) -> str:
+        return with_text(', '.join(self.selectors[name]), text)
+
+    def candidates(self, name: str) -> list[str]:
+        """The cached selector for name if resolved, else all candidates in priority order"""
+        return [self.resolved[name]] if name in self.resolved else self.selectors[name]
+
+    def selector(self, name: str, text: str = None) -> str:
+        """Cached selector for name if resolved, else the union of all candidates"""
+        if name in self.resolved:
+            return with_text(self.resolved[name], text)
+        return self.union(name, text)
+
+    def locator(self, page: Page, name: str, text: str = None):
+        """First candidate (in priority order, not page order) that matches, else the union"""
+        for candidate in self.candidates(name):
+            locator = page.locator(with_text(candidate, text)).first
+            if len(self.candidates(name)) == 1 or locator.count() > 0:
+                return locator
+        return page.locator(self.selector(name, text)).first
+
+    def _resolve(self, name: str, candidate: str):
+        """Remember which candidate matched and reset the miss count"""
+        self.misses[name] = 0
+        if self.resolved.get(name) == candidate:
+            return
+        self.resolved[name] = candidate
+        if self.selectors[name].index(candidate) > 0:
+            logger.warning(f"Selector '{name}' resolved via fallback: {candidate}")
+
+    def _first_visible(self, page: Page, name: str, text: str = None):
+        """Highest-priority candidate with a visible match, resolved; None if none"""
+        for candidate in self.candidates(name):
+            locator = page.locator(with_text(candidate, text)).first
+            try:
+                if locator.is_visible():
+                    self._resolve(name, candidate)
+                    return locator
+            except Exception:
+                continue
+        return None
+
+    def hit(self, name: str):
+        """The page was recognised without name (e.g. a fresh refund form has no status text)"""
+        self.misses[name] = 0
+
+    def miss(self, name: str):
+        self.misses[name] += 1
+        logger.warning(f"Selector '{name}' missed ({self.misses[name]}/{self.max_misses})")
+
+    def visible(self, page: Page, name: str, text: str = None) -> bool:
+        """Non-waiting visibility check; only hits are recorded"""
+        return self._first_visible(page, name, text) is not None
+
+    def wait(self, page: Page, name: str, text: str = None, timeout: int = 10000, state: str = 'visible',
+             count_miss: bool = True):
+        """
+        Wait for a logical element and return its locator.
+        Waits for any candidate, then takes the highest-priority one that is
+        visible. Uses a shorter timeout while the element is missing, and
+        re-tries all candidates once if the cached selector stopped matching.
+        Pass count_miss=False for elements that wait on the network (upload
+        thumbnails, modals): their timeouts are neither counted as misses nor shortened.
+        Raises:
+            PlaywrightTimeoutError: if no candidate appears in time
+        """
+        if count_miss and self.misses[name]:
+            timeout = min(timeout, self.suspect_timeout)
+
+        try:
+            page.locator(self.selector(name, text)).first.wait_for(state=state, timeout=timeout)
+        except PlaywrightTimeoutError:
+            if name not in self.resolved:
+                if count_miss:
+                    self.miss(name)
+                raise
+            logger.debug(f"Cached selector for '{name}' stopped matching, trying fallbacks")
+            cached = self.resolved.pop(name)
+            try:
+                page.locator(self.union(name, text)).first.wait_for(state=state, timeout=1000)
+            except PlaywrightTimeoutError:
+                self.resolved[name] = cached
+                if count_miss:
+                    self.miss(name)
+                raise
+
+        if state != 'visible':
+            return self.locator(page, name, text)
+        return self._first_visible(page, name, text) or page.locator(self.selector(name, text)).first
+
+    def broken(self) -> list[str]:
+        """Names that missed max_misses times in a row"""
+        return [name for name, count in self.misses.items() if count >= self.max_misses]
+
+    def reset(self):
+        self.resolved.clear()
+        self.misses.clear()
+
+
+# Shared registry for the session
+registry = SelectorRegistry(SELECTORS)
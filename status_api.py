@@ -0,0 +1,360 @@
+import json
+import logging
+import os
+import re
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs, urlencode
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+# Statuses that need no further action, so a page render can be skipped entirely
+TERMINAL_STATES = ('refund_already_issued', 'refund_ongoing')
+
+# Status texts found in the dispute JSON, mapped to check_refund_status() results
+STATUS_TEXTS = {
+    "Refund complete": 'refund_already_issued',
+    "Waiting for your response": 'needs_response',
+    "Waiting for AliExpress's feedback": 'refund_ongoing',
+    "We're reviewing your request": 'refund_ongoing',
+}
+
+# Keys the status object may be wrapped in (e.g. {"success": true, "data": {...}})
+PAYLOAD_WRAPPERS = ('data', 'result', 'module', 'model')
+
+# Request headers not replayed when querying the endpoint directly
+SKIP_HEADERS = ('content-length', 'host', 'cookie', 'connection')
+
+# Refund URL parameters that can key the status call: long IDs, not "lang=en" or "1"
+ID_PATTERN = re.compile(r'[A-Za-z0-9_-]*\d{6,}[A-Za-z0-9_-]*')
+
+MAX_CANDIDATES_PER_PAGE = 20  # Captured responses kept per tab while learning; the status call comes early
+DEFAULT_WORKERS = 8
+
+
+def parse_status(payload) -> str:
+    """
+    Status from the top-level status field(s) of a dispute payload, looking
+    through wrapper objects like "data" but never into lists (a steps timeline
+    mentions other statuses). None if missing or ambiguous.
+    """
+    objects = [payload] if isinstance(payload, dict) else []
+    found = set()
+    for obj in objects:
+        for key, value in obj.items():
+            if key in PAYLOAD_WRAPPERS and isinstance(value, dict):
+                objects.append(value)
+            elif 'status' in key.lower() and isinstance(value, str):
+                status = STATUS_TEXTS.get(value.strip().replace('’', "'"))
+                if status:
+                    found.add(status)
+    return found.pop() if len(found) == 1 else None
+
+
+def id_params(url: str) -> dict:
+    """Query parameters of url whose value looks like an ID"""
+    return {key: values[0] for key, values in parse_qs(urlparse(url).query).items()
+            if len(values) == 1 and ID_PATTERN.fullmatch(values[0])}
+
+
+def _json_path(value, target: str, path: tuple = ()):
+    """Path to the leaf of a JSON value equal to target, or None"""
+    if isinstance(value, dict):
+        items = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return path if not isinstance(value, bool) and str(value) == target else None
+    for key, child in items:
+        found = _json_path(child, target, path + (key,))
+        if found is not None:
+            return found
+    return None
+
+
+def locate_key(url: str, post_data: str, value: str):
+    """
+    Where a request carries value as an exact field.
+    Returns:
+        tuple: ('query', name), ('form', name) or ('json', path), or None
+    """
+    for name, values in parse_qs(urlparse(url).query).items():
+        if values == [value]:
+            return ('query', name)
+    if not post_data:
+        return None
+    try:
+        body = json.loads(post_data)
+    except ValueError:
+        for name, values in parse_qs(post_data).items():
+            if values == [value]:
+                return ('form', name)
+        return None
+    path = _json_path(body, value)
+    return ('json', path) if path is not None else None
+
+
+def build_request(template: dict, value: str):
+    """The template's (url, post_data) with value put into its key field"""
+    location, field = template['key']
+    url, post_data = template['url'], template['post_data']
+    if location == 'query':
+        parts = urlparse(url)
+        query = parse_qs(parts.query, keep_blank_values=True)
+        query[field] = [value]
+        url = parts._replace(query=urlencode(query, doseq=True)).geturl()
+    elif location == 'form':
+        form = parse_qs(post_data, keep_blank_values=True)
+        form[field] = [value]
+        post_data = urlencode(form, doseq=True)
+    else:
+        body = json.loads(post_data)
+        parent = body
+        for key in field[:-1]:
+            parent = parent[key]
+        parent[field[-1]] = int(value) if isinstance(parent[field[-1]], int) else value
+        post_data = json.dumps(body)
+    return url, post_data
+
+
+class StatusClient:
+    """
+    Learns the JSON call reverse-pages makes for its dispute status by watching
+    a rendered page, then answers later status checks with that call directly
+    instead of rendering the SPA. A call is only adopted once it agrees with
+    the rendered status of two different items. Unknown payloads return None
+    so the caller falls back to rendering. Captured calls are kept per tab and
+    dropped once the tab navigates away from its refund item.
+    """
+
+    def __init__(self, context, workers: int = DEFAULT_WORKERS):
+        self.context = context
+        self.workers = workers
+        self.template = None
+        self.pending = None
+        self.cache = {}
+        self.stats = {'direct': 0, 'fallback': 0}
+        self._candidates = {}  # Page -> [(response, page_url)] for its current reverse-pages load
+        self._tracked = set()
+        self._watching = False
+
+    @classmethod
+    def from_config(cls, context, config: dict):
+        if not config.get('fast_status', True):
+            return None
+        return cls(context)
+
+    @property
+    def ready(self) -> bool:
+        return self.template is not None
+
+    def watch(self):
+        """Start collecting XHR/fetch responses made by reverse-pages tabs"""
+        if not self._watching and not self.ready:
+            self.context.on('response', self._on_response)
+            self._watching = True
+
+    def _on_response(self, response):
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return
+        page_url = response.frame.url
+        if 'reverse-pages' not in page_url:
+            return
+        page = response.frame.page
+        if page not in self._tracked:
+            page.on('framenavigated', self._on_navigated)
+            page.on('close', self._forget)
+            self._tracked.add(page)
+        captured = self._candidates.setdefault(page, [])
+        if len(captured) < MAX_CANDIDATES_PER_PAGE:
+            captured.append((response, page_url))
+
+    def _on_navigated(self, frame):
+        """Drop a tab's captured responses once it leaves the refund item (released, reused, closed)"""
+        page = frame.page
+        if frame != page.main_frame or page not in self._candidates:
+            return
+        if id_params(frame.url) != id_params(self._candidates[page][0][1]):
+            del self._candidates[page]
+
+    def _forget(self, page):
+        self._candidates.pop(page, None)
+        self._tracked.discard(page)
+
+    def _template_from(self, response, refund_url: str, params: dict) -> dict:
+        request = response.request
+        for name, value in params.items():
+            key = locate_key(request.url, request.post_data, value)
+            if key is not None:
+                return {
+                    'url': request.url,
+                    'method': request.method,
+                    'post_data': request.post_data,
+                    'headers': {k: v for k, v in request.headers.items() if k.lower() not in SKIP_HEADERS},
+                    'param': name,
+                    'key': key,
+                    'refund_url': refund_url,
+                }
+        return None
+
+    def _confirm(self, refund_url: str, rendered_status: str):
+        """Check the pending template against another rendered item; adopt or drop it"""
+        built = self._request_for(refund_url, self.pending)
+        if built is None:
+            return
+        url, post_data = built
+        try:
+            with timer.span('status_api', 'reverse_pages'):
+                response = self.context.request.fetch(url, method=self.pending['method'],
+                                                      headers=self.pending['headers'], data=post_data)
+            status = parse_status(response.json()) if response.ok else None
+        except Exception as e:
+            logger.debug(f"Status endpoint confirmation failed for {refund_url}: {e}")
+            status = None
+
+        if status is not None and status == rendered_status:
+            self.template = self.pending
+            self.pending = None
+            path = urlparse(self.template['url']).path
+            logger.info(f"Learned status endpoint {self.template['method']} {path} "
+                        f"(keyed by {self.template['param']}, confirmed on a second item)")
+            print(f"  • ⚡ Learned direct status endpoint: {path}")
+            self.stop_watching()
+        elif status is not None or rendered_status in STATUS_TEXTS.values():
+            # Disagrees with (or can't see) a rendered status: the call isn't this item's status
+            logger.debug(f"Status endpoint candidate rejected on {refund_url}: {status} != {rendered_status}")
+            self.pending = None
+
+    def learn(self, refund_url: str, rendered_status: str) -> bool:
+        """
+        Use the rendered status of refund_url to find the status call: a captured
+        call from this page whose payload agrees becomes the candidate, and is
+        adopted once a direct query for another rendered item agrees as well.
+        """
+        if self.ready or rendered_status in (None, 'unclear'):
+            return self.ready
+
+        if self.pending is not None and refund_url != self.pending['refund_url']:
+            self._confirm(refund_url, rendered_status)
+            if self.ready:
+                return True
+
+        params = id_params(refund_url)
+        same_page = []
+        for page, captured in list(self._candidates.items()):
+            if any(id_params(captured[0][1]).get(name) == value for name, value in params.items()):
+                same_page.extend(captured)
+                del self._candidates[page]
+        if self.pending is not None or rendered_status not in STATUS_TEXTS.values():
+            return False
+
+        for response, _ in same_page:
+            try:
+                if parse_status(response.json()) != rendered_status:
+                    continue
+            except Exception:
+                continue
+            self.pending = self._template_from(response, refund_url, params)
+            if self.pending is not None:
+                logger.debug(f"Status endpoint candidate {urlparse(self.pending['url']).path}, awaiting confirmation")
+                break
+        return False
+
+    def stop_watching(self):
+        if self._watching:
+            self.context.remove_listener('response', self._on_response)
+            self._watching = False
+        for page in self._tracked:
+            try:
+                page.remove_listener('framenavigated', self._on_navigated)
+                page.remove_listener('close', self._forget)
+            except Exception:
+                pass
+        self._tracked.clear()
+        self._candidates.clear()
+
+    def _request_for(self, refund_url: str, template: dict = None):
+        """Put refund_url's identifier into the learned request, or None"""
+        template = template or self.template
+        value = id_params(refund_url).get(template['param'])
+        if not value:
+            return None
+        return build_request(template, value)
+
+    def query(self, refund_url: str) -> str:
+        """Status for refund_url via the context's request client, or None to render instead"""
+        if not self.ready:
+            return None
+        if refund_url in self.cache:
+            return self.cache[refund_url]
+
+        built = self._request_for(refund_url)
+        status = None
+        if built:
+            url, post_data = built
+            try:
+                with timer.span('status_api', 'reverse_pages'):
+                    response = self.context.request.fetch(
+                        url, method=self.template['method'], headers=self.template['headers'], data=post_data
+                    )
+                if response.ok:
+                    status = parse_status(response.json())
+            except Exception as e:
+                logger.debug(f"Direct status query failed for {refund_url}: {e}")
+
+        self.stats['direct' if status else 'fallback'] += 1
+        self.cache[refund_url] = status
+        return status
+
+    def _cookie_header(self, url: str) -> str:
+        cookies = self.context.cookies(url)
+        return '; '.join(f"{c['name']}={c['value']}" for c in cookies)
+
+    def query_many(self, refund_urls: list[str]) -> dict:
+        """
+        Query many statuses in parallel plain-HTTP requests using the context's cookies.
+        Returns:
+            dict: refund URL -> status, or None where the page must be rendered
+        """
+        if not self.ready:
+            return {}
+
+        jobs = {}
+        for refund_url in refund_urls:
+            if refund_url in self.cache:
+                continue
+            built = self._request_for(refund_url)
+            if built:
+                url, post_data = built
+                headers = dict(self.template['headers'])
+                headers['Cookie'] = self._cookie_header(url)
+                jobs[refund_url] = (url, post_data, headers)
+
+        def fetch(job):
+            url, post_data, headers = job
+            data = post_data.encode('utf-8') if post_data else None
+            request = urllib.request.Request(url, data=data, headers=headers, method=self.template['method'])
+            try:
+                with urllib.request.urlopen(request, timeout=15) as response:
+                    return parse_status(json.loads(response.read().decode('utf-8')))
+            except Exception as e:
+                logger.debug(f"Batched status query failed for {url}: {e}")
+                return None
+
+        if jobs:
+            with timer.span('status_api_batch', 'reverse_pages'), ThreadPoolExecutor(self.workers) as pool:
+                for refund_url, status in zip(jobs, pool.map(fetch, jobs.values())):
+                    self.cache[refund_url] = status
+                    self.stats['direct' if status else 'fallback'] += 1
+
+        return {url: self.cache.get(url) for url in refund_urls}
+
+    def print_summary(self):
+        if self.ready:
+            print(f"\n⚡ Direct status checks: {self.stats['direct']} answered, {self.stats['fallback']} rendered")
+
+
+def fast_status_default() -> bool:
+    """Direct status queries are on unless FAST_STATUS=0"""
+    return os.getenv('FAST_STATUS', '1') != '0'
@@ -0,0 +1,287 @@
+"""
+Refund Status Sweep
+-------------------
+
+Read-only pass over refund URLs from previous runs: classifies every item,
+reports which statuses changed since the last run and, if an image is given,
+answers only the items that now wait for our response. Nothing else is
+submitted.
+
+Usage:
+    python status_sweep.py                          # All log_*.json in the current directory
+    python status_sweep.py log_20250101_120000.json  # Specific run logs (later files win)
+    python status_sweep.py --image proof.jpg         # Also answer 'needs response' items
+"""
+
+import argparse
+import glob
+import json
+import logging
+import time
+from datetime import datetime
+
+from playwright.sync_api import sync_playwright
+from ali_refund_claimer import CONTEXT_OPTIONS, DEFAULT_REFUND_MESSAGE, DEFAULT_REFUND_MESSAGE_2, save_dict_to_log
+from login_handler import LoginHandler
+from refunder import Refunder
+from retry_queue import classify_failure
+from status_api import StatusClient
+from evidence_cache import EvidenceCache
+from throttle import AdaptiveController, BlockedPageError, RefundPrefetcher
+from page_pool import PagePool, open_page, release_page
+from timing import timer
+
+logger = logging.getLogger(__name__)
+
+# Sweeps only read pages, so they can run wider than the submit pipeline
+SWEEP_RATE = 2.0
+SWEEP_MAX_RATE = 5.0
+SWEEP_MAX_CONCURRENCY = 8
+
+# check_refund_status() result -> status stored in the order log
+SWEEP_STATUSES = {
+    'refund_already_issued': 'already_issued',
+    'refund_ongoing': 'refund_ongoing',
+    'needs_response': 'needs_response',
+    'can_submit': 'can_submit',
+    'unclear': 'unclear',
+}
+
+# Order status is the most actionable of its items
+STATUS_PRIORITY = ['needs_response', 'can_submit', 'unclear', 'refund_ongoing', 'already_issued']
+
+
+def load_previous_runs(paths: list[str]) -> dict:
+    """Merge order logs, later files overriding earlier ones"""
+    order_dict = {}
+    for path in sorted(paths):
+        with open(path, 'r') as f:
+            for order_id, data in json.load(f).items():
+                if data.get('refund_urls'):
+                    order_dict[order_id] = data
+    return order_dict
+
+
+def classify_refund_url(context, refund_url: str, controller: AdaptiveController,
+                        prefetcher: RefundPrefetcher, status_client: StatusClient, pool: PagePool = None) -> str:
+    """Status of one refund URL, by direct query if possible, otherwise by rendering"""
+    status = status_client.query(refund_url)
+    if status:
+        return status
+
+    page = prefetcher.take(refund_url)
+    try:
+        if page is None:
+            controller.acquire('reverse_pages')
+            page = open_page(context, pool)
+            with timer.span('goto', 'reverse_pages'):
+                page.goto(refund_url)
+        with timer.span('networkidle', 'reverse_pages'):
+            page.wait_for_load_state('networkidle')
+        if controller.is_blocked(page):
+            raise BlockedPageError(page.url)
+
+        status = Refunder(page, None, '', '', interactive=False).check_refund_status()
+        status_client.learn(refund_url, status)
+        controller.record('status_unclear' if status == 'unclear' else None)
+        return status
+    except BlockedPageError:
+        controller.record('captcha')
+        return 'unclear'
+    except Exception as e:
+        logger.error(f"Error checking {refund_url}: {e}")
+        controller.record('timeout' if 'Timeout' in str(e) else 'network_error')
+        return 'unclear'
+    finally:
+        release_page(page, pool)
+
+
+def sweep(context, order_dict: dict, max_concurrency: int = SWEEP_MAX_CONCURRENCY) -> dict:
+    """
+    Classify every refund URL in order_dict.
+    Returns:
+        dict: refund URL -> check_refund_status() result
+    """
+    controller = AdaptiveController(rate=SWEEP_RATE, max_rate=SWEEP_MAX_RATE, max_concurrency=max_concurrency)
+    pool = PagePool(context, max_size=max_concurrency)
+    prefetcher = RefundPrefetcher(context, controller, pool)
+    status_client = StatusClient(context)
+    status_client.watch()
+
+    upcoming = [url for data in order_dict.values() for url in data['refund_urls']]
+    results = {}
+    batched = False
+    total = len(upcoming)
+
+    print(f"\n🔍 Sweeping {total} refund items from {len(order_dict)} orders...")
+    for n, refund_url in enumerate(list(upcoming), 1):
+        upcoming.remove(refund_url)
+        if status_client.ready and not batched:
+            batched = True
+            statuses = status_client.query_many(upcoming)
+            upcoming = [url for url in upcoming if not statuses.get(url)]
+
+        prefetcher.fill(upcoming)
+        results[refund_url] = classify_refund_url(context, refund_url, controller, prefetcher, status_client, pool)
+        print(f"  • [{n}/{total}] {SWEEP_STATUSES[results[refund_url]]}")
+
+    prefetcher.close_all()
+    pool.print_summary()
+    pool.close_all()
+    status_client.stop_watching()
+    status_client.print_summary()
+    controller.print_summary()
+    return results
+
+
+def build_transitions(order_dict: dict, results: dict) -> list[dict]:
+    """Per-order previous vs. current status"""
+    transitions = []
+    for order_id, data in order_dict.items():
+        item_statuses = [SWEEP_STATUSES[results[url]] for url in data['refund_urls'] if url in results]
+        if not item_statuses:
+            continue
+        current = min(item_statuses, key=STATUS_PRIORITY.index)
+        transitions.append({
+            'order_id': order_id,
+            'previous': data.get('status', 'unknown'),
+            'current': current,
+            'items': {url: SWEEP_STATUSES[results[url]] for url in data['refund_urls'] if url in results},
+        })
+    return transitions
+
+
+def print_transitions(transitions: list[dict]):
+    print("\n" + "="*50)
+    print("🔄 Status Transitions")
+    print("="*50)
+
+    changed = [t for t in transitions if t['previous'] != t['current']]
+    if not changed:
+        print("\nNo status changes since the last run.")
+    for t in changed:
+        print(f"  • {t['order_id']}: {t['previous']} → {t['current']}")
+
+    counts = {}
+    for t in transitions:
+        counts[t['current']] = counts.get(t['current'], 0) + 1
+    print(f"\n📦 {len(transitions)} orders checked, {len(changed)} changed")
+    for status in STATUS_PRIORITY:
+        if counts.get(status):
+            print(f"  • {status.replace('_', ' ').title()}: {counts[status]}")
+
+
+def respond_to_waiting(context, transitions: list[dict], image_path: str, message: str) -> dict:
+    """Submit disagreement evidence for items that now need a response, one paced tab at a time"""
+    responded = {}
+    controller = AdaptiveController(max_concurrency=1)
+    pool = PagePool(context, max_size=1)
+    evidence = EvidenceCache(context, image_path)
+    evidence.watch()
+    for t in transitions:
+        for refund_url, status in t['items'].items():
+            if status != 'needs_response':
+                continue
+            print(f"\n📝 Order {t['order_id']}: responding...")
+            controller.acquire('reverse_pages')
+            page = open_page(context, pool)
+            try:
+                with timer.span('goto', 'reverse_pages'):
+                    page.goto(refund_url)
+                with timer.span('networkidle', 'reverse_pages'):
+                    page.wait_for_load_state('networkidle')
+                if controller.is_blocked(page):
+                    raise BlockedPageError(page.url)
+                refunder = Refunder(page, image_path, DEFAULT_REFUND_MESSAGE, message, interactive=False,
+                                    evidence=evidence)
+                responded[refund_url] = refunder.handle_waiting_response()
+                controller.record(None)
+            except BlockedPageError:
+                print("    🛑 Captcha/anti-bot page instead of refund page")
+                controller.record('captcha')
+                responded[refund_url] = False
+            except Exception as e:
+                logger.error(f"Error responding on {refund_url}: {e}")
+                controller.record(classify_failure(e))
+                responded[refund_url] = False
+            finally:
+                release_page(page, pool)
+    pool.close_all()
+    evidence.close()
+    evidence.print_summary()
+    return responded
+
+
+def save_sweep(order_dict: dict, transitions: list[dict], responded: dict):
+    """Write the updated order log (baseline for the next sweep) and the transitions report"""
+    for t in transitions:
+        data = order_dict[t['order_id']]
+        data['status'] = t['current']
+        data['last_check_time'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        if any(responded.get(url) for url in t['items']):
+            data['status'] = 'evidence_submitted'
+    save_dict_to_log(order_dict)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    with open(f"sweep_{timestamp}.json", 'w') as f:
+        json.dump({'transitions': transitions, 'responded': responded}, f, indent=2)
+    print(f"📝 Transitions saved to sweep_{timestamp}.json")
+
+
+def run_sweep(context, paths: list[str], image_path: str = None, message: str = DEFAULT_REFUND_MESSAGE_2,
+              concurrency: int = SWEEP_MAX_CONCURRENCY) -> list[dict]:
+    """
+    Sweep the refund URLs from the given logs in an already logged-in context.
+    Returns:
+        list: Per-order transitions
+    """
+    order_dict = load_previous_runs(paths)
+    if not order_dict:
+        print("❌ No refund URLs found in previous run logs")
+        return []
+
+    results = sweep(context, order_dict, concurrency)
+    transitions = build_transitions(order_dict, results)
+    print_transitions(transitions)
+
+    responded = {}
+    if image_path:
+        responded = respond_to_waiting(context, transitions, image_path, message)
+    elif any(t['current'] == 'needs_response' for t in transitions):
+        print("\n⚠️ Some items need a response - re-run with --image to answer them")
+
+    save_sweep(order_dict, transitions, responded)
+    return transitions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Read-only status sweep over refunds from previous runs")
+    parser.add_argument('logs', nargs='*', help="Order logs from previous runs (default: log_*.json)")
+    parser.add_argument('--image', help="Proof image; when given, 'needs response' items are answered")
+    parser.add_argument('--message', default=DEFAULT_REFUND_MESSAGE_2, help="Disagreement message")
+    parser.add_argument('--concurrency', type=int, default=SWEEP_MAX_CONCURRENCY)
+    parser.add_argument('--headless', action='store_true')
+    args = parser.parse_args()
+
+    paths = args.logs or glob.glob('log_*.json')
+    if not load_previous_runs(paths):
+        print("❌ No refund URLs found in previous run logs")
+        return
+
+    start = time.perf_counter()
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=args.headless, args=['--disable-blink-features=AutomationControlled'])
+        context = browser.new_context(**CONTEXT_OPTIONS)
+        page = context.new_page()
+        try:
+            LoginHandler(page).login()
+            run_sweep(context, paths, args.image, args.message, args.concurrency)
+        finally:
+            browser.close()
+
+    timer.print_summary()
+    print(f"\n⏱️ Sweep finished in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
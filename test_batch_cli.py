@@ -0,0 +1,46 @@
+import io
+
+from batch_cli import _read_csv, _read_lines, chunked, iter_orders
+
+DETAIL = "https://www.aliexpress.com/p/order/detail.html?orderId={}"
+
+
+def test_csv_with_known_header_column():
+    f = io.StringIO("date,orderId\n2025-01-01,111\n2025-01-02,222\n")
+    assert list(_read_csv(f)) == ['111', '222']
+
+
+def test_csv_without_header_uses_first_column():
+    f = io.StringIO("111,x\n222,y\n")
+    assert list(_read_csv(f)) == ['111', '222']
+
+
+def test_lines_accept_json_records_and_skip_comments():
+    f = io.StringIO('# ids\n{"order_id": 111}\n"222"\n333\n{bad json\n\n')
+    assert list(_read_lines(f)) == ['111', '222', '333']
+
+
+def test_iter_orders_dedupes_by_order_id(tmp_path):
+    ids = tmp_path / 'ids.txt'
+    ids.write_text(f"111\n{DETAIL.format(111)}&tracelog=x\nnot-an-order\n")
+    export = tmp_path / 'export.jsonl'
+    export.write_text('{"url": "%s"}\n{"orderId": "222"}\n' % DETAIL.format(222))
+
+    stats = {}
+    orders = list(iter_orders([str(ids), str(export)], stats))
+    assert orders == [('111', DETAIL.format(111)), ('222', DETAIL.format(222))]
+    assert stats == {'orders': 2, 'duplicates': 2, 'invalid': 1}
+
+
+def test_chunked_pulls_lazily():
+    pulled = []
+
+    def source():
+        for n in range(5):
+            pulled.append(n)
+            yield n
+
+    chunks = chunked(source(), 2)
+    assert next(chunks) == [0, 1]
+    assert pulled == [0, 1]
+    assert list(chunks) == [[2, 3], [4]]
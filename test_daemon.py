@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from daemon import FAILED_PASS_BACKOFF, RefundDaemon, WorkQueue, next_daily, parse_work_item, read_inbox
+
+REFUND_URL = "https://www.aliexpress.com/reverse-pages/detail?reverseOrderLineId=5012345678&lang=en"
+DETAIL = "https://www.aliexpress.com/p/order/detail.html?orderId={}"
+
+
+def test_parse_work_item():
+    assert parse_work_item("  1000000000000001\n") == ('1000000000000001', 'order', DETAIL.format('1000000000000001'))
+    assert parse_work_item(DETAIL.format(42) + "&x=1") == ('42', 'order', DETAIL.format(42) + "&x=1")
+    assert parse_work_item(REFUND_URL) == ('refund:5012345678', 'refund', REFUND_URL)
+    for value in ('', '# comment', 'hello'):
+        assert parse_work_item(value) is None
+
+
+def test_next_daily():
+    now = datetime(2025, 3, 1, 1, 30)
+    assert next_daily('02:00', now) == datetime(2025, 3, 1, 2, 0)
+    assert next_daily('01:30', now) == datetime(2025, 3, 2, 1, 30)
+
+
+def test_queue_persists_dedupes_and_gives_up(tmp_path):
+    path = str(tmp_path / 'queue.json')
+    queue = WorkQueue(path, max_attempts=2)
+    assert queue.add('111') and queue.add(REFUND_URL)
+    assert not queue.add(DETAIL.format(111))  # Same order
+    assert set(WorkQueue(path).pending('order')) == {'111'}
+
+    queue.record('refund:5012345678', 'refund_ongoing')
+    queue.record('111', 'failed', 'timeout')
+    assert WorkQueue(path).items['111']['state'] == 'pending'
+    queue.record('111', 'failed', 'timeout')
+    assert queue.counts() == {'pending': 0, 'done': 1, 'failed': 1}
+
+    assert not queue.add(REFUND_URL)  # Done stays done
+    assert queue.add('111')           # Failed can be queued again
+    assert queue.items['111']['attempts'] == 0
+
+
+def test_read_inbox_moves_lines_into_the_queue(tmp_path):
+    inbox = tmp_path / 'inbox.txt'
+    inbox.write_text("111\n# note\n111\n222\n")
+    queue = WorkQueue(str(tmp_path / 'queue.json'))
+    assert read_inbox(str(inbox), queue) == 2
+    assert not inbox.exists()
+    assert read_inbox(str(inbox), queue) == 0
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    queue = WorkQueue(str(tmp_path / 'queue.json'))
+    return RefundDaemon({}, queue, claim_at=None, sweep_every=0, claim_on_arrival=True,
+                        inbox=str(tmp_path / 'inbox.txt'))
+
+
+def test_due_claims_new_arrivals_only(daemon):
+    assert daemon.due() == []
+    daemon.queue.add('111')
+    assert daemon.due() == ['claim']
+    daemon.queue.record('111', 'failed')
+    assert daemon.due() == []  # Retried by the scheduled pass, not on arrival
+    daemon.command('sweep', '')
+    assert daemon.due() == ['sweep']
+
+
+def test_failed_passes_pause_claiming_on_arrival(daemon):
+    daemon.queue.add('111')
+    daemon.back_off_claims()
+    daemon.back_off_claims()
+    pause = daemon.claim_backoff_until - datetime.now()
+    assert timedelta(seconds=2 * FAILED_PASS_BACKOFF - 5) < pause <= timedelta(seconds=2 * FAILED_PASS_BACKOFF)
+    assert daemon.due() == []
+    assert daemon.command('status', '')['claims_paused_until'] is not None
+
+    daemon.claim_backoff_until = datetime.now() - timedelta(seconds=1)
+    assert daemon.due() == ['claim']
+    daemon.command('claim', '')
+    assert daemon.due() == ['claim']
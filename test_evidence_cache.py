@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from evidence_cache import EvidenceCache, find_asset_reference
+
+IMAGE = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 2
+
+
+def test_find_asset_reference():
+    assert find_asset_reference({'success': True, 'data': {'url': 'https://ae01.example.com/kf/S1.png'}}) \
+        == 'https://ae01.example.com/kf/S1.png'
+    assert find_asset_reference({'data': [{'fs_url': 'kf/S2.JPG?x=1'}]}) == 'kf/S2.JPG?x=1'
+    assert find_asset_reference({'code': 'OK', 'ids': [1, 2], 'name': 'proof'}) is None
+    assert find_asset_reference('//cdn.example.com/a') == '//cdn.example.com/a'
+
+
+class FakeRequest:
+    def __init__(self, body, method='POST', url='https://upload.example.com/api/upload?t=1'):
+        self.post_data_buffer = body
+        self.method = method
+        self.url = url
+
+
+class FakeResponse:
+    def __init__(self, request, payload, ok=True):
+        self.request = request
+        self.payload = payload
+        self.ok = ok
+        self.status = 200 if ok else 500
+        self.headers = {'content-type': 'application/json', 'content-length': '42'}
+
+    def body(self):
+        return json.dumps(self.payload).encode()
+
+
+class FakeContext:
+    def on(self, event, handler):
+        self.handler = handler
+
+    def remove_listener(self, event, handler):
+        self.handler = None
+
+
+@pytest.fixture
+def cache(tmp_path):
+    image = tmp_path / 'proof.png'
+    image.write_bytes(IMAGE)
+    cache = EvidenceCache(FakeContext(), str(image))
+    cache.watch()
+    return cache
+
+
+def test_stores_only_an_upload_of_the_proof_image(cache):
+    other = FakeRequest(b'some other form')
+    cache._on_response(FakeResponse(other, {'url': 'https://ae01.example.com/other.png'}))
+    upload = FakeRequest(b'--boundary\r\n' + IMAGE)
+    cache._on_response(FakeResponse(upload, {'code': 'OK'}))
+    assert cache.stored is None
+
+    cache._on_response(FakeResponse(upload, {'data': {'url': 'https://ae01.example.com/kf/S1.png'}}))
+    assert cache.serving
+    assert cache.stored['glob'] == 'https://upload.example.com/api/upload*'
+    assert 'content-length' not in cache.stored['headers']
+    assert cache.context.handler is None
+
+
+def test_reject_switches_back_to_real_uploads(cache):
+    cache._on_response(FakeResponse(FakeRequest(IMAGE), {'url': 'https://ae01.example.com/kf/S1.png'}))
+    cache.confirm()
+    cache.reject('submit refused')
+    assert not cache.serving
+    assert cache.confirmed == 1
+
+    class Page:
+        def route(self, *args):
+            raise AssertionError("rejected reference must not be routed")
+
+    assert cache.arm(Page()) is False
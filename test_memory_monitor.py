@@ -0,0 +1,65 @@
+import pytest
+
+import memory_monitor
+from memory_monitor import MAX_BACKOFF_SECONDS, MB, MemoryMonitor
+
+
+class FakeContext:
+    pages = ()
+
+
+@pytest.fixture
+def usage(monkeypatch):
+    """Memory figures and a clock the monitor reads; tests change them between samples"""
+    state = {'browser': 100 * MB, 'python': 50 * MB, 'now': 1000.0}
+    monkeypatch.setattr(memory_monitor, 'child_process_rss_bytes', lambda: state['browser'])
+    monkeypatch.setattr(memory_monitor, 'python_rss_bytes', lambda: state['python'])
+    monkeypatch.setattr(memory_monitor.time, 'monotonic', lambda: state['now'])
+    return state
+
+
+@pytest.fixture
+def monitor():
+    return MemoryMonitor(browser_watermark_mb=1000, python_watermark_mb=200, sample_seconds=30)
+
+
+def test_samples_at_most_every_interval(usage, monitor):
+    context = FakeContext()
+    assert not monitor.over_watermark(context)
+    usage['browser'] = 2000 * MB
+    usage['now'] += 10
+    assert not monitor.over_watermark(context)  # Not due yet
+    assert monitor.over_watermark(context, force=True)
+    assert monitor.peak['browser'] == 2000 * MB
+
+
+def test_python_watermark_only_warns(usage, monitor):
+    usage['python'] = 500 * MB
+    assert not monitor.over_watermark(FakeContext(), force=True)
+    assert monitor.python_warned
+
+
+def test_recycles_that_do_not_help_back_off_exponentially(usage, monitor):
+    context = FakeContext()
+    usage['browser'] = 2000 * MB
+    delays = []
+    for _ in range(8):
+        assert monitor.over_watermark(context, force=True)
+        monitor.recycled(context)
+        delays.append(monitor.backoff_until - usage['now'])
+        usage['now'] += 1
+        assert not monitor.over_watermark(context, force=True)  # Backing off
+        usage['now'] = monitor.backoff_until
+    assert delays[:3] == [60, 120, 240]
+    assert delays[-1] == MAX_BACKOFF_SECONDS
+    assert monitor.recycles == 8
+
+
+def test_a_recycle_that_helps_clears_the_backoff(usage, monitor):
+    context = FakeContext()
+    usage['browser'] = 2000 * MB
+    monitor.recycled(context)
+    assert monitor.failed_recycles == 1
+    usage['browser'] = 300 * MB
+    monitor.recycled(context)
+    assert monitor.failed_recycles == 0
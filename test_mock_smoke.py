@@ -0,0 +1,27 @@
+import pytest
+
+from mock_server import DEFAULT_ORDERS
+
+
+@pytest.fixture(scope='module')
+def results():
+    from benchmark import run_benchmark
+    from playwright.sync_api import Error, sync_playwright
+
+    with sync_playwright() as p:
+        try:
+            p.chromium.launch().close()
+        except Error as e:
+            pytest.skip(f"Chromium not available: {e}")
+    return run_benchmark(DEFAULT_ORDERS)
+
+
+def test_collect_and_refund_against_mock_server(results):
+    assert results['orders'] == 6
+    assert results['refunds'] == 7
+    assert results['statuses'] == {
+        'refund_submitted': 1,
+        'evidence_submitted': 1,
+        'refund_ongoing': 2,
+        'failed': 1,  # The unclear page
+    }
@@ -0,0 +1,127 @@
+import order_sync
+from order_sync import OrderStore, sync_orders
+
+
+def _row(order_id, date, status='Completed'):
+    return {'order_id': order_id, 'status': status, 'order_date': date}
+
+
+def test_is_behind_high_water(tmp_path):
+    store = OrderStore(str(tmp_path / 'store.json'))
+    assert not store.is_behind_high_water(_row('1', '2025-01-01'))
+
+    store.merge(_row('1', '2025-01-01'))
+    store.merge(_row('2', '2025-01-05'))
+    store.high_water = {'order_id': '2', 'order_date': '2025-01-05'}
+    assert store.is_behind_high_water(_row('2', '2025-01-05'))
+    assert store.is_behind_high_water(_row('1', '2025-01-01'))
+    assert not store.is_behind_high_water(_row('3', '2025-01-06'))  # New order
+    assert not store.is_behind_high_water(_row('3', '2024-12-01'))  # Unknown, even if older
+
+
+def test_merge_reports_new_and_changed(tmp_path):
+    store = OrderStore(str(tmp_path / 'store.json'))
+    assert store.merge(_row('1', '2025-01-01', 'Awaiting delivery')) == 'new'
+    assert store.merge(_row('1', '2025-01-01', 'Awaiting delivery')) is None
+    assert store.merge(_row('1', '2025-01-01', 'Completed')) == 'changed'
+    assert store.orders['1']['previous_status'] == 'Awaiting delivery'
+
+
+class FakePage:
+    def goto(self, url):
+        pass
+
+    def wait_for_load_state(self, state):
+        pass
+
+
+def _fake_list(monkeypatch, pages, stop):
+    """Serve pages of rows, then answer load_more with stop"""
+    state = {'page': 0}
+    def scrape(page):
+        rows = sum(pages[:state['page'] + 1], [])
+        return rows, {'selector': '.order-item', 'shown': len(rows)}
+
+    monkeypatch.setattr(order_sync, 'scrape_visible_orders', scrape)
+
+    def load_more(page, listing):
+        if state['page'] + 1 >= len(pages):
+            return stop
+        state['page'] += 1
+        return 'more'
+
+    monkeypatch.setattr(order_sync, 'load_more', load_more)
+
+
+def test_first_sync_sets_mark_only_at_end_of_list(tmp_path, monkeypatch):
+    path = str(tmp_path / 'store.json')
+    pages = [[_row('3', '2025-01-03'), _row('2', '2025-01-02')], [_row('1', '2025-01-01')]]
+
+    _fake_list(monkeypatch, pages, 'timeout')
+    result = sync_orders(FakePage(), OrderStore(path))
+    assert result['stopped'] == 'timeout'
+    assert OrderStore(path).high_water is None
+
+    _fake_list(monkeypatch, pages, 'end')
+    sync_orders(FakePage(), OrderStore(path))
+    assert OrderStore(path).high_water == {'order_id': '3', 'order_date': '2025-01-03'}
+
+
+def test_later_sync_stops_at_mark(tmp_path, monkeypatch):
+    path = str(tmp_path / 'store.json')
+    _fake_list(monkeypatch, [[_row('2', '2025-01-02')], [_row('1', '2025-01-01')]], 'end')
+    sync_orders(FakePage(), OrderStore(path))
+
+    _fake_list(monkeypatch, [[_row('4', '2025-01-04'), _row('2', '2025-01-02', 'Refunded')],
+                             [_row('1', '2025-01-01')]], 'end')
+    result = sync_orders(FakePage(), OrderStore(path))
+    assert result['stopped'] == 'mark'
+    assert result['pages'] == 1
+    assert result['new'] == ['4'] and result['changed'] == ['2']
+    assert OrderStore(path).high_water['order_id'] == '4'
+
+
+class ListPage:
+    """Orders page whose list holds a link-less item (e.g. an ad) and grows when waited on"""
+
+    def __init__(self, grows=True):
+        self.grows = grows
+        self.waited = []
+
+    def evaluate(self, script, selectors):
+        assert selectors[0] == ['.order-item', '[class*="order-item--"]']
+        return {'itemSel': '.order-item', 'shown': 3, 'rows': [
+            {'href': 'https://www.aliexpress.com/p/order/detail.html?orderId=3&x=1', 'status': 'Completed',
+             'date': 'Order date: Jan 03, 2025'},
+            {'href': None, 'status': None, 'date': ''},
+            {'href': 'https://www.aliexpress.com/p/order/detail.html?orderId=2', 'status': None, 'date': 'n/a'},
+        ]}
+
+    def wait_for_function(self, script, arg, timeout):
+        self.waited.append(arg)
+        if not self.grows:
+            raise TimeoutError("Timeout 10000ms exceeded")
+
+
+def test_scrape_counts_every_shown_item(monkeypatch):
+    monkeypatch.setattr(order_sync.registry, 'resolved', {})
+    rows, listing = order_sync.scrape_visible_orders(ListPage())
+    assert rows == [{'order_id': '3', 'status': 'Completed', 'order_date': '2025-01-03'},
+                    {'order_id': '2', 'status': None, 'order_date': None}]
+    assert listing == {'selector': '.order-item', 'shown': 3}
+
+
+def test_load_more_waits_with_the_scraped_selector_and_count(monkeypatch):
+    class Button:
+        def click(self):
+            pass
+
+    monkeypatch.setattr(order_sync.registry, 'visible', lambda page, name: True)
+    monkeypatch.setattr(order_sync.registry, 'locator', lambda page, name: Button())
+    page = ListPage()
+    assert order_sync.load_more(page, {'selector': '.order-item', 'shown': 3}) == 'more'
+    assert page.waited == [['.order-item', 3]]
+    assert order_sync.load_more(ListPage(grows=False), {'selector': '.order-item', 'shown': 3}) == 'timeout'
+
+    monkeypatch.setattr(order_sync.registry, 'visible', lambda page, name: False)
+    assert order_sync.load_more(page, {'selector': '.order-item', 'shown': 3}) == 'end'
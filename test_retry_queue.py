@@ -0,0 +1,42 @@
+import pytest
+
+from retry_queue import RetryQueue, classify_failure
+
+
+def test_backoff_doubles_and_caps():
+    queue = RetryQueue(base_delay=10, max_delay=50)
+    assert 9 <= queue.backoff(1) <= 11
+    assert 18 <= queue.backoff(2) <= 22
+    assert 45 <= queue.backoff(5) <= 55
+
+
+def test_drain_retries_until_success():
+    queue = RetryQueue(max_attempts=3, base_delay=0)
+    queue.add('1', 'upload_timeout', 'u1')
+    outcomes = iter(['upload_timeout', None])
+    queue.drain(lambda item: next(outcomes))
+    assert len(queue) == 0
+    assert [item['order_id'] for item in queue.resolved] == ['1']
+    assert queue.resolved[0]['attempts'] == 3
+
+
+def test_drain_exhausts_and_classifies_exceptions():
+    queue = RetryQueue(max_attempts=2, base_delay=0)
+    queue.add('1', 'submit_failed', 'u1')
+
+    def handler(item):
+        raise RuntimeError("Timeout 30000ms exceeded")
+
+    queue.drain(handler)
+    assert queue.exhausted[0]['reason'] == 'timeout'
+    assert queue.exhausted[0]['attempts'] == 2
+    assert not queue.resolved
+
+
+@pytest.mark.parametrize('message, reason', [
+    ("Timeout 5000ms exceeded", 'timeout'),
+    ("net::ERR_CONNECTION_RESET", 'network_error'),
+    ("something else", 'error'),
+])
+def test_classify_failure(message, reason):
+    assert classify_failure(Exception(message)) == reason
@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from scheduling import DeadlineScheduler, parse_date, parse_deadline
+
+NOW = datetime(2025, 3, 1, 12, 0)
+
+
+def test_parse_deadline_countdown():
+    text = "Order shipped\nBuyer protection ends in 3 days 4 hours\nTotal: $5.00"
+    assert parse_deadline(text, NOW) == NOW + timedelta(days=3, hours=4)
+
+
+def test_parse_deadline_absolute_date_ends_that_day():
+    assert parse_deadline("Open a dispute before Mar. 5, 2025", NOW) == datetime(2025, 3, 5, 23, 59)
+
+
+def test_parse_deadline_prefers_protection_over_return_blurbs():
+    text = "Free returns within 90 days\nProtection ends in 2 days"
+    assert parse_deadline(text, NOW) == NOW + timedelta(days=2)
+
+
+def test_parse_deadline_falls_back_to_refund_lines():
+    assert parse_deadline("Refund window closes in 5 days", NOW) == NOW + timedelta(days=5)
+
+
+def test_parse_deadline_without_deadline():
+    assert parse_deadline("Buyer protection\nDelivered", NOW) is None
+    assert parse_date("not a date") is None
+
+
+def _orders():
+    return {
+        'late': {'deadline': '2025-03-10T12:00', 'refund_urls': ['u-late'], 'status': 'can_submit'},
+        'soon': {'deadline': '2025-03-02T12:00', 'refund_urls': ['u-soon'], 'status': 'can_submit'},
+        'none': {'refund_urls': ['u-none']},
+        'tie_submit': {'deadline': '2025-03-05T12:00', 'refund_urls': ['u-tie-a'], 'status': 'can_submit'},
+        'tie_respond': {'deadline': '2025-03-05T12:00', 'refund_urls': ['u-tie-b'], 'status': 'needs_response'},
+    }
+
+
+def test_scheduler_orders_by_deadline_then_state():
+    assert list(DeadlineScheduler(_orders())) == ['soon', 'tie_respond', 'tie_submit', 'late', 'none']
+
+
+def test_scheduler_rerank_skips_superseded_entries():
+    scheduler = DeadlineScheduler(_orders())
+    scheduler.update_states({'u-tie-a': 'needs_response', 'u-tie-b': 'already_issued'})
+    assert scheduler.upcoming_urls() == ['u-soon', 'u-tie-a', 'u-tie-b', 'u-late', 'u-none']
+    assert len(scheduler) == 5
+    assert list(scheduler) == ['soon', 'tie_submit', 'tie_respond', 'late', 'none']
+    assert len(scheduler) == 0
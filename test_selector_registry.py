@@ -0,0 +1,85 @@
+import pytest
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+from selector_registry import SelectorRegistry, with_text
+
+
+class FakeLocator:
+    def __init__(self, page, selector):
+        self.page = page
+        self.selector = selector
+
+    @property
+    def first(self):
+        return self
+
+    def _matches(self):
+        return any(part.strip() in self.page.shown for part in self.selector.split(','))
+
+    def count(self):
+        return int(self._matches())
+
+    def is_visible(self):
+        return self._matches()
+
+    def wait_for(self, state='visible', timeout=None):
+        self.page.waits.append(timeout)
+        if not self._matches():
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms exceeded")
+
+
+class FakePage:
+    def __init__(self, *shown):
+        self.shown = set(shown)
+        self.waits = []
+
+    def locator(self, selector):
+        return FakeLocator(self, selector)
+
+
+@pytest.fixture
+def registry():
+    return SelectorRegistry({'thumb': ['.primary', '.fallback', 'div']}, max_misses=3, suspect_timeout=5000)
+
+
+def test_with_text_filters_every_part():
+    assert with_text('.a, .b', 'Go "now"') == '.a:has-text("Go \\"now\\""), .b:has-text("Go \\"now\\"")'
+    assert with_text('.a') == '.a'
+
+
+def test_priority_order_beats_page_order(registry):
+    page = FakePage('div', '.fallback')
+    assert registry.wait(page, 'thumb').selector == '.fallback'
+    assert registry.resolved['thumb'] == '.fallback'
+    assert registry.candidates('thumb') == ['.fallback']
+
+
+def test_misses_shorten_timeouts_and_mark_broken(registry):
+    page = FakePage()
+    for _ in range(3):
+        with pytest.raises(PlaywrightTimeoutError):
+            registry.wait(page, 'thumb', timeout=30000)
+    assert page.waits == [30000, 5000, 5000]
+    assert registry.broken() == ['thumb']
+
+
+def test_network_waits_are_not_counted(registry):
+    page = FakePage()
+    for _ in range(3):
+        with pytest.raises(PlaywrightTimeoutError):
+            registry.wait(page, 'thumb', timeout=30000, count_miss=False)
+    assert page.waits == [30000, 30000, 30000]
+    assert registry.broken() == []
+
+
+def test_stale_cache_falls_back_and_a_hit_resets_misses(registry):
+    page = FakePage('.primary')
+    registry.wait(page, 'thumb')
+    page.shown = {'.fallback'}
+    assert registry.wait(page, 'thumb').selector == '.fallback'
+
+    registry.miss('thumb')
+    registry.hit('thumb')
+    assert registry.misses['thumb'] == 0
+    registry.reset()
+    assert registry.candidates('thumb') == ['.primary', '.fallback', 'div']
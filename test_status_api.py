@@ -0,0 +1,189 @@
+import json
+
+import pytest
+
+from status_api import MAX_CANDIDATES_PER_PAGE, StatusClient, build_request, locate_key, parse_status
+
+REFUND_URL = "https://www.aliexpress.com/reverse-pages/detail?reverseOrderId={}&lang=en"
+API_URL = "https://api.example.com/h5/dispute.detail/1.0/?appKey=12574478&t=1700000000"
+
+
+def test_parse_status_reads_top_level_and_wrappers():
+    assert parse_status({'statusText': "Refund complete"}) == 'refund_already_issued'
+    assert parse_status({'data': {'module': {'disputeStatus': "Waiting for AliExpress’s feedback"}}}) == 'refund_ongoing'
+
+
+def test_parse_status_ignores_timelines_and_ambiguity():
+    timeline = {'statusText': "Waiting for your response",
+                'steps': [{'status': "We're reviewing your request"}]}
+    assert parse_status(timeline) == 'needs_response'
+    # Regression: a timeline entry alone must not read as a terminal status
+    assert parse_status({'steps': [{'status': "Refund complete"}]}) is None
+    assert parse_status({'status': "Refund complete", 'data': {'status': "Waiting for your response"}}) is None
+    assert parse_status({'status': "Refund complete soon"}) is None
+    assert parse_status(["Refund complete"]) is None
+
+
+def test_locate_key_needs_an_exact_field():
+    assert locate_key(f"{API_URL}&id=5012345678", None, '5012345678') == ('query', 'id')
+    assert locate_key(API_URL, 'a=1&disputeId=5012345678', '5012345678') == ('form', 'disputeId')
+    body = json.dumps({'params': {'ids': [5012345678], 'flag': True}})
+    assert locate_key(API_URL, body, '5012345678') == ('json', ('params', 'ids', 0))
+    assert locate_key(f"{API_URL}&id=50123456789", '{"x": "5012345678-1"}', '5012345678') is None
+
+
+def test_build_request_replaces_only_the_key_field():
+    template = {'url': f"{API_URL}&id=111111111", 'post_data': None, 'key': ('query', 'id')}
+    url, _ = build_request(template, '222222222')
+    assert 'id=222222222' in url and 'appKey=12574478' in url
+
+    template = {'url': API_URL, 'post_data': 'a=111111111&id=111111111', 'key': ('form', 'id')}
+    assert build_request(template, '222222222')[1] == 'a=111111111&id=222222222'
+
+    template = {'url': API_URL, 'post_data': json.dumps({'q': {'id': 111111111, 'n': 111111111}}),
+                'key': ('json', ('q', 'id'))}
+    assert json.loads(build_request(template, '222222222')[1]) == {'q': {'id': 222222222, 'n': 111111111}}
+
+
+class FakeEmitter:
+    def __init__(self):
+        self.handlers = {}
+
+    def on(self, event, handler):
+        self.handlers.setdefault(event, []).append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers[event].remove(handler)
+
+    def emit(self, event, arg):
+        for handler in list(self.handlers.get(event, [])):
+            handler(arg)
+
+
+class FakePage(FakeEmitter):
+    def __init__(self):
+        super().__init__()
+        self.main_frame = FakeFrame(self)
+
+
+class FakeFrame:
+    def __init__(self, page):
+        self.page = page
+        self.url = 'about:blank'
+
+
+class FakeRequest:
+    def __init__(self, refund_id, resource_type='xhr'):
+        self.url = f"{API_URL}&disputeId={refund_id}"
+        self.method = 'GET'
+        self.post_data = None
+        self.headers = {'accept': 'application/json', 'cookie': 'secret'}
+        self.resource_type = resource_type
+
+
+class FakeResponse:
+    def __init__(self, frame, refund_id, payload, resource_type='xhr'):
+        self.frame = frame
+        self.request = FakeRequest(refund_id, resource_type)
+        self.payload = payload
+        self.ok = True
+
+    def json(self):
+        return self.payload
+
+
+class FakeApi:
+    """context.request: answers direct queries from a refund ID -> payload map"""
+
+    def __init__(self, payloads):
+        self.payloads = payloads
+        self.fetched = []
+
+    def fetch(self, url, method=None, headers=None, data=None):
+        refund_id = url.split('disputeId=')[1].split('&')[0]
+        self.fetched.append(refund_id)
+        return FakeResponse(None, refund_id, self.payloads[refund_id])
+
+
+class FakeContext(FakeEmitter):
+    def __init__(self, payloads):
+        super().__init__()
+        self.request = FakeApi(payloads)
+
+
+def status(text):
+    return {'data': {'statusText': text}}
+
+
+@pytest.fixture
+def payloads():
+    return {'1111111111': status("Refund complete"), '2222222222': status("Waiting for your response"),
+            '3333333333': status("Refund complete")}
+
+
+def render(context, refund_id, payload):
+    """Load a refund item in a new tab: it makes its status call plus an unrelated one"""
+    page = FakePage()
+    page.main_frame.url = REFUND_URL.format(refund_id)
+    page.emit('framenavigated', page.main_frame)
+    context.emit('response', FakeResponse(page.main_frame, refund_id, payload))
+    context.emit('response', FakeResponse(page.main_frame, refund_id, {'steps': []}))
+    return page
+
+
+def test_learn_adopts_only_after_a_second_item_agrees(payloads):
+    context = FakeContext(payloads)
+    client = StatusClient(context)
+    client.watch()
+
+    render(context, '1111111111', payloads['1111111111'])
+    assert client.learn(REFUND_URL.format('1111111111'), 'refund_already_issued') is False
+    assert client.pending['key'] == ('query', 'disputeId')
+    assert 'cookie' not in client.pending['headers']
+    assert not client.ready
+
+    render(context, '2222222222', payloads['2222222222'])
+    assert client.learn(REFUND_URL.format('2222222222'), 'needs_response') is True
+    assert context.request.fetched == ['2222222222']
+    assert client.query(REFUND_URL.format('3333333333')) == 'refund_already_issued'
+    assert context.handlers['response'] == []
+
+
+def test_learn_drops_a_candidate_the_second_item_disagrees_with(payloads):
+    payloads['2222222222'] = status("Refund complete")  # Not the status call after all
+    context = FakeContext(payloads)
+    client = StatusClient(context)
+    client.watch()
+
+    render(context, '1111111111', payloads['1111111111'])
+    client.learn(REFUND_URL.format('1111111111'), 'refund_already_issued')
+    render(context, '2222222222', payloads['2222222222'])
+    assert client.learn(REFUND_URL.format('2222222222'), 'needs_response') is False
+    assert client.pending is None and not client.ready
+    assert client.query(REFUND_URL.format('3333333333')) is None
+
+
+def test_candidates_are_bounded_per_tab_and_dropped_on_navigation(payloads):
+    context = FakeContext(payloads)
+    client = StatusClient(context)
+    client.watch()
+
+    busy = render(context, '1111111111', payloads['1111111111'])
+    for _ in range(MAX_CANDIDATES_PER_PAGE * 2):
+        context.emit('response', FakeResponse(busy.main_frame, '1111111111', {}))
+    assert len(client._candidates[busy]) == MAX_CANDIDATES_PER_PAGE
+
+    # Tabs released to the pool are reset to about:blank and no longer hold slots
+    busy.main_frame.url = 'about:blank'
+    busy.emit('framenavigated', busy.main_frame)
+    assert busy not in client._candidates
+
+    # Plenty of collected tabs still leave room for the one rendered later
+    for n in range(50):
+        render(context, f'90000000{n:02d}', {})
+    render(context, '2222222222', payloads['2222222222'])
+    client.learn(REFUND_URL.format('2222222222'), 'needs_response')
+    assert client.pending is not None
+
+    client.stop_watching()
+    assert busy.handlers['framenavigated'] == [] and not client._candidates
@@ -0,0 +1,66 @@
+import pytest
+
+from throttle import AdaptiveController
+
+
+@pytest.fixture
+def controller():
+    return AdaptiveController(rate=0.5, max_rate=0.7, min_rate=0.1, max_concurrency=3,
+                              increase_after=2, captcha_cooldown=0)
+
+
+def test_clean_streak_steps_up_to_the_limits(controller):
+    for _ in range(2):
+        controller.record(None)
+    assert (controller.concurrency, round(controller.rate, 2)) == (2, 0.6)
+    for _ in range(6):
+        controller.record(None)
+    assert (controller.concurrency, round(controller.rate, 2)) == (3, 0.7)
+    assert controller.stats['clean'] == 8
+
+
+def test_errors_back_off_multiplicatively_and_reset_the_streak(controller):
+    controller._decide("test", 3, 0.7)
+    controller.record(None)
+    controller.record('timeout')
+    assert (controller.concurrency, round(controller.rate, 2)) == (1, 0.49)
+    assert controller.clean_streak == 0
+    for _ in range(5):
+        controller.record('network_error')
+    assert (controller.concurrency, controller.rate) == (1, 0.1)
+
+
+def test_captcha_drops_to_the_floor(controller):
+    controller._decide("test", 3, 0.6)
+    controller.record('captcha')
+    assert (controller.concurrency, controller.rate) == (1, 0.3)
+    assert controller.stats['captchas'] == 1
+
+
+def test_item_failures_are_not_page_load_signals(controller):
+    for reason in ('upload_timeout', 'submit_rejected', 'form_error'):
+        controller.record(reason)
+    assert (controller.concurrency, controller.rate, controller.stats['errors']) == (1, 0.5, 0)
+
+
+class FakePage:
+    def __init__(self, url, visible=()):
+        self.url = url
+        self.visible = visible
+
+    def locator(self, selector):
+        page = self
+
+        class Locator:
+            first = property(lambda self: self)
+
+            def is_visible(self):
+                return selector in page.visible
+
+        return Locator()
+
+
+def test_is_blocked(controller):
+    assert controller.is_blocked(FakePage('https://www.aliexpress.com/_____tmd_____/punish?x=1'))
+    assert controller.is_blocked(FakePage('https://www.aliexpress.com/p/order/index.html', ('.nc-container',)))
+    assert not controller.is_blocked(FakePage('https://www.aliexpress.com/p/order/index.html'))
@@ -0,0 +1,58 @@
+import json
+import random
+
+import timing
+from timing import PhaseTimer, page_type_for, percentile
+
+
+def test_percentile_nearest_rank():
+    values = [0.4, 0.1, 0.3, 0.2, 1.0]
+    assert percentile(values, 0.5) == 0.3
+    assert percentile(values, 0.95) == 1.0
+    assert percentile([], 0.5) == 0.0
+
+
+def test_page_type_for():
+    assert page_type_for('https://www.aliexpress.com/reverse-pages/detail?x=1') == 'reverse_pages'
+    assert page_type_for('https://www.aliexpress.com/p/order/detail.html?orderId=1') == 'order_detail'
+    assert page_type_for('https://www.aliexpress.com/p/order/index.html') == 'order_list'
+    assert page_type_for(None) == 'other'
+
+
+def test_summary_per_phase_and_page_type():
+    timer = PhaseTimer()
+    for seconds in (1.0, 2.0, 3.0):
+        timer.record('goto', seconds, 'reverse_pages')
+    timer.record('goto', 5.0, 'order_list')
+    summary = timer.summary()
+    assert summary['goto']['reverse_pages'] == {'count': 3, 'total': 6.0, 'max': 3.0, 'p50': 2.0, 'p95': 3.0}
+    assert summary['goto']['order_list']['count'] == 1
+    timer.reset()
+    assert timer.summary() == {}
+
+
+def test_reservoir_bounds_samples_but_keeps_exact_totals(monkeypatch):
+    monkeypatch.setattr(timing, 'MAX_SAMPLES', 100)
+    random.seed(1)
+    timer = PhaseTimer()
+    for n in range(1, 10001):
+        timer.record('upload_wait', n / 1000)
+    assert len(timer._samples[('upload_wait', 'other')]) == 100
+    stats = timer.summary()['upload_wait']['other']
+    assert stats['count'] == 10000
+    assert stats['max'] == 10.0
+    assert stats['total'] == round(sum(n / 1000 for n in range(1, 10001)), 4)
+    # A uniform sample keeps the estimates near the true 5.0s / 9.5s
+    assert 4.0 < stats['p50'] < 6.0
+    assert 8.8 < stats['p95'] <= 10.0
+
+
+def test_exports(tmp_path):
+    timer = PhaseTimer()
+    timer.record('goto', 1.5, 'reverse_pages')
+    timer.export(str(tmp_path / 'timings.json'))
+    assert json.loads((tmp_path / 'timings.json').read_text())['goto']['reverse_pages']['count'] == 1
+    timer.export(str(tmp_path / 'timings.prom'))
+    prom = (tmp_path / 'timings.prom').read_text()
+    assert 'ali_refund_phase_seconds{phase="goto",page_type="reverse_pages",quantile="0.95"} 1.5' in prom
+    assert 'ali_refund_phase_seconds_count{phase="goto",page_type="reverse_pages"} 1' in prom
@@ -0,0 +1,207 @@
+from playwright.sync_api import Page
+import logging
+import os
+import threading
+import time
+from timing import timer
+from page_pool import PagePool, open_page, release_page
+
+logger = logging.getLogger(__name__)
+
+# Controller defaults
+DEFAULT_RATE = 0.5             # Navigations per second (the old fixed 2 s gap)
+DEFAULT_MAX_RATE = 2.0
+DEFAULT_MIN_RATE = 0.1
+DEFAULT_MAX_CONCURRENCY = 3    # Refund tabs loading at the same time
+INCREASE_AFTER = 5             # Clean page loads before stepping up
+CAPTCHA_COOLDOWN = 60          # Seconds to back off after an anti-bot page
+
+# Signs that AliExpress served a slider captcha / anti-bot page instead of content
+CAPTCHA_URL_MARKERS = ('punish', '_____tmd_____', 'captcha', 'baxia')
+CAPTCHA_SELECTORS = (
+    '#nc_1_n1z',
+    '.nc-container',
+    '#baxia-dialog-content',
+    'iframe[src*="captcha"]',
+    'text=/slide to verify/i',
+)
+
+
+class BlockedPageError(Exception):
+    """Raised when a navigation lands on a captcha / anti-bot page"""
+
+
+def throttle_defaults() -> dict:
+    """Rate/concurrency config keys, read from the environment"""
+    return {
+        'rate_limit': float(os.getenv('RATE_LIMIT', DEFAULT_RATE)),
+        'max_rate': float(os.getenv('MAX_RATE', DEFAULT_MAX_RATE)),
+        'max_concurrency': int(os.getenv('MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY)),
+    }
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `capacity` banked"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        """Block until a token is available. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+class AdaptiveController:
+    """
+    Paces navigations with a token bucket and sizes the refund tab window AIMD-style:
+    additive increase after a streak of clean loads, multiplicative decrease on
+    errors/timeouts, and a hard reset plus cooldown on captcha/anti-bot pages.
+    """
+
+    def __init__(self, rate: float = DEFAULT_RATE, max_rate: float = DEFAULT_MAX_RATE,
+                 min_rate: float = DEFAULT_MIN_RATE, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 min_concurrency: int = 1, increase_after: int = INCREASE_AFTER,
+                 captcha_cooldown: float = CAPTCHA_COOLDOWN):
+        self.bucket = TokenBucket(rate, capacity=max(1.0, float(max_concurrency)))
+        self.max_rate = max(rate, max_rate)
+        self.min_rate = min(rate, min_rate)
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.min_concurrency = min_concurrency
+        self.concurrency = min_concurrency
+        self.increase_after = increase_after
+        self.captcha_cooldown = captcha_cooldown
+        self.clean_streak = 0
+        self.stats = {'clean': 0, 'errors': 0, 'captchas': 0, 'waited': 0.0}
+
+    @classmethod
+    def from_config(cls, config: dict):
+        return cls(
+            rate=config.get('rate_limit', DEFAULT_RATE),
+            max_rate=config.get('max_rate', DEFAULT_MAX_RATE),
+            max_concurrency=config.get('max_concurrency', DEFAULT_MAX_CONCURRENCY),
+        )
+
+    @property
+    def rate(self) -> float:
+        return self.bucket.rate
+
+    def _decide(self, message: str, concurrency: int, rate: float):
+        """Apply and log a new concurrency/rate setting"""
+        concurrency = max(self.min_concurrency, min(self.max_concurrency, concurrency))
+        rate = max(self.min_rate, min(self.max_rate, rate))
+        if concurrency == self.concurrency and abs(rate - self.rate) < 1e-9:
+            return
+        logger.info(f"Throttle: {message}: concurrency {self.concurrency} → {concurrency}, "
+                    f"rate {self.rate:.2f} → {rate:.2f} nav/s")
+        print(f"  • ⚙️ {message}: {concurrency} tabs, {rate:.2f} nav/s")
+        self.concurrency = concurrency
+        self.bucket.rate = rate
+
+    def acquire(self, page_type: str = 'other'):
+        """Wait for permission to start the next navigation"""
+        with timer.span('rate_limit', page_type):
+            self.stats['waited'] += self.bucket.acquire()
+
+    def record_success(self):
+        self.stats['clean'] += 1
+        self.clean_streak += 1
+        if self.clean_streak >= self.increase_after:
+            self.clean_streak = 0
+            self._decide(f"{self.increase_after} clean loads", self.concurrency + 1, self.rate + 0.1)
+
+    def record_error(self, reason: str = 'error'):
+        self.stats['errors'] += 1
+        self.clean_streak = 0
+        self._decide(f"Backing off after {reason}", self.concurrency // 2, self.rate * 0.7)
+
+    def record_captcha(self):
+        self.stats['captchas'] += 1
+        self.clean_streak = 0
+        self._decide("Anti-bot page detected", self.min_concurrency, self.rate * 0.5)
+        print(f"  • 🛑 Captcha/anti-bot page, cooling down for {self.captcha_cooldown:.0f}s...")
+        timer.sleep(self.captcha_cooldown)
+
+    def record(self, reason: str):
+        """Feed back the outcome of a page: None for a clean load, else a failure reason"""
+        if reason is None:
+            self.record_success()
+        elif reason == 'captcha':
+            self.record_captcha()
+        elif reason in ('timeout', 'network_error', 'status_unclear'):
+            self.record_error(reason)
+
+    def is_blocked(self, page: Page) -> bool:
+        """Detect slider captcha / anti-bot interstitials"""
+        url = page.url.lower()
+        if any(marker in url for marker in CAPTCHA_URL_MARKERS):
+            return True
+        for selector in CAPTCHA_SELECTORS:
+            try:
+                if page.locator(selector).first.is_visible():
+                    return True
+            except Exception:
+                continue
+        return False
+
+    def print_summary(self):
+        print(f"\n⚙️ Throttle: {self.stats['clean']} clean loads, {self.stats['errors']} errors, "
+              f"{self.stats['captchas']} captchas, {self.stats['waited']:.1f}s rate-limited, "
+              f"final {self.concurrency} tabs @ {self.rate:.2f} nav/s")
+
+
+class RefundPrefetcher:
+    """Keeps up to controller.concurrency - 1 upcoming refund pages loading in background tabs"""
+
+    def __init__(self, context, controller: AdaptiveController, pool: PagePool = None):
+        self.context = context
+        self.controller = controller
+        self.pool = pool
+        self.pages = {}
+
+    def fill(self, upcoming: list[str]):
+        """Start loading the next URLs until the window is full"""
+        for url in upcoming:
+            if len(self.pages) >= self.controller.concurrency - 1:
+                break
+            if url in self.pages:
+                continue
+            self.controller.acquire('reverse_pages')
+            page = open_page(self.context, self.pool)
+            try:
+                with timer.span('prefetch_goto', 'reverse_pages'):
+                    page.goto(url, wait_until='commit')
+            except Exception as e:
+                logger.debug(f"Prefetch failed for {url}: {e}")
+                release_page(page, self.pool)
+                continue
+            self.pages[url] = page
+
+    def take(self, url: str):
+        """Hand over a prefetched page for url, or None if it isn't loading"""
+        return self.pages.pop(url, None)
+
+    def close_all(self):
+        for page in self.pages.values():
+            try:
+                release_page(page, self.pool)
+            except Exception:
+                pass
+        self.pages.clear()
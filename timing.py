@@ -0,0 +1,166 @@
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Percentiles shown in the summary and exported to JSON/Prometheus
+PERCENTILES = (0.5, 0.95)
+# Samples kept per phase/page type for percentiles; count, total and max stay exact
+MAX_SAMPLES = 2000
+
+
+def page_type_for(url: str) -> str:
+    """Classify a URL into the page types used for timing breakdowns"""
+    if not url:
+        return 'other'
+    if 'reverse-pages' in url:
+        return 'reverse_pages'
+    if 'order/detail' in url:
+        return 'order_detail'
+    if 'order/index' in url:
+        return 'order_list'
+    if 'login' in url:
+        return 'login'
+    return 'other'
+
+
+def percentile(values: list[float], q: float) -> float:
+    """Nearest-rank percentile of a list of durations"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+class PhaseTimer:
+    """
+    Collects durations per phase and page type for a single run. Long runs keep
+    a uniform random sample of MAX_SAMPLES durations per key (reservoir
+    sampling), so memory stays bounded and percentiles become estimates.
+    """
+
+    def __init__(self):
+        self._samples = defaultdict(list)
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, phase: str, page_type: str = 'other'):
+        """Time the wrapped block and record it under phase/page_type"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, time.perf_counter() - start, page_type)
+
+    def sleep(self, seconds: float, page_type: str = 'other'):
+        """time.sleep that shows up as the 'sleep' phase in the report"""
+        with self.span('sleep', page_type):
+            time.sleep(seconds)
+
+    def record(self, phase: str, seconds: float, page_type: str = 'other'):
+        key = (phase, page_type)
+        with self._lock:
+            count, total, longest = self._totals.get(key, (0, 0.0, 0.0))
+            count += 1
+            self._totals[key] = (count, total + seconds, max(longest, seconds))
+            samples = self._samples[key]
+            if len(samples) < MAX_SAMPLES:
+                samples.append(seconds)
+            else:
+                slot = random.randrange(count)
+                if slot < MAX_SAMPLES:
+                    samples[slot] = seconds
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+
+    def summary(self) -> dict:
+        """Return {phase: {page_type: {count, total, p50, p95, max}}}"""
+        with self._lock:
+            samples = {key: list(values) for key, values in self._samples.items()}
+            totals = dict(self._totals)
+
+        result = {}
+        for (phase, page_type), values in sorted(samples.items()):
+            count, total, longest = totals[(phase, page_type)]
+            stats = {
+                'count': count,
+                'total': round(total, 4),
+                'max': round(longest, 4),
+            }
+            for q in PERCENTILES:
+                stats[f"p{int(q * 100)}"] = round(percentile(values, q), 4)
+            result.setdefault(phase, {})[page_type] = stats
+        return result
+
+    def print_summary(self):
+        """Print p50/p95/max per phase, sorted by total time spent"""
+        summary = self.summary()
+        if not summary:
+            return
+
+        print("\n" + "="*50)
+        print("⏱️ Phase Timings")
+        print("="*50)
+
+        rows = [
+            (phase, page_type, stats)
+            for phase, by_type in summary.items()
+            for page_type, stats in by_type.items()
+        ]
+        rows.sort(key=lambda row: row[2]['total'], reverse=True)
+
+        print(f"\n{'phase':<16}{'page type':<15}{'count':>6}{'p50':>9}{'p95':>9}{'max':>9}{'total':>10}")
+        for phase, page_type, stats in rows:
+            print(
+                f"{phase:<16}{page_type:<15}{stats['count']:>6}"
+                f"{stats['p50']:>8.2f}s{stats['p95']:>8.2f}s{stats['max']:>8.2f}s{stats['total']:>9.1f}s"
+            )
+
+    def export_json(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_prometheus(self, path: str):
+        """Write the summary in Prometheus textfile-collector format"""
+        lines = [
+            "# HELP ali_refund_phase_seconds Duration of refund run phases",
+            "# TYPE ali_refund_phase_seconds summary",
+        ]
+        max_lines = [
+            "# HELP ali_refund_phase_max_seconds Slowest observed duration per phase",
+            "# TYPE ali_refund_phase_max_seconds gauge",
+        ]
+        for phase, by_type in self.summary().items():
+            for page_type, stats in by_type.items():
+                labels = f'phase="{phase}",page_type="{page_type}"'
+                for q in PERCENTILES:
+                    lines.append(f'ali_refund_phase_seconds{{{labels},quantile="{q}"}} {stats[f"p{int(q * 100)}"]}')
+                lines.append(f"ali_refund_phase_seconds_sum{{{labels}}} {stats['total']}")
+                lines.append(f"ali_refund_phase_seconds_count{{{labels}}} {stats['count']}")
+                max_lines.append(f"ali_refund_phase_max_seconds{{{labels}}} {stats['max']}")
+
+        with open(path, 'w') as f:
+            f.write("\n".join(lines + max_lines) + "\n")
+
+    def export(self, path: str):
+        """Export to JSON, or Prometheus textfile format for .prom paths"""
+        if path.endswith('.prom'):
+            self.export_prometheus(path)
+        else:
+            self.export_json(path)
+        print(f"\n📝 Timings exported to {path}")
+
+
+# Shared timer used by the login handler, collector and refunder
+timer = PhaseTimer()